@@ -0,0 +1,53 @@
+<?php
+/**
+ * API v1 batch handler — POST /api/v1/batch runs ordered sub-requests through
+ * the contacts / deals / webhooks handlers in one HTTP round trip.
+ * Sanctum CRM
+ */
+
+if (!defined('CRM_LOADED')) {
+    die('Direct access not permitted');
+}
+
+function handleBatch($method, $input, $auth) {
+    debugLog("handleBatch method=$method operations=" . (is_array($input['operations'] ?? null) ? count($input['operations']) : 0));
+
+    if ($method !== 'POST') {
+        http_response_code(405);
+        echo json_encode([
+            'error' => 'Method not allowed',
+            'code' => 405
+        ]);
+        return;
+    }
+
+    $runner = new ApiBatchRunner(function ($subMethod, $resource, $id, $subInput, $action) use ($auth) {
+        switch ($resource) {
+            case 'contacts':
+                handleContacts($subMethod, $id, $subInput, $auth, $action);
+                break;
+            case 'deals':
+                handleDeals($subMethod, $id, $subInput, $auth);
+                break;
+            case 'webhooks':
+                handleWebhooks($subMethod, $id, $subInput, $auth, $action);
+                break;
+        }
+    });
+
+    $error = $runner->validate($input);
+    if ($error !== null) {
+        http_response_code(400);
+        echo json_encode([
+            'error' => $error,
+            'code' => 400
+        ]);
+        return;
+    }
+
+    $atomic = !empty($input['atomic']) && $input['atomic'] !== 'false';
+    $result = $runner->run($input['operations'], $atomic);
+
+    http_response_code(200);
+    echo json_encode($result);
+}
@@ -194,6 +194,17 @@ function handleContacts($method, $id, $input, $auth, $action = null) {
         return;
     }
 
+    // GET /contacts/facets — filter values with counts (contact_facet_counts)
+    if ($action === 'facets') {
+        if ($method !== 'GET') {
+            http_response_code(405);
+            echo json_encode(['error' => 'Method not allowed', 'code' => 405]);
+            return;
+        }
+        echo json_encode((new ContactFacetService($db))->getFacets());
+        return;
+    }
+
     // Import handling moved to handleImport function
     
     switch ($method) {
@@ -220,6 +231,7 @@ function handleContacts($method, $id, $input, $auth, $action = null) {
                 // List contacts with optional filtering and pagination
                 $where = "1=1";
                 $params = [];
+                $tagService = new ContactTagService($db);
                 
                 if (isset($_GET['type']) && (string) $_GET['type'] !== '') {
                     $where .= " AND contact_type = ?";
@@ -267,7 +279,6 @@ function handleContacts($method, $id, $input, $auth, $action = null) {
                 }
 
                 if (!empty($_GET['tag'])) {
-                    $tagService = new ContactTagService($db);
                     $tagFilter = $tagService->normalizeTag((string) $_GET['tag']);
                     if ($tagFilter !== '') {
                         $where .= " AND contacts.id IN (SELECT contact_id FROM contact_tags WHERE tag = ?)";
@@ -287,30 +298,46 @@ function handleContacts($method, $id, $input, $auth, $action = null) {
                     $offset = max(0, (int) $_GET['offset']);
                 }
                 
-                // Get total count
-                $countSql = "SELECT COUNT(*) as total FROM contacts WHERE $where";
-                $totalResult = $db->fetchOne($countSql, $params);
-                $total = $totalResult['total'];
+                // Get total count — precomputed facet counts answer the single-filter cases
+                $facetService = new ContactFacetService($db);
+                $total = $facetService->countForListFilters([
+                    'type' => $_GET['type'] ?? '',
+                    'status' => $_GET['status'] ?? '',
+                    'enrichment_status' => $_GET['enrichment_status'] ?? '',
+                    'source' => $_GET['source'] ?? '',
+                    'tag' => !empty($_GET['tag']) ? $tagService->normalizeTag((string) $_GET['tag']) : '',
+                    'needs_enrichment' => (!empty($_GET['needs_enrichment']) && $_GET['needs_enrichment'] !== '0' && $_GET['needs_enrichment'] !== 'false') ? '1' : '',
+                    'email' => $_GET['email'] ?? '',
+                    'q' => $_GET['q'] ?? '',
+                ]);
+                if ($total === null) {
+                    $countSql = "SELECT COUNT(*) as total FROM contacts WHERE $where";
+                    $totalResult = $db->fetchOne($countSql, $params);
+                    $total = $totalResult['total'];
+                }
                 
                 // Get contacts with limit and offset
-                $sql = "SELECT * FROM contacts WHERE $where ORDER BY created_at DESC LIMIT ? OFFSET ?";
+                $sql = "SELECT * FROM contacts WHERE $where ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?";
                 $params[] = $limit;
                 $params[] = $offset;
                 $contacts = $db->fetchAll($sql, $params);
 
-                $tagService = new ContactTagService($db);
                 $tagMap = $tagService->listTagsForContactIds(array_column($contacts, 'id'));
                 foreach ($contacts as &$row) {
                     $row['tags'] = $tagMap[(int) $row['id']] ?? [];
                 }
                 unset($row);
                 
-                echo json_encode([
+                $response = [
                     'contacts' => $contacts,
                     'total' => $total,
                     'limit' => $limit,
                     'offset' => $offset
-                ]);
+                ];
+                if (!empty($_GET['facets']) && $_GET['facets'] !== '0' && $_GET['facets'] !== 'false') {
+                    $response['facets'] = $facetService->getFacets()['facets'];
+                }
+                echo json_encode($response);
             }
             break;
             
@@ -388,7 +415,7 @@ function handleContacts($method, $id, $input, $auth, $action = null) {
             
             http_response_code(201);
             echo json_encode($contact);
-            exit; // Prevent any further output
+            return; // Router ends the request after the handler returns
             
         case 'PUT':
             if (!$id) {
@@ -498,7 +525,7 @@ function handleContacts($method, $id, $input, $auth, $action = null) {
                     'contact' => $existing,
                 ]);
                 http_response_code(204);
-                exit; // Ensure no content is sent for 204 response
+                return; // No body for 204; returning (not exit) lets /batch capture the status
             } else {
                 http_response_code(404);
                 echo json_encode([
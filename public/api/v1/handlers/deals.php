@@ -149,7 +149,7 @@ function handleDeals($method, $id, $input, $auth) {
                     'deal' => $existingDeal,
                 ]);
                 http_response_code(204);
-                exit; // Ensure no content is sent for 204 response
+                return; // No body for 204; returning (not exit) lets /batch capture the status
             } else {
                 http_response_code(404);
                 echo json_encode([
@@ -203,7 +203,7 @@ function handleWebhooks($method, $id, $input, $auth, $action = null) {
             
             if ($deleted) {
                 http_response_code(204);
-                exit; // Ensure no content is sent for 204 response
+                return; // No body for 204; returning (not exit) lets /batch capture the status
             } else {
                 http_response_code(404);
                 echo json_encode([
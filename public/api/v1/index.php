@@ -23,15 +23,19 @@ require_once __DIR__ . '/../../includes/auth.php';
 require_once __DIR__ . '/../../includes/LeadEnrichmentService.php';
 require_once __DIR__ . '/../../includes/MockLeadEnrichmentService.php';
 require_once __DIR__ . '/../../includes/ContactTagService.php';
+require_once __DIR__ . '/../../includes/ContactFacetService.php';
 require_once __DIR__ . '/../../includes/ReportsAnalyticsService.php';
 require_once __DIR__ . '/../../includes/ApiRequestContext.php';
 require_once __DIR__ . '/../../includes/WebhookDispatcher.php';
+require_once __DIR__ . '/../../includes/ApiBatchRunner.php';
+require_once __DIR__ . '/../../includes/CsvImportStager.php';
 require_once __DIR__ . '/handlers/contacts.php';
 require_once __DIR__ . '/handlers/deals.php';
 require_once __DIR__ . '/handlers/users.php';
 require_once __DIR__ . '/handlers/webhooks.php';
 require_once __DIR__ . '/handlers/reports.php';
 require_once __DIR__ . '/handlers/merges.php';
+require_once __DIR__ . '/handlers/batch.php';
 
 // Auto-detect if RocketReach is available based on API key presence and client availability
 $db = Database::getInstance();
@@ -369,7 +373,7 @@ if (isset($resource) && $resource === 'webhooks' && isset($action) && $action ==
 }
 
 // Rate limiting implementation
-function checkRateLimit($auth) {
+function checkRateLimit($auth, $cost = 1) {
     $userId = $auth->getUserId();
     $ip = $_SERVER['REMOTE_ADDR'] ?? 'unknown';
     $key = "rate_limit:$userId:$ip";
@@ -392,7 +396,7 @@ function checkRateLimit($auth) {
     }
     
     // Check if limit exceeded
-    if ($rateData['count'] >= $maxRequests) {
+    if ($rateData['count'] + $cost > $maxRequests) {
         http_response_code(429);
         echo json_encode([
             'error' => 'Rate limit exceeded',
@@ -403,12 +407,16 @@ function checkRateLimit($auth) {
     }
     
     // Increment counter
-    $rateData['count']++;
+    $rateData['count'] += $cost;
 }
 
-// Apply rate limiting
+// Apply rate limiting (a batch is charged per operation, not per HTTP request)
 if ($auth->isAuthenticated()) {
-    checkRateLimit($auth);
+    $rateCost = 1;
+    if ($resource === 'batch' && is_array($input['operations'] ?? null)) {
+        $rateCost = max(1, count($input['operations']));
+    }
+    checkRateLimit($auth, $rateCost);
 }
 
 // Authentication check
@@ -452,6 +460,10 @@ try {
             handleWebhooks($method, $resourceId, $input, $auth, $action);
             break;
             
+        case 'batch':
+            handleBatch($method, $input, $auth);
+            break;
+            
         case 'commands':
             handleCommands($method, $resourceId, $input, $auth);
             break;
@@ -558,8 +570,14 @@ function handleImport($method, $id, $input, $auth, $action = null) {
     global $db;
     
     try {
+        // Staged imports: /import/{id}[/process|/progress]
+        if ($id) {
+            handleStagedImport($method, (int) $id, $input, $auth, $action);
+            return;
+        }
+
         if ($method === 'POST') {
-            // Handle CSV upload
+            // Handle CSV upload: stream rows into server-side staging, return a sample only
             if (isset($_FILES['csvFile'])) {
                 $file = $_FILES['csvFile'];
                 
@@ -584,41 +602,31 @@ function handleImport($method, $id, $input, $auth, $action = null) {
                     return;
                 }
                 
-                // Parse CSV
-                $csvData = [];
                 try {
-                    if (($handle = fopen($file['tmp_name'], 'r')) !== FALSE) {
-                        $headers = fgetcsv($handle);
-                        while (($data = fgetcsv($handle)) !== FALSE) {
-                            $row = [];
-                            foreach ($headers as $index => $header) {
-                                $row[trim($header)] = isset($data[$index]) ? trim($data[$index]) : '';
-                            }
-                            $csvData[] = $row;
-                        }
-                        fclose($handle);
-                    } else {
-                        throw new Exception("Failed to open CSV file");
-                    }
+                    $stager = new CsvImportStager($db);
+                    $staged = $stager->stage($file['tmp_name'], (string) $file['name'], $auth->getUserId());
                 } catch (Exception $e) {
-                    http_response_code(500);
+                    $code = $e instanceof InvalidArgumentException ? 400 : 500;
+                    http_response_code($code);
                     echo json_encode([
                         'error' => 'Failed to parse CSV file: ' . $e->getMessage(),
-                        'code' => 500
+                        'code' => $code
                     ]);
                     return;
                 }
                 
                 echo json_encode([
                     'success' => true,
-                    'data' => $csvData,
-                    'rowCount' => count($csvData)
+                    'import_id' => $staged['import_id'],
+                    'headers' => $staged['headers'],
+                    'sample' => $staged['sample'],
+                    'rowCount' => $staged['row_count']
                 ]);
                 return;
             }
         }
         
-        // Handle import processing
+        // Inline import (small API payloads): rows sent as csvData in the request body
         if (isset($input['csvData']) && isset($input['fieldMapping'])) {
             $csvData = $input['csvData'];
             $fieldMapping = $input['fieldMapping'];
@@ -631,109 +639,19 @@ function handleImport($method, $id, $input, $auth, $action = null) {
             $errors = [];
             
             foreach ($csvData as $index => $row) {
-                try {
-                    $contactData = [];
-                    
-                    // Map CSV columns to contact fields with sanitization
-                    foreach ($fieldMapping as $field => $column) {
-                        // Skip name split fields - they'll be handled separately
-                        if (strpos($column, '_split_') !== false) {
-                            continue;
-                        }
-                        
-                        if (isset($row[$column]) && !empty($row[$column])) {
-                            // Sanitize input based on field type
-                            if ($field === 'email') {
-                                $contactData[$field] = $row[$column]; // Email validation handled separately
-                            } elseif ($field === 'evm_address') {
-                                $contactData[$field] = validateEVMAddress($row[$column]) ? $row[$column] : null;
-                            } else {
-                                $contactData[$field] = sanitizeInput($row[$column]);
-                            }
-                        }
-                    }
-                    
-                    // Handle name splitting if configured
-                    if ($nameSplitConfig && isset($row[$nameSplitConfig['column']])) {
-                        $fullName = $row[$nameSplitConfig['column']];
-                        $parts = explode($nameSplitConfig['delimiter'], $fullName);
-                        
-                        if (count($parts) >= 2) {
-                            $firstPart = trim($parts[$nameSplitConfig['firstPart']]);
-                            $lastPart = trim($parts[$nameSplitConfig['lastPart']]);
-                            
-                            // Set first_name and last_name with split values (sanitized)
-                            $contactData['first_name'] = sanitizeInput($firstPart);
-                            $contactData['last_name'] = sanitizeInput($lastPart);
-                        }
-                    }
-                    
-                    // Validate email if provided
-                    if (!empty($contactData['email']) && !validateEmail($contactData['email'])) {
-                        $errors[] = [
-                            'row' => $index + 1,
-                            'message' => 'Invalid email address: ' . $contactData['email']
-                        ];
-                        $errorCount++;
-                        continue;
-                    }
-                    
-                    // Add source and notes
-                    $contactData['source'] = $source;
-                    $contactData['notes'] = $notes;
-                    $contactData['contact_type'] = 'lead';
-                    $contactData['contact_status'] = 'new';
-                    $contactData['created_at'] = getCurrentTimestamp();
-                    $contactData['updated_at'] = getCurrentTimestamp();
-                    
-                    // Validate required fields - only require first_name and last_name if no name splitting is configured
-                    if (!$nameSplitConfig && (empty($contactData['first_name']) || empty($contactData['last_name']))) {
-                        $missingFields = [];
-                        if (empty($contactData['first_name'])) $missingFields[] = 'first_name';
-                        if (empty($contactData['last_name'])) $missingFields[] = 'last_name';
-                        
-                        $errors[] = [
-                            'row' => $index + 1,
-                            'message' => 'Missing required fields: ' . implode(', ', $missingFields) . ' (Data: ' . json_encode($contactData) . ')'
-                        ];
-                        $errorCount++;
-                        continue;
-                    }
-                    
-                    // If name splitting is configured but didn't produce valid names, skip this row
-                    if ($nameSplitConfig && (empty($contactData['first_name']) || empty($contactData['last_name']))) {
-                        $errors[] = [
-                            'row' => $index + 1,
-                            'message' => 'Name splitting failed - could not split name: ' . ($row[$nameSplitConfig['column']] ?? 'N/A')
-                        ];
-                        $errorCount++;
-                        continue;
-                    }
-                    
-                    // Check for duplicate email (only if email is provided)
-                    if (!empty($contactData['email'])) {
-                        $existing = $db->fetchOne("SELECT id FROM contacts WHERE email = ?", [$contactData['email']]);
-                        if ($existing) {
-                            $errors[] = [
-                                'row' => $index + 1,
-                                'message' => 'Contact with this email already exists'
-                            ];
-                            $errorCount++;
-                            continue;
-                        }
-                    }
-                    
-                    // Insert contact
-                    $db->insert('contacts', $contactData);
-                    $successCount++;
-                    
-                } catch (Exception $e) {
+                [$contactData, $error] = CsvImportStager::mapRow((array) $row, $fieldMapping, $nameSplitConfig, $source, $notes);
+                if ($contactData !== null) {
+                    [, $error] = CsvImportStager::insertContact($db, $contactData);
+                }
+                if ($error !== null) {
                     $errors[] = [
                         'row' => $index + 1,
-                        'message' => 'Database error: ' . $e->getMessage()
+                        'message' => $error
                     ];
                     $errorCount++;
+                    continue;
                 }
+                $successCount++;
             }
             
             echo json_encode([
@@ -761,4 +679,81 @@ function handleImport($method, $id, $input, $auth, $action = null) {
             'code' => 500
         ]);
     }
-} 
\ No newline at end of file
+}
+
+/**
+ * Staged import endpoints (upload via POST /import with csvFile):
+ *   GET    /import/{id}           job summary + sample rows (?sample=N)
+ *   POST   /import/{id}/process   store the mapping (first call) and import the next chunks
+ *   GET    /import/{id}/progress  counts, percent and row errors (?errors_limit, ?errors_offset)
+ *   DELETE /import/{id}           discard staged rows
+ */
+function handleStagedImport($method, $importId, $input, $auth, $action = null) {
+    global $db;
+    $stager = new CsvImportStager($db);
+    $job = $stager->getJob($importId, $auth->isAdmin() ? null : $auth->getUserId());
+    if (!$job) {
+        http_response_code(404);
+        echo json_encode([
+            'error' => 'Import not found',
+            'code' => 404
+        ]);
+        return;
+    }
+
+    if ($method === 'GET' && empty($action)) {
+        $summary = $stager->summary($importId);
+        $summary['sample'] = $stager->sample($importId, (int) ($_GET['sample'] ?? CsvImportStager::SAMPLE_ROWS));
+        echo json_encode($summary);
+        return;
+    }
+
+    if ($method === 'GET' && $action === 'progress') {
+        $summary = $stager->summary($importId);
+        $summary['errors'] = $stager->errors(
+            $importId,
+            max(1, min(500, (int) ($_GET['errors_limit'] ?? 100))),
+            (int) ($_GET['errors_offset'] ?? 0)
+        );
+        echo json_encode($summary);
+        return;
+    }
+
+    if ($method === 'POST' && $action === 'process') {
+        try {
+            if ($job['status'] === CsvImportStager::STATUS_STAGED && isset($input['fieldMapping'])) {
+                $stager->configure($importId, (array) $input['fieldMapping'], [
+                    'source' => $input['source'] ?? 'CSV Import',
+                    'notes' => $input['notes'] ?? '',
+                    'nameSplitConfig' => $input['nameSplitConfig'] ?? null,
+                ]);
+            }
+            $chunkSize = max(1, min(1000, (int) ($input['chunkSize'] ?? CsvImportStager::DEFAULT_CHUNK_SIZE)));
+            $summary = $stager->process($importId, (float) IMPORT_PROCESS_SECONDS, $chunkSize);
+        } catch (InvalidArgumentException $e) {
+            http_response_code(400);
+            echo json_encode([
+                'error' => $e->getMessage(),
+                'code' => 400
+            ]);
+            return;
+        }
+        $summary['errors'] = $summary['status'] === CsvImportStager::STATUS_COMPLETED
+            ? $stager->errors($importId)
+            : [];
+        echo json_encode($summary);
+        return;
+    }
+
+    if ($method === 'DELETE' && empty($action)) {
+        $stager->delete($importId);
+        http_response_code(204);
+        return;
+    }
+
+    http_response_code(405);
+    echo json_encode([
+        'error' => 'Method not allowed',
+        'code' => 405
+    ]);
+}
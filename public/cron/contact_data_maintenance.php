@@ -0,0 +1,55 @@
+<?php
+/**
+ * Contact data sidecar maintenance: compact legacy raw payloads, merge duplicate
+ * facts, apply raw-payload retention, drop orphaned payloads, incremental vacuum.
+ *
+ *   php /var/www/localhost/html/cron/contact_data_maintenance.php
+ *   php cron/contact_data_maintenance.php --keep-days=90 --keep-latest=2 --batch=1000
+ *   php cron/contact_data_maintenance.php --dry-run
+ *   php cron/contact_data_maintenance.php --convert-vacuum   (one-off: switch DB to auto_vacuum=INCREMENTAL)
+ */
+
+define('CRM_LOADED', true);
+
+require_once __DIR__ . '/../includes/config.php';
+require_once __DIR__ . '/../includes/database.php';
+require_once __DIR__ . '/../includes/ContactDataStore.php';
+
+if (php_sapi_name() !== 'cli') {
+    http_response_code(403);
+    die('This script can only be run from command line.');
+}
+
+$opts = [
+    'keep_days' => ContactDataStore::RETENTION_KEEP_DAYS,
+    'keep_latest' => ContactDataStore::RETENTION_KEEP_LATEST,
+    'batch' => 500,
+    'vacuum_pages' => 0,
+    'convert_vacuum' => in_array('--convert-vacuum', $argv ?? [], true),
+    'dry_run' => in_array('--dry-run', $argv ?? [], true),
+];
+foreach ($argv ?? [] as $arg) {
+    if (preg_match('/^--keep-days=(\d+)$/', $arg, $m)) {
+        $opts['keep_days'] = (int) $m[1];
+    } elseif (preg_match('/^--keep-latest=(\d+)$/', $arg, $m)) {
+        $opts['keep_latest'] = (int) $m[1];
+    } elseif (preg_match('/^--batch=(\d+)$/', $arg, $m)) {
+        $opts['batch'] = max(1, min(10000, (int) $m[1]));
+    } elseif (preg_match('/^--vacuum-pages=(\d+)$/', $arg, $m)) {
+        $opts['vacuum_pages'] = (int) $m[1];
+    }
+}
+
+try {
+    echo 'Starting contact data maintenance at ' . date('Y-m-d H:i:s') . "\n";
+    $store = new ContactDataStore();
+    $store->ensureSchema();
+    $report = $store->runMaintenance($opts);
+    echo json_encode(['status' => 'ok', 'report' => $report], JSON_PRETTY_PRINT) . "\n";
+    exit(0);
+} catch (Exception $e) {
+    error_log('Contact data maintenance error: ' . $e->getMessage());
+    echo 'Contact data maintenance failed: ' . $e->getMessage() . "\n";
+    echo "Stack trace:\n" . $e->getTraceAsString() . "\n";
+    exit(1);
+}
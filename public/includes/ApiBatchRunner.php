@@ -0,0 +1,351 @@
+<?php
+/**
+ * Ordered API sub-requests in one HTTP round trip (POST /api/v1/batch).
+ * Sanctum CRM
+ *
+ * Each operation is replayed through the regular resource handler (injected as
+ * a dispatcher) with its output captured, so validation, webhooks and response
+ * shapes stay identical to the single-request endpoints. Optional atomic mode
+ * wraps the whole batch in one transaction; webhook events are queued in the
+ * same database, so a rollback discards them too.
+ *
+ * Back-references: an operation with "ref": "c1" can be used by later
+ * operations as "$c1.id" (any dotted path into its response body) inside the
+ * path, query or body. A string that is exactly one reference keeps the
+ * referenced value's type.
+ */
+
+if (!defined('CRM_LOADED')) {
+    die('Direct access not permitted');
+}
+
+class ApiBatchRunner
+{
+    public const MAX_OPERATIONS = 50;
+    public const RESOURCES = ['contacts', 'deals', 'webhooks'];
+    public const METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE'];
+    /** Sub-actions with outbound I/O or streaming output; call them directly. */
+    public const BLOCKED_ACTIONS = ['enrich', 'bulk-enrich', 'export', 'test', 'data-runs'];
+    /** Status reported for operations that did not run (failed dependency / rolled back batch). */
+    public const STATUS_SKIPPED = 424;
+
+    private const REF_PATTERN = '/\$([A-Za-z_][A-Za-z0-9_]*)((?:\.[A-Za-z0-9_]+)+)/';
+
+    private Database $db;
+    /** @var callable(string,string,?string,?array,?string):void */
+    private $dispatch;
+    private int $maxOperations;
+
+    /**
+     * @param callable(string $method, string $resource, ?string $id, ?array $input, ?string $action):void $dispatch
+     *        Echoes the JSON response and sets http_response_code(), like the handlers.
+     */
+    public function __construct(callable $dispatch, ?Database $db = null, ?int $maxOperations = null)
+    {
+        $this->db = $db ?? Database::getInstance();
+        $this->dispatch = $dispatch;
+        $this->maxOperations = $maxOperations
+            ?? (defined('API_BATCH_MAX_OPERATIONS') ? (int) API_BATCH_MAX_OPERATIONS : self::MAX_OPERATIONS);
+    }
+
+    /**
+     * Validate the request body shape before anything runs.
+     *
+     * @param mixed $input
+     * @return string|null error message, or null when the batch is runnable
+     */
+    public function validate($input): ?string
+    {
+        if (!is_array($input) || !isset($input['operations']) || !is_array($input['operations'])) {
+            return 'Body must be an object with an "operations" array';
+        }
+        $operations = $input['operations'];
+        if ($operations === [] || array_keys($operations) !== range(0, count($operations) - 1)) {
+            return '"operations" must be a non-empty list';
+        }
+        if (count($operations) > $this->maxOperations) {
+            return 'Too many operations (max ' . $this->maxOperations . ')';
+        }
+        $refs = [];
+        foreach ($operations as $i => $op) {
+            if (!is_array($op)) {
+                return "Operation {$i} must be an object";
+            }
+            $method = strtoupper((string) ($op['method'] ?? ''));
+            if (!in_array($method, self::METHODS, true)) {
+                return "Operation {$i}: unsupported method";
+            }
+            if (!isset($op['path']) || !is_string($op['path']) || $op['path'] === '') {
+                return "Operation {$i}: path is required";
+            }
+            if (isset($op['body']) && !is_array($op['body'])) {
+                return "Operation {$i}: body must be an object";
+            }
+            if (isset($op['query']) && !is_array($op['query'])) {
+                return "Operation {$i}: query must be an object";
+            }
+            if (isset($op['ref'])) {
+                $ref = $op['ref'];
+                if (!is_string($ref) || !preg_match('/^[A-Za-z_][A-Za-z0-9_]*$/', $ref)) {
+                    return "Operation {$i}: ref must be an identifier";
+                }
+                if (isset($refs[$ref])) {
+                    return "Operation {$i}: duplicate ref '{$ref}'";
+                }
+                $refs[$ref] = $i;
+            }
+        }
+        return null;
+    }
+
+    /**
+     * Run a validated batch.
+     *
+     * @param list<array<string,mixed>> $operations
+     * @return array{success:bool,atomic:bool,committed:bool,results:list<array<string,mixed>>}
+     */
+    public function run(array $operations, bool $atomic = false): array
+    {
+        $declared = [];
+        foreach ($operations as $i => $op) {
+            if (isset($op['ref'])) {
+                $declared[(string) $op['ref']] = $i;
+            }
+        }
+
+        $results = [];
+        /** @var array<string,array{status:int,body:mixed}> $outputs */
+        $outputs = [];
+        $failedAt = null;
+
+        if ($atomic) {
+            $this->db->beginTransaction();
+        }
+        try {
+            foreach ($operations as $i => $op) {
+                $result = [
+                    'index' => $i,
+                    'ref' => $op['ref'] ?? null,
+                    'method' => strtoupper((string) $op['method']),
+                    'path' => (string) $op['path'],
+                ];
+                if ($failedAt !== null && $atomic) {
+                    $results[] = $result + $this->skipped("Skipped: operation {$failedAt} failed");
+                    continue;
+                }
+
+                [$status, $body, $path] = $this->runOne($op, $declared, $outputs, $i);
+                $result['path'] = $path;
+                $result['status'] = $status;
+                $result['body'] = $body;
+                $results[] = $result;
+
+                if (isset($op['ref'])) {
+                    $outputs[(string) $op['ref']] = ['status' => $status, 'body' => $body];
+                }
+                if ($status >= 400 && $failedAt === null) {
+                    $failedAt = $i;
+                }
+            }
+        } catch (Throwable $e) {
+            if ($atomic) {
+                $this->db->rollback();
+            }
+            throw $e;
+        }
+
+        $committed = true;
+        if ($atomic) {
+            if ($failedAt === null) {
+                $this->db->commit();
+            } else {
+                $this->db->rollback();
+                $committed = false;
+                foreach ($results as &$result) {
+                    if (($result['status'] ?? 0) < 400) {
+                        $result['rolled_back'] = true;
+                    }
+                }
+                unset($result);
+            }
+        }
+
+        return [
+            'success' => $failedAt === null,
+            'atomic' => $atomic,
+            'committed' => $committed,
+            'results' => $results,
+        ];
+    }
+
+    /**
+     * @param array<string,mixed> $op
+     * @param array<string,int> $declared ref => operation index
+     * @param array<string,array{status:int,body:mixed}> $outputs
+     * @return array{0:int,1:mixed,2:string} [status, decoded body, resolved path]
+     */
+    private function runOne(array $op, array $declared, array $outputs, int $index): array
+    {
+        $method = strtoupper((string) $op['method']);
+        $path = (string) $op['path'];
+        try {
+            $path = $this->resolve($path, $declared, $outputs, $index);
+            $query = $this->resolve($op['query'] ?? [], $declared, $outputs, $index);
+            $body = $this->resolve($op['body'] ?? [], $declared, $outputs, $index);
+        } catch (RuntimeException $e) {
+            // Reference errors carry their HTTP status as the exception code
+            return [$e->getCode(), ['error' => $e->getMessage(), 'code' => $e->getCode()], $path];
+        }
+
+        $target = self::parsePath($path);
+        if ($target === null) {
+            return [400, ['error' => 'Invalid path', 'code' => 400], $path];
+        }
+        [$resource, $id, $action, $pathQuery] = $target;
+        if (!in_array($resource, self::RESOURCES, true)) {
+            return [404, ['error' => 'Resource not available in batch', 'code' => 404], $path];
+        }
+        if ($action !== null && in_array($action, self::BLOCKED_ACTIONS, true)) {
+            return [400, ['error' => "Action '{$action}' is not supported in batch", 'code' => 400], $path];
+        }
+
+        $input = in_array($method, ['POST', 'PUT', 'PATCH'], true) ? $body : null;
+        $savedGet = $_GET;
+        $_GET = array_map(
+            static fn($v) => is_scalar($v) || $v === null ? (string) $v : $v,
+            array_merge($pathQuery, $query)
+        );
+        http_response_code(200);
+        ob_start();
+        try {
+            ($this->dispatch)($method, $resource, $id, $input, $action);
+            $raw = (string) ob_get_clean();
+        } catch (Throwable $e) {
+            ob_end_clean();
+            if (class_exists('ApiRequestContext', false)) {
+                ApiRequestContext::logError('batch operation failed', ['index' => $index, 'exception' => $e->getMessage()]);
+            }
+            $error = ['error' => 'Internal server error', 'code' => 500];
+            if (defined('DEBUG_MODE') && DEBUG_MODE) {
+                $error['details'] = $e->getMessage();
+            }
+            return [500, $error, $path];
+        } finally {
+            $_GET = $savedGet;
+        }
+
+        $status = (int) (http_response_code() ?: 200);
+        if (trim($raw) === '') {
+            return [$status, null, $path];
+        }
+        $decoded = json_decode($raw, true);
+        return [$status, json_last_error() === JSON_ERROR_NONE ? $decoded : $raw, $path];
+    }
+
+    /**
+     * Split "/contacts/12/convert?x=1" (optionally prefixed with /api/v1) into
+     * [resource, id, action, query] using the router's rules.
+     *
+     * @return array{0:string,1:?string,2:?string,3:array<string,mixed>}|null
+     */
+    public static function parsePath(string $path): ?array
+    {
+        if (strpos($path, '..') !== false) {
+            return null;
+        }
+        $query = [];
+        $qPos = strpos($path, '?');
+        if ($qPos !== false) {
+            parse_str(substr($path, $qPos + 1), $query);
+            $path = substr($path, 0, $qPos);
+        }
+        $path = preg_replace('#^/?api/v1(?=/|$)#', '', trim($path));
+        $tail = trim((string) $path, '/');
+        if ($tail === '') {
+            return null;
+        }
+        $parts = explode('/', $tail);
+        $resource = $parts[0];
+        $id = null;
+        $action = null;
+        if (isset($parts[1]) && is_numeric($parts[1])) {
+            $id = $parts[1];
+            $action = $parts[2] ?? null;
+        } elseif (isset($parts[1])) {
+            $action = $parts[1];
+        }
+        if ($action === null && isset($query['action'])) {
+            $action = (string) $query['action'];
+        }
+        return [$resource, $id, $action, $query];
+    }
+
+    /**
+     * Substitute $ref.path tokens in strings, recursively through arrays.
+     *
+     * @param mixed $value
+     * @param array<string,int> $declared
+     * @param array<string,array{status:int,body:mixed}> $outputs
+     * @return mixed
+     */
+    private function resolve($value, array $declared, array $outputs, int $index)
+    {
+        if (is_array($value)) {
+            foreach ($value as $k => $v) {
+                $value[$k] = $this->resolve($v, $declared, $outputs, $index);
+            }
+            return $value;
+        }
+        if (!is_string($value) || strpos($value, '$') === false) {
+            return $value;
+        }
+        if (preg_match(self::REF_PATTERN, $value, $m) && $m[0] === $value) {
+            $found = $this->lookup($m[1], $m[2], $declared, $outputs, $index);
+            return $found[0] ? $found[1] : $value;
+        }
+        return preg_replace_callback(self::REF_PATTERN, function (array $m) use ($declared, $outputs, $index) {
+            $found = $this->lookup($m[1], $m[2], $declared, $outputs, $index);
+            if (!$found[0]) {
+                return $m[0];
+            }
+            if (!is_scalar($found[1]) && $found[1] !== null) {
+                throw new RuntimeException("Reference {$m[0]} is not a scalar", 400);
+            }
+            return (string) $found[1];
+        }, $value);
+    }
+
+    /**
+     * @param array<string,int> $declared
+     * @param array<string,array{status:int,body:mixed}> $outputs
+     * @return array{0:bool,1:mixed} [is a batch reference, value]
+     */
+    private function lookup(string $ref, string $dotted, array $declared, array $outputs, int $index): array
+    {
+        if (!isset($declared[$ref])) {
+            // Not a batch ref (e.g. literal text containing "$"); leave as-is.
+            return [false, null];
+        }
+        if ($declared[$ref] >= $index) {
+            throw new RuntimeException("Reference \${$ref} is used before its operation runs", 400);
+        }
+        $output = $outputs[$ref] ?? null;
+        if ($output === null || $output['status'] >= 400) {
+            throw new RuntimeException("Referenced operation '{$ref}' failed", self::STATUS_SKIPPED);
+        }
+        $value = $output['body'];
+        foreach (explode('.', ltrim($dotted, '.')) as $key) {
+            if (!is_array($value) || !array_key_exists($key, $value)) {
+                throw new RuntimeException("Reference \${$ref}{$dotted} not found in response", 400);
+            }
+            $value = $value[$key];
+        }
+        return [true, $value];
+    }
+
+    /** @return array{status:int,body:array{error:string,code:int}} */
+    private function skipped(string $message): array
+    {
+        return ['status' => self::STATUS_SKIPPED, 'body' => ['error' => $message, 'code' => self::STATUS_SKIPPED]];
+    }
+}
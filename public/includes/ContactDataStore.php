@@ -17,6 +17,15 @@ class ContactDataStore
         'email', 'phone', 'name', 'address', 'social', 'employer', 'username', 'other',
     ];
 
+    /** contact_data_payloads.encoding values. */
+    public const PAYLOAD_DEFLATE = 'deflate';
+    public const PAYLOAD_PLAIN = 'json';
+
+    /** Default retention: raw payloads older than this are pruned... */
+    public const RETENTION_KEEP_DAYS = 180;
+    /** ...except the newest N runs per contact + source, which always keep theirs. */
+    public const RETENTION_KEEP_LATEST = 1;
+
     private Database $db;
 
     public function __construct(?Database $db = null)
@@ -63,6 +72,58 @@ class ContactDataStore
         $pdo->exec('CREATE INDEX IF NOT EXISTS idx_contact_data_facts_type ON contact_data_facts(fact_type)');
         $pdo->exec('CREATE INDEX IF NOT EXISTS idx_contact_data_facts_value ON contact_data_facts(value)');
 
+        // Content-addressed raw payloads: identical responses are stored once, compressed.
+        $pdo->exec("
+            CREATE TABLE IF NOT EXISTS contact_data_payloads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sha256 CHAR(64) NOT NULL UNIQUE,
+                encoding VARCHAR(10) NOT NULL,
+                body BLOB NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                stored_bytes INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ");
+        $this->ensureColumns('contact_data_runs', [
+            'payload_id' => 'INTEGER',
+            'raw_bytes' => 'INTEGER',
+            'payload_pruned_at' => 'DATETIME',
+        ]);
+        $this->ensureColumns('contact_data_facts', [
+            'first_seen_at' => 'DATETIME',
+            'last_seen_at' => 'DATETIME',
+            'last_run_id' => 'INTEGER',
+            'seen_count' => 'INTEGER DEFAULT 1',
+        ]);
+        $pdo->exec('CREATE INDEX IF NOT EXISTS idx_contact_data_runs_payload ON contact_data_runs(payload_id)');
+        // Covers insertFact()'s lookup (contact + type + value + source).
+        $pdo->exec('CREATE INDEX IF NOT EXISTS idx_contact_data_facts_dedup ON contact_data_facts(contact_id, fact_type, value, source)');
+
+        // Which facts each run returned: a deduplicated fact row only remembers its
+        // first and last run, so getRun() of a run in between reads this instead.
+        $hadRunFacts = (bool) $pdo->querySingle(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contact_data_run_facts'"
+        );
+        $pdo->exec("
+            CREATE TABLE IF NOT EXISTS contact_data_run_facts (
+                run_id INTEGER NOT NULL,
+                fact_id INTEGER NOT NULL,
+                PRIMARY KEY (run_id, fact_id),
+                FOREIGN KEY (run_id) REFERENCES contact_data_runs(id) ON DELETE CASCADE,
+                FOREIGN KEY (fact_id) REFERENCES contact_data_facts(id) ON DELETE CASCADE
+            )
+        ");
+        $pdo->exec('CREATE INDEX IF NOT EXISTS idx_contact_data_run_facts_fact ON contact_data_run_facts(fact_id)');
+        if (!$hadRunFacts) {
+            // Backfill what the fact rows still know (first and last run).
+            $pdo->exec(
+                'INSERT OR IGNORE INTO contact_data_run_facts (run_id, fact_id)
+                 SELECT run_id, id FROM contact_data_facts WHERE run_id IS NOT NULL
+                 UNION
+                 SELECT last_run_id, id FROM contact_data_facts WHERE last_run_id IS NOT NULL'
+            );
+        }
+
         // No FKs: accepted merges delete the absorbed contact; CASCADE would wipe the audit row.
         $pdo->exec("
             CREATE TABLE IF NOT EXISTS contact_merge_candidates (
@@ -90,6 +151,17 @@ class ContactDataStore
         $pdo->exec('CREATE INDEX IF NOT EXISTS idx_merge_candidates_survivor ON contact_merge_candidates(survivor_id)');
     }
 
+    /** @param array<string,string> $columns name => definition */
+    private function ensureColumns(string $table, array $columns): void
+    {
+        $existing = array_column($this->db->getTableInfo($table), 'name');
+        foreach ($columns as $name => $def) {
+            if (!in_array($name, $existing, true)) {
+                $this->db->getConnection()->exec("ALTER TABLE {$table} ADD COLUMN {$name} {$def}");
+            }
+        }
+    }
+
     /** One-time rebuild if an earlier schema linked candidates to contacts with CASCADE. */
     private function rebuildMergeCandidatesWithoutFk(\SQLite3 $pdo): void
     {
@@ -136,7 +208,7 @@ class ContactDataStore
 
     /**
      * @param array{source?:string,outcome?:?string,label?:?string,actor_user_id?:?int,raw_payload?:mixed,facts?:list<array>} $run
-     * @return array{run_id:int,fact_count:int}
+     * @return array{run_id:int,fact_count:int,new_fact_count:int,payload_id:int}
      */
     public function recordRun(int $contactId, array $run): array
     {
@@ -155,39 +227,71 @@ class ContactDataStore
             $rawJson = '{}';
         }
 
-        $now = gmdate('Y-m-d H:i:s');
-        $this->db->insert('contact_data_runs', [
-            'contact_id' => $contactId,
-            'source' => $source,
-            'outcome' => $this->nullableTrim($run['outcome'] ?? null),
-            'label' => $this->nullableTrim($run['label'] ?? null, 120),
-            'actor_user_id' => isset($run['actor_user_id']) ? (int) $run['actor_user_id'] : null,
-            'raw_payload' => $rawJson,
-            'created_at' => $now,
-        ]);
-        $runId = (int) $this->db->getLastInsertId();
-
         $factsIn = $run['facts'] ?? [];
         if (!is_array($factsIn)) {
             $factsIn = [];
         }
         $factCount = 0;
-        foreach ($factsIn as $fact) {
-            if (!is_array($fact)) {
-                continue;
-            }
-            if ($this->insertFact($contactId, $runId, $source, $fact, $now)) {
-                $factCount++;
+        $newFactCount = 0;
+        $now = gmdate('Y-m-d H:i:s');
+
+        // storePayload() may hand back an existing payload no run references yet;
+        // the run must land in the same transaction or deleteOrphanPayloads() can
+        // remove it in between. SAVEPOINT nests inside callers' transactions (merges).
+        $sqlite = $this->db->getConnection();
+        if ($sqlite->exec('SAVEPOINT contact_data_run') === false) {
+            throw new Exception('Failed to start run transaction: ' . $sqlite->lastErrorMsg());
+        }
+        try {
+            $payloadId = $this->storePayload($rawJson);
+            $this->db->insert('contact_data_runs', [
+                'contact_id' => $contactId,
+                'source' => $source,
+                'outcome' => $this->nullableTrim($run['outcome'] ?? null),
+                'label' => $this->nullableTrim($run['label'] ?? null, 120),
+                'actor_user_id' => isset($run['actor_user_id']) ? (int) $run['actor_user_id'] : null,
+                'raw_payload' => '',
+                'payload_id' => $payloadId,
+                'raw_bytes' => strlen($rawJson),
+                'created_at' => $now,
+            ]);
+            $runId = (int) $this->db->getLastInsertId();
+
+            foreach ($factsIn as $fact) {
+                if (!is_array($fact)) {
+                    continue;
+                }
+                $written = $this->insertFact($contactId, $runId, $source, $fact, $now);
+                if ($written !== null) {
+                    $factCount++;
+                    if ($written) {
+                        $newFactCount++;
+                    }
+                }
             }
+            $sqlite->exec('RELEASE contact_data_run');
+        } catch (Throwable $e) {
+            $sqlite->exec('ROLLBACK TO contact_data_run');
+            $sqlite->exec('RELEASE contact_data_run');
+            throw $e;
         }
 
-        return ['run_id' => $runId, 'fact_count' => $factCount];
+        return [
+            'run_id' => $runId,
+            'fact_count' => $factCount,
+            'new_fact_count' => $newFactCount,
+            'payload_id' => $payloadId,
+        ];
     }
 
     /**
+     * Insert a fact, or bump last_seen_at/seen_count when this contact already
+     * has the same source + type + value from an earlier run.
+     *
      * @param array{fact_type?:string,value?:mixed,label?:?string,confidence?:?float,meta?:mixed,meta_json?:mixed} $fact
+     * @return ?bool true = new row, false = existing fact re-seen, null = skipped (empty value)
      */
-    private function insertFact(int $contactId, int $runId, string $source, array $fact, string $now): bool
+    private function insertFact(int $contactId, int $runId, string $source, array $fact, string $now): ?bool
     {
         $type = strtolower(trim((string) ($fact['fact_type'] ?? $fact['type'] ?? 'other')));
         if (!in_array($type, self::FACT_TYPES, true)) {
@@ -199,7 +303,7 @@ class ContactDataStore
         }
         $value = trim((string) $value);
         if ($value === '') {
-            return false;
+            return null;
         }
 
         $meta = $fact['meta'] ?? $fact['meta_json'] ?? null;
@@ -212,6 +316,25 @@ class ContactDataStore
             }
         }
 
+        $confidence = isset($fact['confidence']) ? (float) $fact['confidence'] : null;
+        $existing = $this->db->fetchOne(
+            'SELECT id FROM contact_data_facts
+             WHERE contact_id = ? AND fact_type = ? AND value = ? AND source = ?
+             ORDER BY id ASC LIMIT 1',
+            [$contactId, $type, $value, $source]
+        );
+        if ($existing) {
+            $this->db->query(
+                'UPDATE contact_data_facts
+                 SET last_seen_at = ?, last_run_id = ?, seen_count = COALESCE(seen_count, 1) + 1,
+                     confidence = COALESCE(?, confidence), meta_json = COALESCE(?, meta_json)
+                 WHERE id = ?',
+                [$now, $runId, $confidence, $metaJson, (int) $existing['id']]
+            );
+            $this->linkFact($runId, (int) $existing['id']);
+            return false;
+        }
+
         $this->db->insert('contact_data_facts', [
             'contact_id' => $contactId,
             'run_id' => $runId,
@@ -219,13 +342,96 @@ class ContactDataStore
             'fact_type' => $type,
             'value' => $value,
             'label' => $this->nullableTrim($fact['label'] ?? null, 120),
-            'confidence' => isset($fact['confidence']) ? (float) $fact['confidence'] : null,
+            'confidence' => $confidence,
             'meta_json' => $metaJson,
+            'first_seen_at' => $now,
+            'last_seen_at' => $now,
+            'last_run_id' => $runId,
+            'seen_count' => 1,
             'created_at' => $now,
         ]);
+        $this->linkFact($runId, (int) $this->db->getLastInsertId());
         return true;
     }
 
+    private function linkFact(int $runId, int $factId): void
+    {
+        $this->db->query(
+            'INSERT OR IGNORE INTO contact_data_run_facts (run_id, fact_id) VALUES (?, ?)',
+            [$runId, $factId]
+        );
+    }
+
+    /** Store (or find) a payload by content hash; returns contact_data_payloads.id. */
+    private function storePayload(string $json): int
+    {
+        $hash = hash('sha256', $json);
+        $existing = $this->db->fetchOne('SELECT id FROM contact_data_payloads WHERE sha256 = ?', [$hash]);
+        if ($existing) {
+            return (int) $existing['id'];
+        }
+        [$encoding, $body] = $this->encodePayload($json);
+        $stmt = $this->db->getConnection()->prepare(
+            'INSERT OR IGNORE INTO contact_data_payloads
+                (sha256, encoding, body, raw_bytes, stored_bytes, created_at)
+             VALUES (?, ?, ?, ?, ?, ?)'
+        );
+        if ($stmt === false) {
+            throw new Exception('Failed to prepare payload insert: ' . $this->db->getConnection()->lastErrorMsg());
+        }
+        $stmt->bindValue(1, $hash, SQLITE3_TEXT);
+        $stmt->bindValue(2, $encoding, SQLITE3_TEXT);
+        $stmt->bindValue(3, $body, SQLITE3_BLOB);
+        $stmt->bindValue(4, strlen($json), SQLITE3_INTEGER);
+        $stmt->bindValue(5, strlen($body), SQLITE3_INTEGER);
+        $stmt->bindValue(6, gmdate('Y-m-d H:i:s'), SQLITE3_TEXT);
+        if ($stmt->execute() === false) {
+            throw new Exception('Payload insert failed: ' . $this->db->getConnection()->lastErrorMsg());
+        }
+        $row = $this->db->fetchOne('SELECT id FROM contact_data_payloads WHERE sha256 = ?', [$hash]);
+        return (int) ($row['id'] ?? 0);
+    }
+
+    /** @return array{0:string,1:string} [encoding, body] — zlib is optional; falls back to plain JSON. */
+    private function encodePayload(string $json): array
+    {
+        if (function_exists('gzdeflate')) {
+            $compressed = gzdeflate($json, 6);
+            if ($compressed !== false && strlen($compressed) < strlen($json)) {
+                return [self::PAYLOAD_DEFLATE, $compressed];
+            }
+        }
+        return [self::PAYLOAD_PLAIN, $json];
+    }
+
+    private function decodePayload(string $encoding, string $body): ?string
+    {
+        if ($encoding === self::PAYLOAD_DEFLATE) {
+            if (!function_exists('gzinflate')) {
+                return null;
+            }
+            $json = gzinflate($body);
+            return $json === false ? null : $json;
+        }
+        return $body;
+    }
+
+    /** Raw JSON for a run row: payload store first, legacy inline text second. */
+    private function rawJsonForRun(array $row): ?string
+    {
+        if (!empty($row['payload_id'])) {
+            $payload = $this->db->fetchOne(
+                'SELECT encoding, body FROM contact_data_payloads WHERE id = ?',
+                [(int) $row['payload_id']]
+            );
+            if ($payload) {
+                return $this->decodePayload((string) $payload['encoding'], (string) $payload['body']);
+            }
+        }
+        $inline = (string) ($row['raw_payload'] ?? '');
+        return $inline === '' ? null : $inline;
+    }
+
     /**
      * @return list<array>
      */
@@ -235,7 +441,7 @@ class ContactDataStore
         if ($source !== null && $source !== '') {
             $rows = $this->db->fetchAll(
                 'SELECT id, contact_id, source, outcome, label, actor_user_id, created_at,
-                        LENGTH(raw_payload) AS raw_bytes
+                        COALESCE(raw_bytes, LENGTH(raw_payload)) AS raw_bytes, payload_pruned_at
                  FROM contact_data_runs
                  WHERE contact_id = ? AND source = ?
                  ORDER BY id DESC LIMIT ?',
@@ -244,7 +450,7 @@ class ContactDataStore
         } else {
             $rows = $this->db->fetchAll(
                 'SELECT id, contact_id, source, outcome, label, actor_user_id, created_at,
-                        LENGTH(raw_payload) AS raw_bytes
+                        COALESCE(raw_bytes, LENGTH(raw_payload)) AS raw_bytes, payload_pruned_at
                  FROM contact_data_runs
                  WHERE contact_id = ?
                  ORDER BY id DESC LIMIT ?',
@@ -263,20 +469,27 @@ class ContactDataStore
         if (!$row) {
             return null;
         }
-        $decoded = json_decode((string) ($row['raw_payload'] ?? ''), true);
-        $row['raw'] = $decoded ?? $row['raw_payload'];
+        $rawJson = $this->rawJsonForRun($row);
+        $row['raw_payload'] = $rawJson ?? '';
+        $decoded = $rawJson === null ? null : json_decode($rawJson, true);
+        $row['raw'] = $decoded ?? $rawJson;
         $row['facts'] = $this->listFactsForRun($contactId, $runId);
         return $row;
     }
 
     /**
+     * Facts this run returned, whether new or re-seen (contact_data_run_facts).
+     *
      * @return list<array>
      */
     public function listFactsForRun(int $contactId, int $runId): array
     {
         $rows = $this->db->fetchAll(
-            'SELECT * FROM contact_data_facts WHERE contact_id = ? AND run_id = ? ORDER BY id ASC',
-            [$contactId, $runId]
+            'SELECT f.* FROM contact_data_run_facts l
+             JOIN contact_data_facts f ON f.id = l.fact_id
+             WHERE l.run_id = ? AND f.contact_id = ?
+             ORDER BY f.id ASC',
+            [$runId, $contactId]
         );
         return is_array($rows) ? $rows : [];
     }
@@ -446,6 +659,297 @@ class ContactDataStore
         return $result['run_id'];
     }
 
+    /**
+     * Retention + compaction pass (cron/contact_data_maintenance.php). Each step
+     * works in bounded batches so it can run alongside normal traffic.
+     *
+     * @param array{keep_days?:int,keep_latest?:int,batch?:int,vacuum_pages?:int,convert_vacuum?:bool,dry_run?:bool} $opts
+     * @return array<string,mixed>
+     */
+    public function runMaintenance(array $opts = []): array
+    {
+        $keepDays = max(0, (int) ($opts['keep_days'] ?? self::RETENTION_KEEP_DAYS));
+        $keepLatest = max(0, (int) ($opts['keep_latest'] ?? self::RETENTION_KEEP_LATEST));
+        $batch = max(1, (int) ($opts['batch'] ?? 500));
+        $dryRun = !empty($opts['dry_run']);
+
+        $report = [
+            'dry_run' => $dryRun,
+            'keep_days' => $keepDays,
+            'keep_latest' => $keepLatest,
+        ];
+        if ($dryRun) {
+            $report['runs_to_prune'] = $this->countPrunableRuns($keepDays, $keepLatest);
+            $report['legacy_payloads'] = (int) ($this->db->fetchOne(
+                "SELECT COUNT(*) AS c FROM contact_data_runs WHERE payload_id IS NULL AND raw_payload != ''"
+            )['c'] ?? 0);
+            return $report;
+        }
+
+        $compacted = $this->compactLegacyPayloads($batch);
+        $deduped = $this->dedupeFacts($batch);
+        $pruned = $this->applyRetention($keepDays, $keepLatest, $batch);
+        $orphans = $this->deleteOrphanPayloads($batch);
+        $vacuum = $this->incrementalVacuum(
+            (int) ($opts['vacuum_pages'] ?? 0),
+            !empty($opts['convert_vacuum'])
+        );
+
+        return $report + [
+            'payloads_compacted' => $compacted['runs'],
+            'facts_merged' => $deduped,
+            'runs_pruned' => $pruned['runs'],
+            'payloads_deleted' => $orphans['payloads'],
+            'logical_bytes_reclaimed' => $compacted['bytes_saved'] + $pruned['inline_bytes'] + $orphans['bytes'],
+            'vacuum' => $vacuum,
+            'file_bytes_reclaimed' => $vacuum['bytes_reclaimed'],
+        ];
+    }
+
+    /**
+     * Move inline raw_payload text from before the payload store into it.
+     *
+     * @return array{runs:int,bytes_saved:int}
+     */
+    public function compactLegacyPayloads(int $limit = 500): array
+    {
+        $rows = $this->db->fetchAll(
+            "SELECT id, raw_payload FROM contact_data_runs
+             WHERE payload_id IS NULL AND raw_payload != ''
+             ORDER BY id ASC LIMIT ?",
+            [max(1, $limit)]
+        );
+        $saved = 0;
+        $this->db->beginTransaction();
+        try {
+            foreach ($rows as $row) {
+                $raw = (string) $row['raw_payload'];
+                $known = $this->db->fetchOne(
+                    'SELECT stored_bytes FROM contact_data_payloads WHERE sha256 = ?',
+                    [hash('sha256', $raw)]
+                );
+                $payloadId = $this->storePayload($raw);
+                $stored = $known ? 0 : (int) ($this->db->fetchOne(
+                    'SELECT stored_bytes FROM contact_data_payloads WHERE id = ?',
+                    [$payloadId]
+                )['stored_bytes'] ?? 0);
+                $this->db->update(
+                    'contact_data_runs',
+                    ['payload_id' => $payloadId, 'raw_bytes' => strlen($raw), 'raw_payload' => ''],
+                    'id = ?',
+                    [(int) $row['id']]
+                );
+                $saved += strlen($raw) - $stored;
+            }
+            $this->db->commit();
+        } catch (Exception $e) {
+            $this->db->rollback();
+            throw $e;
+        }
+        return ['runs' => count($rows), 'bytes_saved' => max(0, $saved)];
+    }
+
+    /**
+     * Collapse duplicate fact rows written before per-run dedup existed.
+     * Keeps the oldest row, carrying first/last seen and the occurrence count.
+     *
+     * @return int Duplicate rows removed
+     */
+    public function dedupeFacts(int $limit = 500): int
+    {
+        $groups = $this->db->fetchAll(
+            'SELECT MIN(id) AS keep_id, MAX(id) AS last_id, COUNT(*) AS n,
+                    MIN(created_at) AS first_seen, MAX(created_at) AS last_seen,
+                    contact_id, source, fact_type, value
+             FROM contact_data_facts
+             GROUP BY contact_id, source, fact_type, value
+             HAVING COUNT(*) > 1
+             LIMIT ?',
+            [max(1, $limit)]
+        );
+        $removed = 0;
+        $this->db->beginTransaction();
+        try {
+            foreach ($groups as $g) {
+                $seen = (int) ($this->db->fetchOne(
+                    'SELECT SUM(COALESCE(seen_count, 1)) AS n FROM contact_data_facts
+                     WHERE contact_id = ? AND source = ? AND fact_type = ? AND value = ?',
+                    [(int) $g['contact_id'], $g['source'], $g['fact_type'], $g['value']]
+                )['n'] ?? $g['n']);
+                $this->db->query(
+                    'UPDATE contact_data_facts
+                     SET first_seen_at = ?, last_seen_at = ?, seen_count = ?,
+                         last_run_id = (SELECT COALESCE(last_run_id, run_id) FROM contact_data_facts WHERE id = ?)
+                     WHERE id = ?',
+                    [$g['first_seen'], $g['last_seen'], $seen, (int) $g['last_id'], (int) $g['keep_id']]
+                );
+                $this->db->query(
+                    'INSERT OR IGNORE INTO contact_data_run_facts (run_id, fact_id)
+                     SELECT l.run_id, ? FROM contact_data_run_facts l
+                     JOIN contact_data_facts f ON f.id = l.fact_id
+                     WHERE f.contact_id = ? AND f.source = ? AND f.fact_type = ? AND f.value = ? AND f.id != ?',
+                    [(int) $g['keep_id'], (int) $g['contact_id'], $g['source'], $g['fact_type'], $g['value'], (int) $g['keep_id']]
+                );
+                $this->db->delete(
+                    'contact_data_facts',
+                    'contact_id = ? AND source = ? AND fact_type = ? AND value = ? AND id != ?',
+                    [(int) $g['contact_id'], $g['source'], $g['fact_type'], $g['value'], (int) $g['keep_id']]
+                );
+                $removed += (int) $g['n'] - 1;
+            }
+            $this->db->commit();
+        } catch (Exception $e) {
+            $this->db->rollback();
+            throw $e;
+        }
+        return $removed;
+    }
+
+    /**
+     * Drop raw payloads from runs older than $keepDays, except the newest
+     * $keepLatest runs per contact + source. Run rows and facts are kept —
+     * only the blob reference goes (payload_pruned_at records when).
+     * Works through the runs in id order, $batch per statement.
+     *
+     * @return array{runs:int,inline_bytes:int}
+     */
+    public function applyRetention(int $keepDays, int $keepLatest, int $batch = 500): array
+    {
+        [$where, $params] = $this->prunableRunsClause($keepDays, $keepLatest);
+        $batch = max(1, $batch);
+        $runs = 0;
+        $inline = 0;
+        $lastId = 0;
+        do {
+            $rows = $this->db->fetchAll(
+                "SELECT id, LENGTH(raw_payload) AS inline_bytes FROM contact_data_runs
+                 WHERE {$where} AND contact_data_runs.id > ?
+                 ORDER BY contact_data_runs.id ASC LIMIT ?",
+                array_merge($params, [$lastId, $batch])
+            );
+            if ($rows === []) {
+                break;
+            }
+            $ids = array_map(static fn($r) => (int) $r['id'], $rows);
+            $this->db->query(
+                "UPDATE contact_data_runs
+                 SET payload_id = NULL, raw_payload = '', payload_pruned_at = ?
+                 WHERE id IN (" . implode(',', array_fill(0, count($ids), '?')) . ')',
+                array_merge([gmdate('Y-m-d H:i:s')], $ids)
+            );
+            $runs += $this->db->getConnection()->changes();
+            $inline += array_sum(array_map(static fn($r) => (int) $r['inline_bytes'], $rows));
+            $lastId = end($ids);
+        } while (count($rows) === $batch);
+        return ['runs' => $runs, 'inline_bytes' => $inline];
+    }
+
+    /**
+     * Delete payloads no run references, $batch per write transaction.
+     *
+     * @return array{payloads:int,bytes:int}
+     */
+    public function deleteOrphanPayloads(int $batch = 500): array
+    {
+        $orphanWhere = 'NOT EXISTS (
+            SELECT 1 FROM contact_data_runs r WHERE r.payload_id = contact_data_payloads.id
+        )';
+        $batch = max(1, $batch);
+        $sqlite = $this->db->getConnection();
+        $payloads = 0;
+        $bytes = 0;
+        $lastId = 0;
+        do {
+            // Write lock first: recordRun() may be about to reference one of these.
+            $sqlite->exec('BEGIN IMMEDIATE');
+            try {
+                $rows = $this->db->fetchAll(
+                    "SELECT id, stored_bytes FROM contact_data_payloads
+                     WHERE {$orphanWhere} AND id > ?
+                     ORDER BY id ASC LIMIT ?",
+                    [$lastId, $batch]
+                );
+                if ($rows !== []) {
+                    $ids = array_map(static fn($r) => (int) $r['id'], $rows);
+                    $this->db->query(
+                        'DELETE FROM contact_data_payloads WHERE id IN ('
+                            . implode(',', array_fill(0, count($ids), '?')) . ')',
+                        $ids
+                    );
+                    $payloads += count($ids);
+                    $bytes += array_sum(array_map(static fn($r) => (int) $r['stored_bytes'], $rows));
+                    $lastId = end($ids);
+                }
+                $this->db->commit();
+            } catch (Exception $e) {
+                $this->db->rollback();
+                throw $e;
+            }
+        } while (count($rows) === $batch);
+        return ['payloads' => $payloads, 'bytes' => $bytes];
+    }
+
+    /**
+     * Return free pages to the filesystem. Only possible in auto_vacuum=INCREMENTAL;
+     * $convert switches the database over with a one-off full VACUUM.
+     *
+     * @return array{mode:string,pages_freed:int,bytes_reclaimed:int,freelist_pages:int,note?:string}
+     */
+    public function incrementalVacuum(int $maxPages = 0, bool $convert = false): array
+    {
+        $sqlite = $this->db->getConnection();
+        $pageSize = (int) $sqlite->querySingle('PRAGMA page_size');
+        $before = (int) $sqlite->querySingle('PRAGMA page_count');
+        $mode = (int) $sqlite->querySingle('PRAGMA auto_vacuum');
+        $modes = [0 => 'none', 1 => 'full', 2 => 'incremental'];
+
+        if ($mode !== 2) {
+            if (!$convert) {
+                return [
+                    'mode' => $modes[$mode] ?? (string) $mode,
+                    'pages_freed' => 0,
+                    'bytes_reclaimed' => 0,
+                    'freelist_pages' => (int) $sqlite->querySingle('PRAGMA freelist_count'),
+                    'note' => 'auto_vacuum is not INCREMENTAL; run once with --convert-vacuum',
+                ];
+            }
+            $sqlite->exec('PRAGMA auto_vacuum = INCREMENTAL');
+            $sqlite->exec('VACUUM');
+        } else {
+            $sqlite->exec($maxPages > 0 ? "PRAGMA incremental_vacuum({$maxPages})" : 'PRAGMA incremental_vacuum');
+        }
+
+        $after = (int) $sqlite->querySingle('PRAGMA page_count');
+        $freed = max(0, $before - $after);
+        return [
+            'mode' => 'incremental',
+            'pages_freed' => $freed,
+            'bytes_reclaimed' => $freed * $pageSize,
+            'freelist_pages' => (int) $sqlite->querySingle('PRAGMA freelist_count'),
+        ];
+    }
+
+    private function countPrunableRuns(int $keepDays, int $keepLatest): int
+    {
+        [$where, $params] = $this->prunableRunsClause($keepDays, $keepLatest);
+        $row = $this->db->fetchOne("SELECT COUNT(*) AS c FROM contact_data_runs WHERE {$where}", $params);
+        return (int) ($row['c'] ?? 0);
+    }
+
+    /** @return array{0:string,1:list<mixed>} WHERE clause over contact_data_runs */
+    private function prunableRunsClause(int $keepDays, int $keepLatest): array
+    {
+        $cutoff = gmdate('Y-m-d H:i:s', time() - $keepDays * 86400);
+        $where = "(contact_data_runs.payload_id IS NOT NULL OR contact_data_runs.raw_payload != '')
+            AND contact_data_runs.created_at < ?
+            AND contact_data_runs.id NOT IN (
+                SELECT r2.id FROM contact_data_runs r2
+                WHERE r2.contact_id = contact_data_runs.contact_id AND r2.source = contact_data_runs.source
+                ORDER BY r2.id DESC LIMIT ?
+            )";
+        return [$where, [$cutoff, $keepLatest]];
+    }
+
     private function nullableTrim($v, ?int $max = null): ?string
     {
         if ($v === null) {
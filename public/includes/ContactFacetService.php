@@ -0,0 +1,286 @@
+<?php
+/**
+ * Precomputed contact facet counts (source, type, status, enrichment, tags).
+ * Sanctum CRM
+ *
+ * SQLite triggers on contacts / contact_tags keep contact_facet_counts current
+ * on every write path (UI, API, import, merge, enrichment cron), so filter
+ * dropdowns read O(distinct values) rows instead of scanning contacts.
+ */
+
+if (!defined('CRM_LOADED')) {
+    die('Direct access not permitted');
+}
+
+class ContactFacetService
+{
+    /** Facet name => contacts column. Tags come from contact_tags. */
+    public const COLUMN_FACETS = [
+        'source' => 'source',
+        'contact_type' => 'contact_type',
+        'contact_status' => 'contact_status',
+        'enrichment_status' => 'enrichment_status',
+    ];
+    public const FACET_TAG = 'tag';
+    /** Row holding the unfiltered contact count (value ''). */
+    public const FACET_TOTAL = '_total';
+
+    private Database $db;
+
+    public function __construct(?Database $db = null)
+    {
+        $this->db = $db ?? Database::getInstance();
+    }
+
+    /** Table + triggers; schema is owned by tools/migrate.php (see 20261019_001_contact_facets). */
+    public function ensureSchema(): void
+    {
+        $sqlite = $this->db->getConnection();
+        $sqlite->exec(
+            "CREATE TABLE IF NOT EXISTS contact_facet_counts (
+                facet VARCHAR(32) NOT NULL,
+                value VARCHAR(100) NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (facet, value)
+            )"
+        );
+
+        $inc = [$this->bumpSql(self::FACET_TOTAL, "''", 1)];
+        $dec = [$this->bumpSql(self::FACET_TOTAL, "''", -1)];
+        foreach (self::COLUMN_FACETS as $facet => $column) {
+            $inc[] = $this->bumpSql($facet, "COALESCE(NEW.{$column}, '')", 1);
+            $dec[] = $this->bumpSql($facet, "COALESCE(OLD.{$column}, '')", -1);
+        }
+        $this->createTrigger('contact_facets_ai', 'AFTER INSERT ON contacts', $inc);
+        $this->createTrigger('contact_facets_ad', 'AFTER DELETE ON contacts', $dec);
+        foreach (self::COLUMN_FACETS as $facet => $column) {
+            $this->createTrigger(
+                "contact_facets_au_{$facet}",
+                "AFTER UPDATE OF {$column} ON contacts
+                 WHEN COALESCE(OLD.{$column}, '') IS NOT COALESCE(NEW.{$column}, '')",
+                [
+                    $this->bumpSql($facet, "COALESCE(OLD.{$column}, '')", -1),
+                    $this->bumpSql($facet, "COALESCE(NEW.{$column}, '')", 1),
+                ]
+            );
+        }
+        $this->createTrigger(
+            'contact_facets_tag_ai',
+            'AFTER INSERT ON contact_tags',
+            [$this->bumpSql(self::FACET_TAG, 'NEW.tag', 1)]
+        );
+        $this->createTrigger(
+            'contact_facets_tag_ad',
+            'AFTER DELETE ON contact_tags',
+            [$this->bumpSql(self::FACET_TAG, 'OLD.tag', -1)]
+        );
+    }
+
+    /** Table and every trigger present; without the triggers the stored counts go stale. */
+    public function isAvailable(): bool
+    {
+        $triggers = $this->triggerNames();
+        $placeholders = implode(', ', array_fill(0, count($triggers), '?'));
+        $row = $this->db->fetchOne(
+            "SELECT COUNT(*) AS n FROM sqlite_master
+             WHERE (type = 'table' AND name = 'contact_facet_counts')
+                OR (type = 'trigger' AND name IN ({$placeholders}))",
+            $triggers
+        );
+        return (int) ($row['n'] ?? 0) === count($triggers) + 1;
+    }
+
+    /** @return list<string> */
+    private function triggerNames(): array
+    {
+        $names = ['contact_facets_ai', 'contact_facets_ad', 'contact_facets_tag_ai', 'contact_facets_tag_ad'];
+        foreach (array_keys(self::COLUMN_FACETS) as $facet) {
+            $names[] = "contact_facets_au_{$facet}";
+        }
+        return $names;
+    }
+
+    /**
+     * Recount from scratch (initial backfill, or repair after writes that
+     * bypassed triggers such as a restore from an older dump). Pass false when
+     * already inside a transaction (migrations).
+     */
+    public function rebuild(bool $useTransaction = true): void
+    {
+        if ($useTransaction) {
+            $this->db->beginTransaction();
+        }
+        try {
+            $this->db->query('DELETE FROM contact_facet_counts');
+            $this->db->query(
+                "INSERT INTO contact_facet_counts (facet, value, count)
+                 SELECT ?, '', COUNT(*) FROM contacts",
+                [self::FACET_TOTAL]
+            );
+            foreach (self::COLUMN_FACETS as $facet => $column) {
+                $this->db->query(
+                    "INSERT INTO contact_facet_counts (facet, value, count)
+                     SELECT ?, COALESCE({$column}, ''), COUNT(*) FROM contacts
+                     GROUP BY COALESCE({$column}, '')",
+                    [$facet]
+                );
+            }
+            $this->db->query(
+                'INSERT INTO contact_facet_counts (facet, value, count)
+                 SELECT ?, tag, COUNT(*) FROM contact_tags GROUP BY tag',
+                [self::FACET_TAG]
+            );
+            if ($useTransaction) {
+                $this->db->commit();
+            }
+        } catch (Exception $e) {
+            if ($useTransaction) {
+                $this->db->rollback();
+            }
+            throw $e;
+        }
+    }
+
+    /**
+     * All facets with counts, largest first. '' is the "no value" bucket.
+     * Before the migration has run, total and every count are null and only
+     * source and tag values are listed (see distinctRows()).
+     *
+     * @return array{total:?int,facets:array<string,list<array{value:string,count:?int}>>}
+     */
+    public function getFacets(): array
+    {
+        $available = $this->isAvailable();
+        $rows = $available
+            ? $this->db->fetchAll(
+                'SELECT facet, value, count FROM contact_facet_counts
+                 WHERE count > 0 ORDER BY facet, count DESC, value'
+            )
+            : $this->distinctRows();
+
+        $out = ['total' => $available ? 0 : null, 'facets' => []];
+        foreach (array_keys(self::COLUMN_FACETS) as $facet) {
+            $out['facets'][$facet] = [];
+        }
+        $out['facets'][self::FACET_TAG] = [];
+        foreach ($rows as $row) {
+            $facet = (string) $row['facet'];
+            if ($facet === self::FACET_TOTAL) {
+                $out['total'] = (int) $row['count'];
+                continue;
+            }
+            $out['facets'][$facet][] = [
+                'value' => (string) $row['value'],
+                'count' => $row['count'] === null ? null : (int) $row['count'],
+            ];
+        }
+        return $out;
+    }
+
+    /** @return array<string,?int> value => count for one facet */
+    public function countsFor(string $facet): array
+    {
+        $facets = $this->getFacets();
+        $out = [];
+        foreach ($facets['facets'][$facet] ?? [] as $row) {
+            $out[$row['value']] = $row['count'];
+        }
+        return $out;
+    }
+
+    /**
+     * Answer the contacts list COUNT(*) from the facet table when at most one
+     * list filter is active. Keys are the list query params (type, status,
+     * enrichment_status, source, tag) with the same 'null' conventions; any
+     * other non-empty key (q, email, ...) returns null so the caller runs SQL.
+     *
+     * @param array<string,mixed> $params
+     */
+    public function countForListFilters(array $params): ?int
+    {
+        $params = array_filter($params, static fn($v) => $v !== null && (string) $v !== '');
+        if (count($params) > 1 || !$this->isAvailable()) {
+            return null;
+        }
+        if ($params === []) {
+            return $this->storedCount(self::FACET_TOTAL, '');
+        }
+        $key = (string) array_key_first($params);
+        $value = (string) $params[$key];
+        switch ($key) {
+            case 'type':
+                return $this->storedCount('contact_type', $value) ?? 0;
+            case 'status':
+                return $this->storedCount('contact_status', $value) ?? 0;
+            case 'source':
+                return $this->storedCount('source', $value === 'null' ? '' : $value) ?? 0;
+            case 'tag':
+                return $this->storedCount(self::FACET_TAG, $value) ?? 0;
+            case 'enrichment_status':
+                if ($value !== 'null') {
+                    return $this->storedCount('enrichment_status', $value) ?? 0;
+                }
+                // "Not Enriched" = everything except enriched. The list WHERE clause
+                // trims, while buckets hold raw values, so ' enriched' counts as enriched too.
+                $total = $this->storedCount(self::FACET_TOTAL, '');
+                if ($total === null) {
+                    return null;
+                }
+                $enriched = $this->db->fetchOne(
+                    "SELECT COALESCE(SUM(count), 0) AS c FROM contact_facet_counts
+                     WHERE facet = 'enrichment_status' AND TRIM(value) = 'enriched'"
+                );
+                return $total - (int) ($enriched['c'] ?? 0);
+        }
+        return null;
+    }
+
+    private function storedCount(string $facet, string $value): ?int
+    {
+        $row = $this->db->fetchOne(
+            'SELECT count FROM contact_facet_counts WHERE facet = ? AND value = ?',
+            [$facet, $value]
+        );
+        return $row ? (int) $row['count'] : null;
+    }
+
+    /**
+     * Fallback before the migration has run: the source and tag dropdown
+     * values the page listed before facets existed, without counts, so no
+     * GROUP BY over contacts runs on every request.
+     */
+    private function distinctRows(): array
+    {
+        $rows = [];
+        foreach ($this->db->fetchAll(
+            "SELECT DISTINCT source AS value FROM contacts WHERE source IS NOT NULL AND source != '' ORDER BY source"
+        ) as $row) {
+            $rows[] = ['facet' => 'source', 'value' => $row['value'], 'count' => null];
+        }
+        foreach ($this->db->fetchAll('SELECT DISTINCT tag AS value FROM contact_tags ORDER BY tag') as $row) {
+            $rows[] = ['facet' => self::FACET_TAG, 'value' => $row['value'], 'count' => null];
+        }
+        return $rows;
+    }
+
+    /** Upsert without ON CONFLICT (older SQLite builds): seed the row, then adjust. */
+    private function bumpSql(string $facet, string $valueExpr, int $delta): string
+    {
+        $sql = '';
+        if ($delta > 0) {
+            $sql .= "INSERT OR IGNORE INTO contact_facet_counts (facet, value, count) VALUES ('{$facet}', {$valueExpr}, 0);\n";
+        }
+        $sql .= "UPDATE contact_facet_counts SET count = count + ({$delta})
+                 WHERE facet = '{$facet}' AND value = {$valueExpr};";
+        return $sql;
+    }
+
+    /** @param list<string> $statements */
+    private function createTrigger(string $name, string $event, array $statements): void
+    {
+        $this->db->getConnection()->exec("DROP TRIGGER IF EXISTS {$name}");
+        $this->db->getConnection()->exec(
+            "CREATE TRIGGER {$name} {$event}\nBEGIN\n" . implode("\n", $statements) . "\nEND"
+        );
+    }
+}
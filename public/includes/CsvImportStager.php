@@ -0,0 +1,465 @@
+<?php
+/**
+ * Server-side staged CSV import (upload → sample → map → chunked process).
+ * Sanctum CRM
+ *
+ * Uploads are streamed with fgetcsv into import_rows keyed by an import_jobs
+ * id, so neither PHP nor the browser ever holds the whole file. Processing
+ * walks the staged rows in short BEGIN IMMEDIATE chunks and records a cursor
+ * on the job, so an interrupted import resumes where it stopped and progress
+ * can be polled.
+ */
+
+if (!defined('CRM_LOADED')) {
+    die('Direct access not permitted');
+}
+
+class CsvImportStager
+{
+    public const STATUS_STAGED = 'staged';
+    public const STATUS_PROCESSING = 'processing';
+    public const STATUS_COMPLETED = 'completed';
+
+    public const ROW_IMPORTED = 'imported';
+    public const ROW_ERROR = 'error';
+
+    public const SAMPLE_ROWS = 5;
+    public const DEFAULT_CHUNK_SIZE = 200;
+    /** Rows per transaction while staging an upload. */
+    public const STAGE_BATCH_SIZE = 500;
+    /** Finished jobs (and their error report) and untouched staged uploads are kept this long. */
+    public const RETENTION_DAYS = 7;
+
+    private Database $db;
+
+    public function __construct(?Database $db = null)
+    {
+        $this->db = $db ?? Database::getInstance();
+    }
+
+    /** Tables; schema is owned by tools/migrate.php (see 20261019_002_csv_import_staging). */
+    public function ensureSchema(): void
+    {
+        $sqlite = $this->db->getConnection();
+        $sqlite->exec(
+            "CREATE TABLE IF NOT EXISTS import_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                filename VARCHAR(255),
+                headers TEXT NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                status VARCHAR(20) NOT NULL DEFAULT 'staged',
+                field_mapping TEXT,
+                options TEXT,
+                last_row INTEGER NOT NULL DEFAULT 0,
+                success_count INTEGER NOT NULL DEFAULT 0,
+                error_count INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                completed_at DATETIME
+            )"
+        );
+        $sqlite->exec(
+            "CREATE TABLE IF NOT EXISTS import_rows (
+                import_id INTEGER NOT NULL,
+                row_num INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                status VARCHAR(10),
+                message TEXT,
+                contact_id INTEGER,
+                PRIMARY KEY (import_id, row_num),
+                FOREIGN KEY (import_id) REFERENCES import_jobs(id) ON DELETE CASCADE
+            ) WITHOUT ROWID"
+        );
+        $sqlite->exec(
+            'CREATE INDEX IF NOT EXISTS idx_import_rows_status ON import_rows(import_id, status, row_num)'
+        );
+        $sqlite->exec('CREATE INDEX IF NOT EXISTS idx_import_jobs_created ON import_jobs(created_at)');
+    }
+
+    /**
+     * Stream a CSV file into staging. Rows are stored as JSON value lists
+     * against the header row; blank lines are skipped.
+     *
+     * @return array<string,mixed> job summary (see summary()) with a sample
+     */
+    public function stage(string $path, string $filename, ?int $userId = null): array
+    {
+        $handle = @fopen($path, 'r');
+        if ($handle === false) {
+            throw new RuntimeException('Failed to open CSV file');
+        }
+        try {
+            $headers = fgetcsv($handle);
+            if (!is_array($headers) || $headers === [null]) {
+                throw new InvalidArgumentException('CSV file has no header row');
+            }
+            $headers[0] = preg_replace('/^\xEF\xBB\xBF/', '', (string) $headers[0]);
+            $headers = array_map(static fn($h) => trim((string) $h), $headers);
+
+            $this->purgeExpired();
+            $ts = getCurrentTimestamp();
+            $importId = (int) $this->db->insert('import_jobs', [
+                'user_id' => $userId,
+                'filename' => mb_substr($filename, 0, 255),
+                'headers' => json_encode($headers),
+                'status' => self::STATUS_STAGED,
+                'created_at' => $ts,
+                'updated_at' => $ts,
+            ]);
+
+            $stmt = $this->db->getConnection()->prepare(
+                'INSERT INTO import_rows (import_id, row_num, data) VALUES (?, ?, ?)'
+            );
+            if (!$stmt) {
+                throw new RuntimeException('Failed to prepare staging insert');
+            }
+            $rowNum = 0;
+            $this->db->beginTransaction();
+            try {
+                while (($data = fgetcsv($handle)) !== false) {
+                    if ($data === [null]) {
+                        continue;
+                    }
+                    $rowNum++;
+                    $stmt->bindValue(1, $importId, SQLITE3_INTEGER);
+                    $stmt->bindValue(2, $rowNum, SQLITE3_INTEGER);
+                    $stmt->bindValue(3, json_encode(array_map(static fn($v) => (string) $v, $data)), SQLITE3_TEXT);
+                    if ($stmt->execute() === false) {
+                        throw new RuntimeException('Staging insert failed: ' . $this->db->getConnection()->lastErrorMsg());
+                    }
+                    $stmt->reset();
+                    if ($rowNum % self::STAGE_BATCH_SIZE === 0) {
+                        $this->db->commit();
+                        $this->db->beginTransaction();
+                    }
+                }
+                $this->db->update('import_jobs', ['row_count' => $rowNum], 'id = ?', [$importId]);
+                $this->db->commit();
+            } catch (Exception $e) {
+                $this->db->rollback();
+                $this->delete($importId);
+                throw $e;
+            }
+        } finally {
+            fclose($handle);
+        }
+
+        $summary = $this->summary($importId);
+        $summary['sample'] = $this->sample($importId);
+        return $summary;
+    }
+
+    /** @return array<string,mixed>|null raw job row, scoped to $userId when given */
+    public function getJob(int $importId, ?int $userId = null): ?array
+    {
+        $job = $this->db->fetchOne('SELECT * FROM import_jobs WHERE id = ?', [$importId]);
+        if (!$job || ($userId !== null && $job['user_id'] !== null && (int) $job['user_id'] !== $userId)) {
+            return null;
+        }
+        return $job;
+    }
+
+    /**
+     * First rows as header => value maps (the mapping step never needs more).
+     *
+     * @return list<array<string,string>>
+     */
+    public function sample(int $importId, int $limit = self::SAMPLE_ROWS): array
+    {
+        $job = $this->getJob($importId);
+        if (!$job) {
+            return [];
+        }
+        $headers = json_decode((string) $job['headers'], true) ?: [];
+        $rows = $this->db->fetchAll(
+            'SELECT data FROM import_rows WHERE import_id = ? ORDER BY row_num LIMIT ?',
+            [$importId, max(1, min(100, $limit))]
+        );
+        return array_map(
+            fn(array $r) => self::combine($headers, json_decode((string) $r['data'], true) ?: []),
+            $rows
+        );
+    }
+
+    /**
+     * Store the mapping step. Only allowed before processing starts so a
+     * resumed import never changes rules halfway through.
+     *
+     * @param array<string,string> $fieldMapping contact field => CSV column
+     * @param array{source?:string,notes?:string,nameSplitConfig?:?array} $options
+     */
+    public function configure(int $importId, array $fieldMapping, array $options = []): void
+    {
+        $job = $this->getJob($importId);
+        if (!$job) {
+            throw new InvalidArgumentException('Import not found');
+        }
+        if ($job['status'] !== self::STATUS_STAGED) {
+            throw new InvalidArgumentException('Import has already started');
+        }
+        $this->db->update('import_jobs', [
+            'field_mapping' => json_encode($fieldMapping),
+            'options' => json_encode([
+                'source' => (string) ($options['source'] ?? 'CSV Import'),
+                'notes' => (string) ($options['notes'] ?? ''),
+                'nameSplitConfig' => $options['nameSplitConfig'] ?? null,
+            ]),
+            'updated_at' => getCurrentTimestamp(),
+        ], 'id = ?', [$importId]);
+    }
+
+    /**
+     * Import staged rows from the job cursor onward, one chunk per
+     * transaction, until done or $maxSeconds has elapsed (at least one chunk
+     * always runs). Safe to call again after an interruption.
+     *
+     * @return array<string,mixed> summary()
+     */
+    public function process(int $importId, ?float $maxSeconds = null, int $chunkSize = self::DEFAULT_CHUNK_SIZE): array
+    {
+        $job = $this->getJob($importId);
+        if (!$job) {
+            throw new InvalidArgumentException('Import not found');
+        }
+        $fieldMapping = json_decode((string) ($job['field_mapping'] ?? ''), true);
+        if (!is_array($fieldMapping)) {
+            throw new InvalidArgumentException('Field mapping not configured');
+        }
+        $options = json_decode((string) ($job['options'] ?? ''), true) ?: [];
+        $headers = json_decode((string) $job['headers'], true) ?: [];
+        $chunkSize = max(1, $chunkSize);
+        $started = microtime(true);
+
+        while (true) {
+            if ($this->processChunk($importId, $headers, $fieldMapping, $options, $chunkSize) === 0) {
+                break;
+            }
+            if ($maxSeconds !== null && microtime(true) - $started >= $maxSeconds) {
+                break;
+            }
+        }
+        return $this->summary($importId);
+    }
+
+    /**
+     * @return array<string,mixed> public view of a job: counts, status, percent
+     */
+    public function summary(int $importId): array
+    {
+        $job = $this->getJob($importId);
+        if (!$job) {
+            throw new InvalidArgumentException('Import not found');
+        }
+        $rowCount = (int) $job['row_count'];
+        $processed = (int) $job['success_count'] + (int) $job['error_count'];
+        return [
+            'import_id' => (int) $job['id'],
+            'status' => $job['status'],
+            'filename' => $job['filename'],
+            'headers' => json_decode((string) $job['headers'], true) ?: [],
+            'row_count' => $rowCount,
+            'processed' => $processed,
+            'success_count' => (int) $job['success_count'],
+            'error_count' => (int) $job['error_count'],
+            'percent' => $rowCount > 0 ? round($processed * 100 / $rowCount, 1) : 100.0,
+            'created_at' => $job['created_at'],
+            'updated_at' => $job['updated_at'],
+            'completed_at' => $job['completed_at'],
+        ];
+    }
+
+    /** @return list<array{row:int,message:string}> */
+    public function errors(int $importId, int $limit = 100, int $offset = 0): array
+    {
+        $rows = $this->db->fetchAll(
+            'SELECT row_num, message FROM import_rows
+             WHERE import_id = ? AND status = ? ORDER BY row_num LIMIT ? OFFSET ?',
+            [$importId, self::ROW_ERROR, max(1, $limit), max(0, $offset)]
+        );
+        return array_map(static fn(array $r) => ['row' => (int) $r['row_num'], 'message' => (string) $r['message']], $rows);
+    }
+
+    public function delete(int $importId): void
+    {
+        $this->db->delete('import_rows', 'import_id = ?', [$importId]);
+        $this->db->delete('import_jobs', 'id = ?', [$importId]);
+    }
+
+    /**
+     * Drop completed jobs and abandoned staged uploads with no activity for
+     * RETENTION_DAYS. Jobs still processing are kept: process() resumes them.
+     *
+     * @return int jobs removed
+     */
+    public function purgeExpired(int $days = self::RETENTION_DAYS): int
+    {
+        $cutoff = date('Y-m-d H:i:s', time() - $days * 86400);
+        $ids = array_column(
+            $this->db->fetchAll(
+                'SELECT id FROM import_jobs
+                 WHERE status IN (?, ?) AND COALESCE(updated_at, created_at) < ?',
+                [self::STATUS_COMPLETED, self::STATUS_STAGED, $cutoff]
+            ),
+            'id'
+        );
+        foreach ($ids as $id) {
+            $this->delete((int) $id);
+        }
+        return count($ids);
+    }
+
+    /**
+     * Map one CSV row to contact columns with the import rules (sanitising,
+     * EVM/email validation, name splitting, required names). Shared by the
+     * staged importer and the inline csvData API.
+     *
+     * @param array<string,string> $row header => value
+     * @param array<string,string> $fieldMapping contact field => CSV column
+     * @return array{0:?array<string,mixed>,1:?string} [contact data, error message]
+     */
+    public static function mapRow(array $row, array $fieldMapping, ?array $nameSplitConfig, string $source, string $notes): array
+    {
+        $contactData = [];
+        foreach ($fieldMapping as $field => $column) {
+            // Skip name split fields - they'll be handled separately
+            if (strpos((string) $column, '_split_') !== false) {
+                continue;
+            }
+            if (isset($row[$column]) && !empty($row[$column])) {
+                if ($field === 'email') {
+                    $contactData[$field] = $row[$column]; // Email validation handled separately
+                } elseif ($field === 'evm_address') {
+                    $contactData[$field] = validateEVMAddress($row[$column]) ? $row[$column] : null;
+                } else {
+                    $contactData[$field] = sanitizeInput($row[$column]);
+                }
+            }
+        }
+
+        if ($nameSplitConfig && isset($row[$nameSplitConfig['column']])) {
+            $parts = explode($nameSplitConfig['delimiter'], $row[$nameSplitConfig['column']]);
+            if (count($parts) >= 2) {
+                $contactData['first_name'] = sanitizeInput(trim($parts[$nameSplitConfig['firstPart']] ?? ''));
+                $contactData['last_name'] = sanitizeInput(trim($parts[$nameSplitConfig['lastPart']] ?? ''));
+            }
+        }
+
+        if (!empty($contactData['email']) && !validateEmail($contactData['email'])) {
+            return [null, 'Invalid email address: ' . $contactData['email']];
+        }
+
+        $contactData['source'] = $source;
+        $contactData['notes'] = $notes;
+        $contactData['contact_type'] = 'lead';
+        $contactData['contact_status'] = 'new';
+        $contactData['created_at'] = getCurrentTimestamp();
+        $contactData['updated_at'] = getCurrentTimestamp();
+
+        if (!$nameSplitConfig && (empty($contactData['first_name']) || empty($contactData['last_name']))) {
+            $missingFields = [];
+            if (empty($contactData['first_name'])) $missingFields[] = 'first_name';
+            if (empty($contactData['last_name'])) $missingFields[] = 'last_name';
+            return [null, 'Missing required fields: ' . implode(', ', $missingFields) . ' (Data: ' . json_encode($contactData) . ')'];
+        }
+        if ($nameSplitConfig && (empty($contactData['first_name']) || empty($contactData['last_name']))) {
+            return [null, 'Name splitting failed - could not split name: ' . ($row[$nameSplitConfig['column']] ?? 'N/A')];
+        }
+        return [$contactData, null];
+    }
+
+    /**
+     * Insert a mapped contact unless its email already exists.
+     *
+     * @param array<string,mixed> $contactData
+     * @return array{0:?int,1:?string} [contact id, error message]
+     */
+    public static function insertContact(Database $db, array $contactData): array
+    {
+        if (!empty($contactData['email'])) {
+            $existing = $db->fetchOne('SELECT id FROM contacts WHERE email = ?', [$contactData['email']]);
+            if ($existing) {
+                return [null, 'Contact with this email already exists'];
+            }
+        }
+        try {
+            return [(int) $db->insert('contacts', $contactData), null];
+        } catch (Exception $e) {
+            return [null, 'Database error: ' . $e->getMessage()];
+        }
+    }
+
+    /** @return int rows handled in this chunk (0 = nothing left) */
+    private function processChunk(int $importId, array $headers, array $fieldMapping, array $options, int $chunkSize): int
+    {
+        $sqlite = $this->db->getConnection();
+        if ($sqlite->exec('BEGIN IMMEDIATE') === false) {
+            throw new RuntimeException('Could not lock database for import: ' . $sqlite->lastErrorMsg());
+        }
+        try {
+            // Re-read the cursor under the write lock so concurrent callers never import a row twice
+            $job = $this->db->fetchOne('SELECT last_row, status FROM import_jobs WHERE id = ?', [$importId]);
+            if (!$job || $job['status'] === self::STATUS_COMPLETED) {
+                $this->db->commit();
+                return 0;
+            }
+            $rows = $this->db->fetchAll(
+                'SELECT row_num, data FROM import_rows
+                 WHERE import_id = ? AND row_num > ? ORDER BY row_num LIMIT ?',
+                [$importId, (int) $job['last_row'], $chunkSize]
+            );
+
+            $ok = 0;
+            $failed = 0;
+            $lastRow = (int) $job['last_row'];
+            foreach ($rows as $staged) {
+                $lastRow = (int) $staged['row_num'];
+                $row = self::combine($headers, json_decode((string) $staged['data'], true) ?: []);
+                [$contactData, $error] = self::mapRow(
+                    $row,
+                    $fieldMapping,
+                    $options['nameSplitConfig'] ?? null,
+                    (string) ($options['source'] ?? 'CSV Import'),
+                    (string) ($options['notes'] ?? '')
+                );
+                $contactId = null;
+                if ($contactData !== null) {
+                    [$contactId, $error] = self::insertContact($this->db, $contactData);
+                }
+                if ($error === null) {
+                    $ok++;
+                } else {
+                    $failed++;
+                }
+                $this->db->query(
+                    'UPDATE import_rows SET status = ?, message = ?, contact_id = ? WHERE import_id = ? AND row_num = ?',
+                    [$error === null ? self::ROW_IMPORTED : self::ROW_ERROR, $error, $contactId, $importId, $lastRow]
+                );
+            }
+
+            $ts = getCurrentTimestamp();
+            $done = count($rows) < $chunkSize;
+            $this->db->query(
+                'UPDATE import_jobs SET last_row = ?, success_count = success_count + ?, error_count = error_count + ?,
+                 status = ?, updated_at = ?, completed_at = CASE WHEN ? THEN ? ELSE completed_at END
+                 WHERE id = ?',
+                [$lastRow, $ok, $failed, $done ? self::STATUS_COMPLETED : self::STATUS_PROCESSING, $ts, $done ? 1 : 0, $ts, $importId]
+            );
+            $this->db->commit();
+            return $done ? 0 : count($rows);
+        } catch (Exception $e) {
+            $this->db->rollback();
+            throw $e;
+        }
+    }
+
+    /** @return array<string,string> */
+    private static function combine(array $headers, array $values): array
+    {
+        $row = [];
+        foreach ($headers as $index => $header) {
+            $row[$header] = isset($values[$index]) ? trim((string) $values[$index]) : '';
+        }
+        return $row;
+    }
+}
@@ -22,13 +22,29 @@ class MigrationRunner
 
     public function ensureRegistry(): void
     {
-        $this->db->getConnection()->exec(
+        $sqlite = $this->db->getConnection();
+        $sqlite->exec(
             "CREATE TABLE IF NOT EXISTS schema_migrations (
                 version TEXT PRIMARY KEY,
                 description TEXT,
                 applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )"
         );
+        // Progress columns for chunked table rebuilds (TableRebuilder).
+        $columns = array_column($this->db->getTableInfo('schema_migrations'), 'name');
+        $progressColumns = [
+            'status' => "VARCHAR(20) DEFAULT 'applied'",
+            'progress_cursor' => 'INTEGER',
+            'progress_rows' => 'INTEGER DEFAULT 0',
+            'total_rows' => 'INTEGER',
+            'updated_at' => 'DATETIME',
+            'last_error' => 'TEXT',
+        ];
+        foreach ($progressColumns as $name => $def) {
+            if (!in_array($name, $columns, true)) {
+                $sqlite->exec("ALTER TABLE schema_migrations ADD COLUMN {$name} {$def}");
+            }
+        }
     }
 
     /** @return list<string> */
@@ -36,16 +52,66 @@ class MigrationRunner
     {
         $this->ensureRegistry();
         $rows = $this->db->fetchAll(
-            'SELECT version FROM schema_migrations ORDER BY version ASC'
+            "SELECT version FROM schema_migrations
+             WHERE status IS NULL OR status = 'applied'
+             ORDER BY version ASC"
         );
         return array_map(static fn($r) => (string) $r['version'], $rows);
     }
 
+    /** @return array<string, array> Rebuilds that started but have not swapped yet, keyed by version. */
+    public function inProgress(): array
+    {
+        return $this->rebuildsWithStatus('running');
+    }
+
+    /** @return array<string, array> Rebuilds whose swap failed (see last_error), keyed by version. */
+    public function failed(): array
+    {
+        return $this->rebuildsWithStatus('failed');
+    }
+
+    /**
+     * Put failed rebuilds back to running so the next migrate() retries the swap.
+     *
+     * @return list<string> versions reset
+     */
+    public function retryFailed(): array
+    {
+        require_once __DIR__ . '/TableRebuilder.php';
+        $rebuilder = new TableRebuilder($this->db);
+        $out = [];
+        foreach (array_keys($this->failed()) as $version) {
+            if ($rebuilder->retry((string) $version)) {
+                $out[] = (string) $version;
+            }
+        }
+        return $out;
+    }
+
+    private function rebuildsWithStatus(string $status): array
+    {
+        $this->ensureRegistry();
+        $rows = $this->db->fetchAll(
+            "SELECT version, description, progress_cursor, progress_rows, total_rows, updated_at, last_error
+             FROM schema_migrations WHERE status = ? ORDER BY version ASC",
+            [$status]
+        );
+        $out = [];
+        foreach ($rows as $row) {
+            $out[(string) $row['version']] = $row;
+        }
+        return $out;
+    }
+
     /**
      * Discover migration PHP files. Each file returns:
      * ['version' => string, 'description' => string, 'up' => callable(Database): void]
      *
-     * @return list<array{version:string,description:string,up:callable,file:string}>
+     * Long-running table rebuilds add a 'rebuild' spec (see TableRebuilder::run());
+     * 'up' is then optional and runs after the swap.
+     *
+     * @return list<array{version:string,description:string,up:?callable,rebuild:?array,file:string}>
      */
     public function discover(): array
     {
@@ -61,13 +127,16 @@ class MigrationRunner
                 continue;
             }
             $spec = require $file;
-            if (!is_array($spec) || empty($spec['version']) || !isset($spec['up']) || !is_callable($spec['up'])) {
+            $hasUp = isset($spec['up']) && is_callable($spec['up']);
+            $hasRebuild = isset($spec['rebuild']) && is_array($spec['rebuild']);
+            if (!is_array($spec) || empty($spec['version']) || (!$hasUp && !$hasRebuild)) {
                 throw new RuntimeException("Invalid migration file: {$file}");
             }
             $out[] = [
                 'version' => (string) $spec['version'],
                 'description' => (string) ($spec['description'] ?? ''),
-                'up' => $spec['up'],
+                'up' => $hasUp ? $spec['up'] : null,
+                'rebuild' => $hasRebuild ? $spec['rebuild'] : null,
                 'file' => $file,
             ];
         }
@@ -75,14 +144,20 @@ class MigrationRunner
     }
 
     /**
-     * @return array{applied:list<string>,skipped:list<string>,dry_run:bool}
+     * Apply pending migrations in order. A chunked rebuild that runs out of
+     * $maxSeconds stays 'running' in schema_migrations, is reported under
+     * in_progress, and blocks later migrations until a subsequent call finishes it.
+     * One whose swap failed is reported under failed (version => error) and
+     * blocks later migrations until retryFailed().
+     *
+     * @return array{applied:list<string>,skipped:list<string>,in_progress:list<string>,failed:array<string,?string>,dry_run:bool}
      */
-    public function migrate(bool $dryRun = false): array
+    public function migrate(bool $dryRun = false, ?float $maxSeconds = null): array
     {
         $this->ensureRegistry();
         $applied = $this->appliedVersions();
         $appliedSet = array_fill_keys($applied, true);
-        $result = ['applied' => [], 'skipped' => [], 'dry_run' => $dryRun];
+        $result = ['applied' => [], 'skipped' => [], 'in_progress' => [], 'failed' => [], 'dry_run' => $dryRun];
 
         foreach ($this->discover() as $mig) {
             $version = $mig['version'];
@@ -94,6 +169,19 @@ class MigrationRunner
                 $result['applied'][] = $version;
                 continue;
             }
+            if ($mig['rebuild'] !== null) {
+                $rebuild = $this->applyRebuild($mig, $maxSeconds);
+                if ($rebuild['failed']) {
+                    $result['failed'][$version] = $rebuild['error'];
+                    break;
+                }
+                if (!$rebuild['complete']) {
+                    $result['in_progress'][] = $version;
+                    break;
+                }
+                $result['applied'][] = $version;
+                continue;
+            }
             $sqlite = $this->db->getConnection();
             $sqlite->exec('BEGIN');
             try {
@@ -118,11 +206,36 @@ class MigrationRunner
         return $result;
     }
 
+    /**
+     * Copy in chunks, then swap; 'up' runs inside the swap transaction so the
+     * new table and its follow-up changes land together.
+     * Returns TableRebuilder::run()'s result (complete=false when the budget ran out).
+     */
+    private function applyRebuild(array $mig, ?float $maxSeconds): array
+    {
+        require_once __DIR__ . '/TableRebuilder.php';
+        $spec = $mig['rebuild'] + ['description' => $mig['description']];
+        try {
+            $rebuild = (new TableRebuilder($this->db))->run($mig['version'], $spec, $maxSeconds, null, $mig['up']);
+        } catch (Throwable $e) {
+            throw new RuntimeException(
+                "Migration {$mig['version']} failed: " . $e->getMessage(),
+                0,
+                $e
+            );
+        }
+        return $rebuild;
+    }
+
     public function status(): array
     {
         $applied = array_fill_keys($this->appliedVersions(), true);
+        $running = $this->inProgress();
+        $failedRows = $this->failed();
         $pending = [];
         $done = [];
+        $inProgress = [];
+        $failed = [];
         foreach ($this->discover() as $mig) {
             $row = [
                 'version' => $mig['version'],
@@ -131,10 +244,35 @@ class MigrationRunner
             ];
             if (isset($applied[$mig['version']])) {
                 $done[] = $row;
+            } elseif (isset($running[$mig['version']])) {
+                $inProgress[] = $row + $this->progressFields($running[$mig['version']]);
+                unset($running[$mig['version']]);
+            } elseif (isset($failedRows[$mig['version']])) {
+                $failed[] = $row + $this->progressFields($failedRows[$mig['version']]);
+                unset($failedRows[$mig['version']]);
             } else {
                 $pending[] = $row;
             }
         }
-        return ['applied' => $done, 'pending' => $pending];
+        // Rebuilds without a migration file (Database's inline contacts rebuild)
+        foreach ($running as $version => $progress) {
+            $inProgress[] = ['version' => $version, 'description' => (string) $progress['description'], 'file' => null]
+                + $this->progressFields($progress);
+        }
+        foreach ($failedRows as $version => $progress) {
+            $failed[] = ['version' => $version, 'description' => (string) $progress['description'], 'file' => null]
+                + $this->progressFields($progress);
+        }
+        return ['applied' => $done, 'pending' => $pending, 'in_progress' => $inProgress, 'failed' => $failed];
+    }
+
+    private function progressFields(array $progress): array
+    {
+        return [
+            'progress_rows' => (int) $progress['progress_rows'],
+            'total_rows' => (int) $progress['total_rows'],
+            'updated_at' => $progress['updated_at'],
+            'last_error' => $progress['last_error'],
+        ];
     }
 }
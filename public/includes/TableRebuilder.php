@@ -0,0 +1,503 @@
+<?php
+/**
+ * Online, chunked table rebuild (shadow table + change triggers + atomic swap).
+ * Sanctum CRM
+ *
+ * Replaces the CREATE-AS-SELECT / DROP / INSERT pattern for schema changes that
+ * SQLite cannot do with ALTER TABLE. Rows are copied in small committed batches
+ * so other writers get the lock between chunks; progress lives in
+ * schema_migrations so an interrupted rebuild resumes where it stopped.
+ */
+
+if (!defined('CRM_LOADED')) {
+    die('Direct access not permitted');
+}
+
+class TableRebuilder
+{
+    public const STATUS_RUNNING = 'running';
+    public const STATUS_APPLIED = 'applied';
+    /** Swap rolled back; boots leave it alone until tools/migrate.php --retry-failed. */
+    public const STATUS_FAILED = 'failed';
+
+    public const DEFAULT_CHUNK_SIZE = 1000;
+    public const DEFAULT_PAUSE_MS = 10;
+
+    private Database $db;
+    private \SQLite3 $sqlite;
+
+    public function __construct(?Database $db = null)
+    {
+        $this->db = $db ?? Database::getInstance();
+        $this->sqlite = $this->db->getConnection();
+    }
+
+    /**
+     * Rebuild (or resume rebuilding) a table. Spec keys:
+     *   table       — existing table name
+     *   create      — CREATE TABLE statement using the {table} placeholder for the new name
+     *   key         — integer primary key column used as the copy cursor (default id)
+     *   chunk_size  — rows per committed batch (default 1000)
+     *   pause_ms    — sleep between batches so waiting writers get the lock (default 10)
+     *   keep_extra_columns — carry over source columns the new DDL does not declare
+     *
+     * Stops early (complete=false) once $maxSeconds or $maxChunks is exhausted;
+     * calling again with the same $version continues from the recorded cursor.
+     * $finalize(Database) runs inside the swap transaction, after the rename.
+     * A swap that fails is rolled back and recorded as failed (with the error);
+     * later calls return it unchanged until retry() is called.
+     *
+     * @return array{complete:bool,failed:bool,error:?string,table:string,rows_copied:int,total_rows:int,cursor:int,chunks:int}
+     */
+    public function run(
+        string $version,
+        array $spec,
+        ?float $maxSeconds = null,
+        ?int $maxChunks = null,
+        ?callable $finalize = null
+    ): array
+    {
+        $table = $this->identifier((string) ($spec['table'] ?? ''));
+        $key = $this->identifier((string) ($spec['key'] ?? 'id'));
+        $create = (string) ($spec['create'] ?? '');
+        if (!str_contains($create, '{table}')) {
+            throw new RuntimeException("Rebuild of {$table}: create SQL must use the {table} placeholder");
+        }
+        $chunkSize = max(1, (int) ($spec['chunk_size'] ?? self::DEFAULT_CHUNK_SIZE));
+        $pauseMs = max(0, (int) ($spec['pause_ms'] ?? self::DEFAULT_PAUSE_MS));
+        $shadow = self::shadowName($table);
+
+        require_once __DIR__ . '/MigrationRunner.php';
+        (new MigrationRunner($this->db))->ensureRegistry();
+        $progress = $this->progress($version);
+        if ($progress !== null && ($progress['status'] ?? self::STATUS_APPLIED) === self::STATUS_APPLIED) {
+            return $this->result(true, $table, $progress, 0);
+        }
+        if ($progress !== null && $progress['status'] === self::STATUS_FAILED) {
+            return $this->result(false, $table, $progress, 0);
+        }
+        if ($progress === null || !$this->tableExists($shadow)) {
+            $this->start(
+                $version,
+                (string) ($spec['description'] ?? ''),
+                $table,
+                $shadow,
+                $create,
+                !empty($spec['keep_extra_columns'])
+            );
+            $progress = $this->progress($version);
+            if (($progress['status'] ?? null) !== self::STATUS_RUNNING) {
+                // Another worker finished (or failed the swap) while we waited for the lock.
+                return $this->result(($progress['status'] ?? null) === self::STATUS_APPLIED, $table, $progress ?? [], 0);
+            }
+        }
+
+        $cursor = (int) ($progress['progress_cursor'] ?? 0);
+        $copied = (int) ($progress['progress_rows'] ?? 0);
+        $total = (int) ($progress['total_rows'] ?? 0);
+        $columns = $this->sharedColumns($table, $shadow);
+        $colList = implode(', ', $columns);
+        $started = microtime(true);
+        $chunks = 0;
+
+        while (true) {
+            if ($maxChunks !== null && $chunks >= $maxChunks) {
+                break;
+            }
+            if ($maxSeconds !== null && $chunks > 0 && (microtime(true) - $started) >= $maxSeconds) {
+                break;
+            }
+
+            $this->exec('BEGIN IMMEDIATE');
+            try {
+                // Other boots may be copying the same table: take the cursor from
+                // the progress row under the write lock, never from our own copy.
+                $progress = $this->progress($version);
+                if ($progress === null
+                    || ($progress['status'] ?? null) !== self::STATUS_RUNNING
+                    || !$this->tableExists($shadow)
+                ) {
+                    $this->exec('COMMIT');
+                    $done = ($progress['status'] ?? null) === self::STATUS_APPLIED;
+                    return $this->result($done, $table, $progress ?? [], $chunks);
+                }
+                $cursor = (int) ($progress['progress_cursor'] ?? 0);
+                $copied = (int) ($progress['progress_rows'] ?? 0);
+
+                $upper = $this->sqlite->querySingle(
+                    "SELECT {$key} FROM {$table} WHERE {$key} > {$cursor} ORDER BY {$key} LIMIT 1 OFFSET " . ($chunkSize - 1)
+                );
+                if ($upper === null) {
+                    $upper = $this->sqlite->querySingle("SELECT MAX({$key}) FROM {$table} WHERE {$key} > {$cursor}");
+                }
+                if ($upper === null) {
+                    $this->exec('COMMIT');
+                    $swapped = $this->swap($version, $table, $shadow, $copied, $finalize);
+                    return $this->result($swapped, $table, $this->progress($version) ?? [], $chunks);
+                }
+                $upper = (int) $upper;
+                $this->exec(
+                    "INSERT OR REPLACE INTO {$shadow} ({$colList})
+                     SELECT {$colList} FROM {$table}
+                     WHERE {$key} > {$cursor} AND {$key} <= {$upper}
+                     ORDER BY {$key}"
+                );
+                $copied += $this->sqlite->changes();
+                $cursor = $upper;
+                $this->recordProgress($version, $cursor, $copied);
+                $this->exec('COMMIT');
+            } catch (Throwable $e) {
+                $this->sqlite->exec('ROLLBACK');
+                throw $e;
+            }
+            $chunks++;
+            if ($pauseMs > 0) {
+                usleep($pauseMs * 1000);
+            }
+        }
+
+        return [
+            'complete' => false,
+            'failed' => false,
+            'error' => null,
+            'table' => $table,
+            'rows_copied' => $copied,
+            'total_rows' => $total,
+            'cursor' => $cursor,
+            'chunks' => $chunks,
+        ];
+    }
+
+    private function result(bool $complete, string $table, array $progress, int $chunks): array
+    {
+        $failed = ($progress['status'] ?? null) === self::STATUS_FAILED;
+        return [
+            'complete' => $complete,
+            'failed' => $failed,
+            'error' => $failed ? ($progress['last_error'] ?? null) : null,
+            'table' => $table,
+            'rows_copied' => (int) ($progress['progress_rows'] ?? 0),
+            'total_rows' => (int) ($progress['total_rows'] ?? 0),
+            'cursor' => (int) ($progress['progress_cursor'] ?? 0),
+            'chunks' => $chunks,
+        ];
+    }
+
+    /** Abandon an in-progress or failed rebuild: drop shadow table + triggers and forget progress. */
+    public function abort(string $version, string $table): void
+    {
+        $table = $this->identifier($table);
+        $this->exec('BEGIN IMMEDIATE');
+        try {
+            $this->dropTriggers($table);
+            $this->exec('DROP TABLE IF EXISTS ' . self::shadowName($table));
+            $this->db->delete(
+                'schema_migrations',
+                'version = ? AND status IN (?, ?)',
+                [$version, self::STATUS_RUNNING, self::STATUS_FAILED]
+            );
+            $this->exec('COMMIT');
+        } catch (Throwable $e) {
+            $this->sqlite->exec('ROLLBACK');
+            throw $e;
+        }
+    }
+
+    /** Let a failed rebuild try its swap again (after fixing whatever it reported). */
+    public function retry(string $version): bool
+    {
+        $this->db->query(
+            'UPDATE schema_migrations SET status = ?, last_error = NULL, updated_at = ? WHERE version = ? AND status = ?',
+            [self::STATUS_RUNNING, date('Y-m-d H:i:s'), $version, self::STATUS_FAILED]
+        );
+        return $this->sqlite->changes() > 0;
+    }
+
+    public static function shadowName(string $table): string
+    {
+        return $table . '__rebuild';
+    }
+
+    /** Create shadow table, change-capture triggers and the progress row in one transaction. */
+    private function start(
+        string $version,
+        string $description,
+        string $table,
+        string $shadow,
+        string $create,
+        bool $keepExtraColumns
+    ): void {
+        // Counted before taking the write lock; informational only (progress display).
+        $total = (int) $this->sqlite->querySingle("SELECT COUNT(*) FROM {$table}");
+        $this->exec('BEGIN IMMEDIATE');
+        try {
+            // A concurrent boot may have started (or finished) the rebuild while we
+            // waited; recreating its shadow table would throw its copy away.
+            $progress = $this->progress($version);
+            if ($progress !== null
+                && (($progress['status'] ?? null) === self::STATUS_APPLIED || $this->tableExists($shadow))
+            ) {
+                $this->exec('COMMIT');
+                return;
+            }
+            $this->dropTriggers($table);
+            $this->exec("DROP TABLE IF EXISTS {$shadow}");
+            $this->exec(str_replace('{table}', $shadow, $create));
+            if ($keepExtraColumns) {
+                $this->addMissingColumns($table, $shadow);
+            }
+
+            $columns = $this->sharedColumns($table, $shadow);
+            $colList = implode(', ', $columns);
+            $newList = implode(', ', array_map(static fn($c) => 'NEW.' . $c, $columns));
+            $key = $this->primaryKey($shadow);
+            // Writes during the copy are mirrored into the shadow so the final swap
+            // only has to rename; rows ahead of the cursor are re-copied harmlessly.
+            $this->exec(
+                "CREATE TRIGGER {$shadow}_ai AFTER INSERT ON {$table} BEGIN
+                    INSERT OR REPLACE INTO {$shadow} ({$colList}) VALUES ({$newList});
+                 END"
+            );
+            $this->exec(
+                "CREATE TRIGGER {$shadow}_au AFTER UPDATE ON {$table} BEGIN
+                    DELETE FROM {$shadow} WHERE {$key} = OLD.{$key};
+                    INSERT OR REPLACE INTO {$shadow} ({$colList}) VALUES ({$newList});
+                 END"
+            );
+            $this->exec(
+                "CREATE TRIGGER {$shadow}_ad AFTER DELETE ON {$table} BEGIN
+                    DELETE FROM {$shadow} WHERE {$key} = OLD.{$key};
+                 END"
+            );
+
+            $now = date('Y-m-d H:i:s');
+            $this->db->query(
+                'INSERT OR REPLACE INTO schema_migrations
+                    (version, description, applied_at, status, progress_cursor, progress_rows, total_rows, updated_at)
+                 VALUES (?, ?, NULL, ?, 0, 0, ?, ?)',
+                [$version, $description, self::STATUS_RUNNING, $total, $now]
+            );
+            $this->exec('COMMIT');
+        } catch (Throwable $e) {
+            $this->sqlite->exec('ROLLBACK');
+            throw $e;
+        }
+    }
+
+    /**
+     * Drop the original table and rename the shadow into place in one transaction.
+     * Foreign keys are switched off around the swap so DROP TABLE does not
+     * cascade into child tables (deals, contact_tags, sidecar rows); instead the
+     * swap is refused if it would leave keys dangling that were valid before.
+     * Returns false if another worker swapped (or aborted) first, or if the swap
+     * failed; a failure is recorded on the progress row and logged.
+     */
+    private function swap(string $version, string $table, string $shadow, int $copied, ?callable $finalize): bool
+    {
+        $this->exec('PRAGMA foreign_keys = OFF');
+        $this->exec('PRAGMA legacy_alter_table = ON');
+        try {
+            $this->exec('BEGIN IMMEDIATE');
+            try {
+                $progress = $this->progress($version);
+                if (($progress['status'] ?? null) !== self::STATUS_RUNNING || !$this->tableExists($shadow)) {
+                    $this->exec('COMMIT');
+                    return ($progress['status'] ?? null) === self::STATUS_APPLIED;
+                }
+                $copied = (int) ($progress['progress_rows'] ?? $copied);
+                $this->assertNoNewViolations($table, $shadow);
+                $ownBefore = $this->foreignKeyViolations($table);
+                $this->dropTriggers($table);
+
+                $dependents = $this->db->fetchAll(
+                    "SELECT type, sql FROM sqlite_master
+                     WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+                    [$table]
+                );
+                $seq = $this->tableExists('sqlite_sequence')
+                    ? $this->sqlite->querySingle("SELECT seq FROM sqlite_sequence WHERE name = '{$table}'")
+                    : null;
+
+                $this->exec("DROP TABLE {$table}");
+                $this->exec("ALTER TABLE {$shadow} RENAME TO {$table}");
+                // Indexes first so recreated triggers see the final schema.
+                usort($dependents, static fn($a, $b) => strcmp((string) $a['type'], (string) $b['type']));
+                foreach ($dependents as $dep) {
+                    $this->exec((string) $dep['sql']);
+                }
+                if ($seq !== null) {
+                    // Keep AUTOINCREMENT monotonic even if the highest ids were deleted mid-copy.
+                    $this->db->query(
+                        'UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?',
+                        [(int) $seq, $table]
+                    );
+                }
+                if ($finalize !== null) {
+                    $finalize($this->db);
+                }
+                $introduced = array_diff($this->foreignKeyViolations($table), $ownBefore);
+                if ($introduced !== []) {
+                    throw new RuntimeException(sprintf(
+                        'Rebuild of %s: %d new foreign key violation(s) in the rebuilt table (e.g. %s)',
+                        $table,
+                        count($introduced),
+                        reset($introduced)
+                    ));
+                }
+
+                $this->db->query(
+                    'UPDATE schema_migrations
+                     SET status = ?, progress_rows = ?, applied_at = ?, updated_at = ?
+                     WHERE version = ?',
+                    [self::STATUS_APPLIED, $copied, date('Y-m-d H:i:s'), date('Y-m-d H:i:s'), $version]
+                );
+                $this->exec('COMMIT');
+            } catch (Throwable $e) {
+                $this->sqlite->exec('ROLLBACK');
+                $this->markFailed($version, $e->getMessage());
+                return false;
+            }
+        } finally {
+            $this->sqlite->exec('PRAGMA legacy_alter_table = OFF');
+            $this->sqlite->exec('PRAGMA foreign_keys = ON');
+        }
+        return true;
+    }
+
+    /** Park the rebuild (shadow table and triggers stay) so boots stop retrying the swap. */
+    private function markFailed(string $version, string $error): void
+    {
+        error_log("TableRebuilder: {$version} swap failed, rebuild parked until migrate.php --retry-failed: {$error}");
+        $this->db->query(
+            'UPDATE schema_migrations SET status = ?, last_error = ?, updated_at = ? WHERE version = ?',
+            [self::STATUS_FAILED, $error, date('Y-m-d H:i:s'), $version]
+        );
+    }
+
+    /**
+     * Refuse the swap if child rows would lose their parent: keys that resolve
+     * against the old table but are missing from the shadow. Orphans that were
+     * already dangling before the rebuild are not the rebuild's to fix.
+     */
+    private function assertNoNewViolations(string $table, string $shadow): void
+    {
+        $refs = $this->db->fetchAll(
+            "SELECT m.name AS child, f.\"from\" AS col, f.\"to\" AS parent_col
+             FROM sqlite_master m, pragma_foreign_key_list(m.name) f
+             WHERE m.type = 'table' AND f.\"table\" = ? AND m.name NOT IN (?, ?)",
+            [$table, $table, $shadow]
+        );
+        foreach ($refs as $ref) {
+            $child = $this->identifier((string) $ref['child']);
+            $col = $this->identifier((string) $ref['col']);
+            $parentCol = $ref['parent_col'] !== null
+                ? $this->identifier((string) $ref['parent_col'])
+                : $this->primaryKey($table);
+            $lost = (int) $this->sqlite->querySingle(
+                "SELECT COUNT(*) FROM {$child} c
+                 WHERE c.{$col} IS NOT NULL
+                   AND EXISTS (SELECT 1 FROM {$table} t WHERE t.{$parentCol} = c.{$col})
+                   AND NOT EXISTS (SELECT 1 FROM {$shadow} s WHERE s.{$parentCol} = c.{$col})"
+            );
+            if ($lost > 0) {
+                throw new RuntimeException(
+                    "Rebuild of {$table}: {$lost} {$child}.{$col} row(s) would lose their parent in the swap"
+                );
+            }
+        }
+    }
+
+    /** @return list<string> foreign_key_check rows of one table as "table:rowid->parent#fkid" */
+    private function foreignKeyViolations(string $table): array
+    {
+        return array_map(
+            static fn($v) => "{$v['table']}:{$v['rowid']}->{$v['parent']}#{$v['fkid']}",
+            $this->db->fetchAll('PRAGMA foreign_key_check(' . $this->identifier($table) . ')')
+        );
+    }
+
+    private function recordProgress(string $version, int $cursor, int $copied): void
+    {
+        $this->db->query(
+            'UPDATE schema_migrations SET progress_cursor = ?, progress_rows = ?, updated_at = ? WHERE version = ?',
+            [$cursor, $copied, date('Y-m-d H:i:s'), $version]
+        );
+    }
+
+    private function progress(string $version): ?array
+    {
+        return $this->db->fetchOne(
+            'SELECT * FROM schema_migrations WHERE version = ?',
+            [$version]
+        );
+    }
+
+    private function dropTriggers(string $table): void
+    {
+        $shadow = self::shadowName($table);
+        foreach (['ai', 'au', 'ad'] as $suffix) {
+            $this->exec("DROP TRIGGER IF EXISTS {$shadow}_{$suffix}");
+        }
+    }
+
+    /** ALTER-added columns (enrichment_*, etc.) that the base DDL does not list. */
+    private function addMissingColumns(string $from, string $to): void
+    {
+        $existing = array_column($this->db->getTableInfo($to), 'name');
+        foreach ($this->db->getTableInfo($from) as $col) {
+            if (in_array($col['name'], $existing, true)) {
+                continue;
+            }
+            $def = $this->identifier((string) $col['name']) . ' ' . (string) $col['type'];
+            if ($col['dflt_value'] !== null) {
+                $def .= ' DEFAULT ' . $col['dflt_value'];
+            }
+            $this->exec("ALTER TABLE {$to} ADD COLUMN {$def}");
+        }
+    }
+
+    /** @return list<string> Columns present in both tables, in target order. */
+    private function sharedColumns(string $from, string $to): array
+    {
+        $source = array_column($this->db->getTableInfo($from), 'name');
+        $target = array_column($this->db->getTableInfo($to), 'name');
+        $shared = array_values(array_intersect($target, $source));
+        if ($shared === []) {
+            throw new RuntimeException("Rebuild of {$from}: no columns in common with {$to}");
+        }
+        return $shared;
+    }
+
+    private function primaryKey(string $table): string
+    {
+        foreach ($this->db->getTableInfo($table) as $col) {
+            if ((int) $col['pk'] === 1) {
+                return (string) $col['name'];
+            }
+        }
+        throw new RuntimeException("Rebuild target {$table} has no primary key");
+    }
+
+    private function tableExists(string $name): bool
+    {
+        return (bool) $this->db->fetchOne(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+            [$name]
+        );
+    }
+
+    private function identifier(string $name): string
+    {
+        if (!preg_match('/^[A-Za-z_][A-Za-z0-9_]*$/', $name)) {
+            throw new RuntimeException("Invalid table or column name for rebuild: '{$name}'");
+        }
+        return $name;
+    }
+
+    private function exec(string $sql): void
+    {
+        if ($this->sqlite->exec($sql) === false) {
+            throw new RuntimeException($this->sqlite->lastErrorMsg() . ' | SQL: ' . strtok($sql, "\n"));
+        }
+    }
+}
@@ -59,6 +59,7 @@ if (session_status() === PHP_SESSION_NONE) {
 if (!defined('API_VERSION')) define('API_VERSION', 'v1');
 if (!defined('API_RATE_LIMIT')) define('API_RATE_LIMIT', 1000); // requests per hour
 if (!defined('API_MAX_PAYLOAD_SIZE')) define('API_MAX_PAYLOAD_SIZE', 1048576); // 1MB
+if (!defined('API_BATCH_MAX_OPERATIONS')) define('API_BATCH_MAX_OPERATIONS', 50); // sub-requests per POST /batch
 
 // Error Reporting
 if (DEBUG_MODE) {
@@ -151,6 +152,7 @@ function validateEVMAddress($address) {
 // File Upload Configuration
 if (!defined('UPLOAD_MAX_SIZE')) define('UPLOAD_MAX_SIZE', 5242880); // 5MB
 if (!defined('UPLOAD_ALLOWED_TYPES')) define('UPLOAD_ALLOWED_TYPES', ['jpg', 'jpeg', 'png', 'gif', 'pdf', 'doc', 'docx']);
+if (!defined('IMPORT_PROCESS_SECONDS')) define('IMPORT_PROCESS_SECONDS', 2.0); // time budget per POST /import/{id}/process call
 
 // RocketReach Configuration
 if (!defined('ROCKETREACH_API_KEY')) define('ROCKETREACH_API_KEY', '');
@@ -16,19 +16,37 @@ class Database {
     private static $skipAutoMigrate = false;
     private static $skinLabEnsured = false;
     private static $contactDataSidecarEnsured = false;
+    /** Per-boot time budget for chunked rebuilds, shared by the inline contacts rebuild and auto-migrate. */
+    private const BOOT_REBUILD_SECONDS = 1.0;
+    /** microtime() deadline for that budget; set only while the constructor runs. */
+    private ?float $bootDeadline = null;
     
     private function __construct() {
         $this->connect();
-        $this->initializeTables();
-        $this->ensureSkinLabColumns();
-        $this->ensureMustChangePasswordColumn();
-        $this->ensureContactDataSidecar();
-        if (!self::$skipAutoMigrate && self::autoMigrateEnabled()) {
-            require_once __DIR__ . '/MigrationRunner.php';
-            (new MigrationRunner($this))->migrate(false);
+        $this->bootDeadline = microtime(true) + self::BOOT_REBUILD_SECONDS;
+        try {
+            $this->initializeTables();
+            $this->ensureSkinLabColumns();
+            $this->ensureMustChangePasswordColumn();
+            $this->ensureContactDataSidecar();
+            $budget = $this->bootBudgetLeft();
+            if (!self::$skipAutoMigrate && self::autoMigrateEnabled() && $budget > 0) {
+                require_once __DIR__ . '/MigrationRunner.php';
+                // Bounded on the request path: a pending chunked rebuild advances a
+                // little per boot instead of holding one request for the whole copy.
+                (new MigrationRunner($this))->migrate(false, $budget);
+            }
+        } finally {
+            $this->bootDeadline = null;
         }
     }
 
+    /** Seconds left of this boot's rebuild budget; null outside the constructor (CLI, migrations). */
+    private function bootBudgetLeft(): ?float
+    {
+        return $this->bootDeadline === null ? null : max(0.0, $this->bootDeadline - microtime(true));
+    }
+
     public static function autoMigrateEnabled(): bool
     {
         if (defined('CRM_TESTING') && CRM_TESTING) {
@@ -69,13 +87,15 @@ class Database {
             mkdir($dbDir, 0777, true);
         }
         $this->db = new SQLite3(DB_PATH);
+        // Wait for the write lock instead of failing fast (chunked rebuilds, cron writers)
+        $this->db->busyTimeout(5000);
         // Enable foreign key constraints
         $this->db->exec('PRAGMA foreign_keys = ON');
     }
     
     private function initializeTables() {
         $this->createTables();
-        $this->migrateContactsEmailNullable();
+        $this->rebuildContactsEmailNullable($this->bootBudgetLeft());
         $this->ensureEnrichmentColumns();
         $this->ensureSettingsColumns();
         $this->ensureConfigTables();
@@ -88,7 +108,7 @@ class Database {
     public function applyBaselineSchema(): void
     {
         $this->createTables();
-        $this->migrateContactsEmailNullable();
+        $this->rebuildContactsEmailNullable($this->bootBudgetLeft());
         $this->ensureEnrichmentColumns();
         $this->ensureSettingsColumns();
         $this->ensureConfigTables();
@@ -208,39 +228,7 @@ class Database {
                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             ",
-            'contacts' => "
-                CREATE TABLE IF NOT EXISTS contacts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    first_name VARCHAR(50) NOT NULL,
-                    last_name VARCHAR(50) NOT NULL,
-                    email VARCHAR(100) UNIQUE,
-                    phone VARCHAR(20),
-                    company VARCHAR(100),
-                    position VARCHAR(100),
-                    address TEXT,
-                    city VARCHAR(50),
-                    state VARCHAR(50),
-                    zip_code VARCHAR(20),
-                    country VARCHAR(50),
-                    evm_address VARCHAR(42),
-                    twitter_handle VARCHAR(50),
-                    linkedin_profile VARCHAR(255),
-                    telegram_username VARCHAR(50),
-                    discord_username VARCHAR(50),
-                    github_username VARCHAR(50),
-                    website VARCHAR(255),
-                    contact_type VARCHAR(10) DEFAULT 'lead',
-                    contact_status VARCHAR(20) DEFAULT 'new',
-                    source VARCHAR(50),
-                    assigned_to INTEGER,
-                    notes TEXT,
-                    first_purchase_date DATE,
-                    total_purchases DECIMAL(10,2) DEFAULT 0.00,
-                    last_purchase_date DATE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ",
+            'contacts' => self::contactsTableSql(),
             'deals' => "
                 CREATE TABLE IF NOT EXISTS deals (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -343,9 +331,6 @@ class Database {
             $this->db->exec("ALTER TABLE users ADD COLUMN updated_at DATETIME");
             $this->db->exec("UPDATE users SET updated_at = COALESCE(created_at, datetime('now'))");
         }
-        
-        // MIGRATION: Make email nullable in contacts table
-        $this->migrateContactsEmailNullable();
     }
     
     private function createDefaultSettings() {
@@ -394,86 +379,81 @@ class Database {
         }
     }
     
-    private function migrateContactsEmailNullable() {
-        // Check if email is still NOT NULL in contacts table
-        $columns = $this->getTableInfo('contacts');
+    /**
+     * Make contacts.email nullable with an online chunked rebuild (resumable; see
+     * TableRebuilder). Boots pass what is left of BOOT_REBUILD_SECONDS, so large
+     * tables finish over several boots; tools/migrate.php runs it with its own
+     * --max-seconds. Returns the rebuild result, or null when nothing is needed.
+     */
+    public function rebuildContactsEmailNullable(?float $maxSeconds = null): ?array
+    {
         $emailColumn = null;
-        foreach ($columns as $col) {
+        foreach ($this->getTableInfo('contacts') as $col) {
             if ($col['name'] === 'email') {
                 $emailColumn = $col;
                 break;
             }
         }
-        
-        if ($emailColumn && $emailColumn['notnull'] == 1) {
-            // Email is still NOT NULL, we need to recreate the table
-            try {
-                // Create a backup of existing data
-                $this->db->exec("CREATE TABLE contacts_backup AS SELECT * FROM contacts");
-                
-                // Drop the old table
-                $this->db->exec("DROP TABLE contacts");
-                
-                // Create new table with nullable email
-                $this->db->exec("
-                    CREATE TABLE contacts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        first_name VARCHAR(50) NOT NULL,
-                        last_name VARCHAR(50) NOT NULL,
-                        email VARCHAR(100) UNIQUE,
-                        phone VARCHAR(20),
-                        company VARCHAR(100),
-                        position VARCHAR(100),
-                        address TEXT,
-                        city VARCHAR(50),
-                        state VARCHAR(50),
-                        zip_code VARCHAR(20),
-                        country VARCHAR(50),
-                        evm_address VARCHAR(42),
-                        twitter_handle VARCHAR(50),
-                        linkedin_profile VARCHAR(255),
-                        telegram_username VARCHAR(50),
-                        discord_username VARCHAR(50),
-                        github_username VARCHAR(50),
-                        website VARCHAR(255),
-                        contact_type VARCHAR(10) DEFAULT 'lead',
-                        contact_status VARCHAR(20) DEFAULT 'new',
-                        source VARCHAR(50),
-                        assigned_to INTEGER,
-                        notes TEXT,
-                        first_purchase_date DATE,
-                        total_purchases DECIMAL(10,2) DEFAULT 0.00,
-                        last_purchase_date DATE,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ");
-                
-                // Copy data back
-                $this->db->exec("INSERT INTO contacts SELECT * FROM contacts_backup");
-                
-                // Drop backup table
-                $this->db->exec("DROP TABLE contacts_backup");
-                
-                if (DEBUG_MODE) {
-                    error_log("Migrated contacts table to make email nullable");
-                }
-            } catch (Exception $e) {
-                if (DEBUG_MODE) {
-                    error_log("Migration failed: " . $e->getMessage());
-                }
-                // If migration fails, try to restore from backup
-                try {
-                    $this->db->exec("DROP TABLE IF EXISTS contacts");
-                    $this->db->exec("ALTER TABLE contacts_backup RENAME TO contacts");
-                } catch (Exception $e2) {
-                    if (DEBUG_MODE) {
-                        error_log("Backup restoration failed: " . $e2->getMessage());
-                    }
-                }
+        if (!$emailColumn || $emailColumn['notnull'] != 1) {
+            return null;
+        }
+
+        try {
+            require_once __DIR__ . '/TableRebuilder.php';
+            $result = (new TableRebuilder($this))->run('rebuild_contacts_email_nullable', [
+                'table' => 'contacts',
+                'create' => self::contactsTableSql('{table}'),
+                'keep_extra_columns' => true,
+                'description' => 'contacts.email nullable (chunked rebuild)',
+            ], $maxSeconds);
+            if ($result['complete'] && DEBUG_MODE) {
+                error_log("Migrated contacts table to make email nullable ({$result['rows_copied']} rows)");
             }
+            return $result;
+        } catch (Exception $e) {
+            // Shadow table + progress row are kept; the next boot resumes from the cursor.
+            error_log('contacts.email rebuild: ' . $e->getMessage());
+            return null;
         }
     }
+
+    /** Current contacts DDL; $name lets rebuilds create the shadow copy. */
+    public static function contactsTableSql(string $name = 'contacts'): string
+    {
+        return "
+            CREATE TABLE IF NOT EXISTS {$name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                first_name VARCHAR(50) NOT NULL,
+                last_name VARCHAR(50) NOT NULL,
+                email VARCHAR(100) UNIQUE,
+                phone VARCHAR(20),
+                company VARCHAR(100),
+                position VARCHAR(100),
+                address TEXT,
+                city VARCHAR(50),
+                state VARCHAR(50),
+                zip_code VARCHAR(20),
+                country VARCHAR(50),
+                evm_address VARCHAR(42),
+                twitter_handle VARCHAR(50),
+                linkedin_profile VARCHAR(255),
+                telegram_username VARCHAR(50),
+                discord_username VARCHAR(50),
+                github_username VARCHAR(50),
+                website VARCHAR(255),
+                contact_type VARCHAR(10) DEFAULT 'lead',
+                contact_status VARCHAR(20) DEFAULT 'new',
+                source VARCHAR(50),
+                assigned_to INTEGER,
+                notes TEXT,
+                first_purchase_date DATE,
+                total_purchases DECIMAL(10,2) DEFAULT 0.00,
+                last_purchase_date DATE,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ";
+    }
     
     public function getConnection() {
         return $this->db;
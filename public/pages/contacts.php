@@ -7,7 +7,9 @@
 // Get database instance
 $db = Database::getInstance();
 require_once __DIR__ . '/../includes/ContactTagService.php';
+require_once __DIR__ . '/../includes/ContactFacetService.php';
 $tagService = new ContactTagService($db);
+$facetService = new ContactFacetService($db);
 
 // Handle actions
 $action = $_GET['action'] ?? 'list';
@@ -89,11 +91,20 @@ if ($tag_filter !== '') {
     $params[] = $tag_filter;
 }
 
-// Get total count for pagination (use copy of params)
-$count_sql = "SELECT COUNT(*) as total FROM contacts WHERE $where";
-$count_params = $params; // Copy params for count query
-$total_result = $db->fetchOne($count_sql, $count_params);
-$total_contacts = $total_result['total'] ?? 0;
+// Get total count for pagination — from facet counts when a single filter allows it
+$total_contacts = $facetService->countForListFilters([
+    'type' => $type_filter,
+    'status' => $status_filter,
+    'enrichment_status' => $enrichment_filter,
+    'source' => $source_filter,
+    'tag' => $tag_filter,
+]);
+if ($total_contacts === null) {
+    $count_sql = "SELECT COUNT(*) as total FROM contacts WHERE $where";
+    $count_params = $params; // Copy params for count query
+    $total_result = $db->fetchOne($count_sql, $count_params);
+    $total_contacts = $total_result['total'] ?? 0;
+}
 $total_pages = ceil($total_contacts / $per_page);
 
 // Get contacts with pagination
@@ -109,13 +120,33 @@ foreach ($contacts as &$contact) {
 }
 unset($contact);
 
-// Get unique sources for the dropdown
-$sources_sql = "SELECT DISTINCT source FROM contacts WHERE source IS NOT NULL AND source != '' ORDER BY source";
-$sources_result = $db->fetchAll($sources_sql);
-$available_sources = array_column($sources_result, 'source');
+// Dropdown values + counts from precomputed facets (one small table read)
+$facets = $facetService->getFacets();
+$facet_counts = [];
+foreach ($facets['facets'] as $facet_name => $facet_rows) {
+    $facet_counts[$facet_name] = array_column($facet_rows, 'count', 'value');
+}
+$available_sources = array_values(array_filter(array_map('strval', array_keys($facet_counts['source'])), static fn($v) => $v !== ''));
+sort($available_sources, SORT_STRING);
+$available_tags = array_map('strval', array_keys($facet_counts['tag']));
+sort($available_tags, SORT_STRING);
+// Same TRIM as the "Not Enriched" WHERE clause: untrimmed 'enriched' buckets count as enriched
+if ($facets['total'] !== null) {
+    $enriched_count = 0;
+    foreach ($facet_counts['enrichment_status'] as $value => $n) {
+        if (trim((string) $value) === 'enriched') {
+            $enriched_count += $n;
+        }
+    }
+    $facet_counts['enrichment_status']['null'] = $facets['total'] - $enriched_count;
+    $facet_counts['source']['null'] = $facet_counts['source'][''] ?? 0;
+}
 
-$tags_result = $db->fetchAll("SELECT DISTINCT tag FROM contact_tags ORDER BY tag");
-$available_tags = array_column($tags_result, 'tag');
+/** " (n)" suffix for a filter option; empty when the value has no contacts or counts are not set up yet. */
+$facet_label = static function (string $facet, string $value) use ($facet_counts): string {
+    $n = $facet_counts[$facet][$value] ?? 0;
+    return $n > 0 ? ' (' . number_format($n) . ')' : '';
+};
 
 // Render the page using the template system
 renderHeader('Contacts');
@@ -166,36 +197,36 @@ renderPageHeader('Contacts', 'Leads and customers', ob_get_clean());
     <div class="filter-bar__field">
         <select name="type" class="form-select" aria-label="Contact type" onchange="this.form.submit()">
             <option value="">All Types</option>
-            <option value="lead" <?php echo $type_filter === 'lead' ? 'selected' : ''; ?>>Leads</option>
-            <option value="customer" <?php echo $type_filter === 'customer' ? 'selected' : ''; ?>>Customers</option>
+            <option value="lead" <?php echo $type_filter === 'lead' ? 'selected' : ''; ?>>Leads<?php echo $facet_label('contact_type', 'lead'); ?></option>
+            <option value="customer" <?php echo $type_filter === 'customer' ? 'selected' : ''; ?>>Customers<?php echo $facet_label('contact_type', 'customer'); ?></option>
         </select>
     </div>
     <div class="filter-bar__field">
         <select name="status" class="form-select" aria-label="Contact status" onchange="this.form.submit()">
             <option value="">All Statuses</option>
-            <option value="new" <?php echo $status_filter === 'new' ? 'selected' : ''; ?>>New</option>
-            <option value="qualified" <?php echo $status_filter === 'qualified' ? 'selected' : ''; ?>>Qualified</option>
-            <option value="active" <?php echo $status_filter === 'active' ? 'selected' : ''; ?>>Active</option>
-            <option value="inactive" <?php echo $status_filter === 'inactive' ? 'selected' : ''; ?>>Inactive</option>
+            <option value="new" <?php echo $status_filter === 'new' ? 'selected' : ''; ?>>New<?php echo $facet_label('contact_status', 'new'); ?></option>
+            <option value="qualified" <?php echo $status_filter === 'qualified' ? 'selected' : ''; ?>>Qualified<?php echo $facet_label('contact_status', 'qualified'); ?></option>
+            <option value="active" <?php echo $status_filter === 'active' ? 'selected' : ''; ?>>Active<?php echo $facet_label('contact_status', 'active'); ?></option>
+            <option value="inactive" <?php echo $status_filter === 'inactive' ? 'selected' : ''; ?>>Inactive<?php echo $facet_label('contact_status', 'inactive'); ?></option>
         </select>
     </div>
     <div class="filter-bar__field">
         <select name="enrichment_status" class="form-select" aria-label="Enrichment status" onchange="this.form.submit()">
             <option value="">All Enrichment</option>
-            <option value="enriched" <?php echo $enrichment_filter === 'enriched' ? 'selected' : ''; ?>>Enriched</option>
-            <option value="not_found" <?php echo $enrichment_filter === 'not_found' ? 'selected' : ''; ?>>Not Found</option>
-            <option value="failed" <?php echo $enrichment_filter === 'failed' ? 'selected' : ''; ?>>Failed</option>
-            <option value="pending" <?php echo $enrichment_filter === 'pending' ? 'selected' : ''; ?>>Pending</option>
-            <option value="null" <?php echo $enrichment_filter === 'null' ? 'selected' : ''; ?>>Not Enriched</option>
+            <option value="enriched" <?php echo $enrichment_filter === 'enriched' ? 'selected' : ''; ?>>Enriched<?php echo $facet_label('enrichment_status', 'enriched'); ?></option>
+            <option value="not_found" <?php echo $enrichment_filter === 'not_found' ? 'selected' : ''; ?>>Not Found<?php echo $facet_label('enrichment_status', 'not_found'); ?></option>
+            <option value="failed" <?php echo $enrichment_filter === 'failed' ? 'selected' : ''; ?>>Failed<?php echo $facet_label('enrichment_status', 'failed'); ?></option>
+            <option value="pending" <?php echo $enrichment_filter === 'pending' ? 'selected' : ''; ?>>Pending<?php echo $facet_label('enrichment_status', 'pending'); ?></option>
+            <option value="null" <?php echo $enrichment_filter === 'null' ? 'selected' : ''; ?>>Not Enriched<?php echo $facet_label('enrichment_status', 'null'); ?></option>
         </select>
     </div>
     <div class="filter-bar__field">
         <select name="source" class="form-select" aria-label="Source" onchange="this.form.submit()">
             <option value="">All Sources</option>
-            <option value="null" <?php echo $source_filter === 'null' ? 'selected' : ''; ?>>No Source</option>
+            <option value="null" <?php echo $source_filter === 'null' ? 'selected' : ''; ?>>No Source<?php echo $facet_label('source', 'null'); ?></option>
             <?php foreach ($available_sources as $source): ?>
                 <option value="<?php echo htmlspecialchars($source); ?>" <?php echo $source_filter === $source ? 'selected' : ''; ?>>
-                    <?php echo htmlspecialchars(ucfirst(str_replace('_', ' ', $source))); ?>
+                    <?php echo htmlspecialchars(ucfirst(str_replace('_', ' ', $source))) . $facet_label('source', (string) $source); ?>
                 </option>
             <?php endforeach; ?>
         </select>
@@ -205,7 +236,7 @@ renderPageHeader('Contacts', 'Leads and customers', ob_get_clean());
             <option value="">All Tags</option>
             <?php foreach ($available_tags as $tagOption): ?>
                 <option value="<?php echo htmlspecialchars($tagOption); ?>" <?php echo $tag_filter === $tagOption ? 'selected' : ''; ?>>
-                    <?php echo htmlspecialchars(crm_format_tag_label($tagOption)); ?>
+                    <?php echo htmlspecialchars(crm_format_tag_label($tagOption)) . $facet_label('tag', (string) $tagOption); ?>
                 </option>
             <?php endforeach; ?>
         </select>
@@ -9,7 +9,7 @@ $db = Database::getInstance();
 
 // Handle import actions
 $action = $_GET['action'] ?? 'form';
-$import_id = $_GET['id'] ?? null;
+$import_id = isset($_GET['id']) && ctype_digit((string) $_GET['id']) ? (int) $_GET['id'] : null;
 
 // Render the page using the template system
 renderHeader('Import Contacts');
@@ -188,6 +188,12 @@ renderHeader('Import Contacts');
                             </div>
                         </div>
                     </div>
+                    <div class="d-none" id="importProgress">
+                        <div class="progress mb-2">
+                            <div class="progress-bar progress-bar-striped progress-bar-animated" id="importProgressBar" role="progressbar" style="width: 0%">0%</div>
+                        </div>
+                        <small class="text-muted" id="importProgressText"></small>
+                    </div>
                     <div class="mt-3">
                         <button type="button" class="btn btn-primary" id="startImport">
                             <i class="bi bi-download"></i> Import Contacts
@@ -280,7 +286,11 @@ renderHeader('Import Contacts');
 </style>
 
 <script>
-let csvData = [];
+// Rows stay on the server; the browser only keeps the staged import id, headers and a sample
+let importId = <?php echo json_encode($import_id); ?>;
+let csvHeaders = [];
+let csvSample = [];
+let csvRowCount = 0;
 let fieldMapping = {};
 let importSource = '';
 let importNotes = '';
@@ -317,7 +327,12 @@ document.getElementById('csvUploadForm').addEventListener('submit', function(e)
     })
     .then(data => {
         if (data.success) {
-            csvData = data.data;
+            importId = data.import_id;
+            csvHeaders = data.headers || [];
+            csvSample = data.sample || [];
+            csvRowCount = data.rowCount;
+            // Reloading the page resumes this import
+            history.replaceState(null, '', '/?page=import_contacts&id=' + importId);
             populateCSVColumns();
             showStep(2);
         } else {
@@ -338,8 +353,8 @@ function populateCSVColumns() {
     const fieldMappingForm = document.getElementById('fieldMappingForm');
     fieldMappingForm.innerHTML = '';
     
-    if (csvData.length > 0) {
-        const headers = Object.keys(csvData[0]);
+    if (csvHeaders.length > 0) {
+        const headers = csvHeaders;
         
         // Define contact fields to map
         const contactFields = [
@@ -463,12 +478,12 @@ function updateNameSplitPreview() {
     const delimiter = document.getElementById('splitDelimiter').value;
     const preview = document.getElementById('nameSplitPreview');
     
-    if (!column || !csvData.length) {
+    if (!column || !csvSample.length) {
         preview.innerHTML = '<small class="text-muted">Select a column to see preview</small>';
         return;
     }
     
-    const sampleValue = csvData[0][column] || '';
+    const sampleValue = csvSample[0][column] || '';
     if (!sampleValue) {
         preview.innerHTML = '<small class="text-muted">No sample data available</small>';
         return;
@@ -600,7 +615,7 @@ function populateImportSummary() {
     const mappingDiv = document.getElementById('fieldMappingSummary');
     
     summaryDiv.innerHTML = `
-        <strong>Total Records:</strong> ${csvData.length}<br>
+        <strong>Total Records:</strong> ${csvRowCount}<br>
         <strong>Source:</strong> ${importSource}<br>
         <strong>Notes:</strong> ${importNotes || 'None'}
     `;
@@ -612,23 +627,26 @@ function populateImportSummary() {
     mappingDiv.innerHTML = mappingHtml;
 }
 
-// Step 4: Start Import
+// Step 4: Start Import — the server imports staged rows in chunks; poll until done
 document.getElementById('startImport').addEventListener('click', function() {
-    const importData = {
-        csvData: csvData,
+    this.disabled = true;
+    runImport({
         fieldMapping: fieldMapping,
         source: importSource,
         notes: importNotes,
         nameSplitConfig: nameSplitConfig
-    };
-    
-    fetch(crmApiUrl('import'), {
+    });
+});
+
+function runImport(payload) {
+    document.getElementById('importProgress').classList.remove('d-none');
+    fetch(crmApiUrl('import/' + importId + '/process'), {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
         },
         credentials: 'include',
-        body: JSON.stringify(importData)
+        body: JSON.stringify(payload)
     })
     .then(response => {
         return response.json().then(data => {
@@ -640,36 +658,47 @@ document.getElementById('startImport').addEventListener('click', function() {
         });
     })
     .then(data => {
-        if (data.success) {
+        updateImportProgress(data);
+        if (data.status === 'completed') {
             showImportResults(data);
         } else {
-            alert('Import failed: ' + (data.error || 'Unknown error'));
+            // Mapping is stored with the first chunk; later calls just resume
+            runImport({});
         }
     })
     .catch(error => {
         console.error('Error:', error);
+        document.getElementById('startImport').disabled = false;
         if (error.message.includes('JSON')) {
             alert('Server returned invalid response. Please try again or contact support.');
         } else {
-            alert('Network error: ' + error.message);
+            alert('Import interrupted: ' + error.message + '. Click Import Contacts to resume.');
         }
     });
-});
+}
+
+function updateImportProgress(data) {
+    const bar = document.getElementById('importProgressBar');
+    bar.style.width = data.percent + '%';
+    bar.textContent = data.percent + '%';
+    document.getElementById('importProgressText').textContent =
+        `${data.processed} of ${data.row_count} rows processed (${data.success_count} imported, ${data.error_count} failed)`;
+}
 
 function showImportResults(data) {
     const resultsDiv = document.getElementById('importResultsContent');
     resultsDiv.innerHTML = `
         <div class="alert alert-success">
             <h6>Import Completed Successfully!</h6>
-            <p><strong>Total Processed:</strong> ${data.totalProcessed}</p>
-            <p><strong>Successfully Imported:</strong> ${data.successCount}</p>
-            <p><strong>Failed:</strong> ${data.errorCount}</p>
+            <p><strong>Total Processed:</strong> ${data.processed}</p>
+            <p><strong>Successfully Imported:</strong> ${data.success_count}</p>
+            <p><strong>Failed:</strong> ${data.error_count}</p>
         </div>
         ${data.errors.length > 0 ? `
             <div class="alert alert-warning">
-                <h6>Errors:</h6>
+                <h6>Errors${data.error_count > data.errors.length ? ` (first ${data.errors.length})` : ''}:</h6>
                 <ul class="mb-0">
-                    ${data.errors.map(error => `<li>Row ${error.row}: ${error.message}</li>`).join('')}
+                    ${data.errors.map(error => `<li>Row ${error.row}: ${escapeHtml(error.message)}</li>`).join('')}
                 </ul>
             </div>
         ` : ''}
@@ -679,10 +708,45 @@ function showImportResults(data) {
     document.getElementById('step4').classList.add('d-none');
 }
 
+// Resume an interrupted import (?page=import_contacts&id=N)
+if (importId) {
+    fetch(crmApiUrl('import/' + importId), { credentials: 'include' })
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (!data) {
+                importId = null;
+                return;
+            }
+            csvHeaders = data.headers || [];
+            csvSample = data.sample || [];
+            csvRowCount = data.row_count;
+            if (data.status === 'staged') {
+                populateCSVColumns();
+                showStep(2);
+            } else if (data.status === 'processing') {
+                showStep(4);
+                document.getElementById('startImport').disabled = true;
+                updateImportProgress(data);
+                runImport({});
+            } else {
+                fetch(crmApiUrl('import/' + importId + '/progress'), { credentials: 'include' })
+                    .then(response => response.json())
+                    .then(showImportResults);
+            }
+        });
+}
+
 // Back to Step 1
 document.getElementById('backToStep1').addEventListener('click', function() {
-    // Reset everything
-    csvData = [];
+    // Reset everything (discard the staged rows if the import never started)
+    if (importId && !document.getElementById('startImport').disabled) {
+        fetch(crmApiUrl('import/' + importId), { method: 'DELETE', credentials: 'include' });
+    }
+    importId = null;
+    history.replaceState(null, '', '/?page=import_contacts');
+    csvHeaders = [];
+    csvSample = [];
+    csvRowCount = 0;
     fieldMapping = {};
     importSource = '';
     importNotes = '';
@@ -695,6 +759,12 @@ document.getElementById('backToStep1').addEventListener('click', function() {
     document.getElementById('importResults').classList.add('d-none');
 });
 
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
 function showStep(stepNumber) {
     // Hide all steps
     for (let i = 1; i <= 4; i++) {
@@ -1,50 +1,190 @@
 """
 Pytest configuration for Live Tests
 Best Jobs in TA - Browser-based testing with Playwright
+
+Each pytest-xdist worker (``-n N``) gets its own PHP server port and its own
+copy of the database, so sharded browser suites never share state. Login
+happens once per worker; the PHP session file it creates is snapshotted and
+every ``authenticated_page`` context gets its own copy under a new session id,
+so no test sees session state (UI preferences, logout) left by another. Mark
+a test ``@pytest.mark.fresh_session`` to log in through the form instead.
+
+Performance-budget tests (test_performance_budgets.py) run against a second
+server per worker whose database copy is seeded with a large dataset; their
+metrics are collected into perf_report.json by the controller.
 """
 
-import pytest
+import json
 import os
-import sys
+import secrets
+import socket
+import sqlite3
 import subprocess
-from playwright.sync_api import Playwright, Browser, Page
+import sys
+import time
+
+import pytest
+from playwright.sync_api import Browser
 
 # Add the project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, project_root)
 
-# Server configuration
+# Worker identity ("gw0", "gw1", ... under pytest-xdist; "master" otherwise)
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "master")
+WORKER_INDEX = int(WORKER_ID[2:]) if WORKER_ID.startswith("gw") else 0
+
+# Server configuration (one port per worker)
 SERVER_HOST = "localhost"
-SERVER_PORT = 8000
+SERVER_PORT = int(os.environ.get("LIVE_SERVER_PORT", "8000")) + WORKER_INDEX
 SERVER_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
 
 # Test database configuration
 TEST_DB_PATH = os.path.join(project_root, "db", "test_crm.db")
+# Seed copied per worker; must contain the admin / admin123 user
+TEMPLATE_DB_PATH = os.environ.get("LIVE_TEMPLATE_DB", os.path.join(project_root, "db", "crm.db"))
+# Makes `php -S` honour CRM_DB_PATH without touching application config
+DB_OVERRIDE_PREPEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db_override.php")
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin123"
+
+TIMING_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timing_report.json")
+PERF_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_report.json")
+
+# Perf server: offset port and a seeded copy of the template database
+PERF_SERVER_PORT = SERVER_PORT + 100
+PERF_SERVER_URL = f"http://{SERVER_HOST}:{PERF_SERVER_PORT}"
+PERF_CONTACTS = int(os.environ.get("LIVE_PERF_CONTACTS", "5000"))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("live", "Sanctum CRM live tests")
+    group.addoption(
+        "--fresh-login",
+        action="store_true",
+        default=False,
+        help="Log in through login.php for every authenticated test (old behaviour; for timing baselines)",
+    )
+    group.addoption(
+        "--timing-report",
+        default=TIMING_REPORT_PATH,
+        help="Where to write the per-test setup/call timing report (JSON)",
+    )
+    group.addoption(
+        "--timing-baseline",
+        default=None,
+        help="Earlier timing report to compare setup cost against",
+    )
+    group.addoption(
+        "--perf-budgets",
+        default=None,
+        help="Per-page performance budget file (default: tests/live/perf_budgets.json)",
+    )
+    group.addoption(
+        "--perf-report",
+        default=PERF_REPORT_PATH,
+        help="Where to write measured page metrics and budget violations (JSON)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "fresh_session: give authenticated_page its own login instead of the worker's shared session",
+    )
+
+
+def _copy_template_db(tmp_path_factory, name):
+    if not os.path.exists(TEMPLATE_DB_PATH):
+        pytest.skip(f"Template database not found: {TEMPLATE_DB_PATH}")
+    path = tmp_path_factory.mktemp(f"{name}_{WORKER_ID}") / "crm.db"
+    # backup() copies a consistent snapshot even if the template is in WAL mode
+    src = sqlite3.connect(TEMPLATE_DB_PATH)
+    dst = sqlite3.connect(str(path))
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return str(path)
 
 
 @pytest.fixture(scope="session")
-def server_process():
-    """Start the PHP server for testing"""
-    # Start PHP server in background
+def live_db(tmp_path_factory):
+    """Private copy of the template database for this worker."""
+    return _copy_template_db(tmp_path_factory, "db")
+
+
+@pytest.fixture(scope="session")
+def perf_db(tmp_path_factory):
+    """Template copy seeded with LIVE_PERF_CONTACTS contacts (and deals) for budget runs."""
+    from perf_budgets import seed_large_dataset
+
+    path = _copy_template_db(tmp_path_factory, "perf_db")
+    seed_large_dataset(path, contacts=PERF_CONTACTS)
+    return path
+
+
+def _wait_for_port(host, port, process, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"PHP server exited early (code {process.returncode})")
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"PHP server did not start on {host}:{port}")
+
+
+def _start_server(port, db_path, session_dir=None):
     server_cmd = [
         "php",
+        "-d",
+        f"auto_prepend_file={DB_OVERRIDE_PREPEND}",
+    ]
+    if session_dir:
+        # Known location so authenticated_page can clone the login session file
+        server_cmd += ["-d", f"session.save_path={session_dir}"]
+    server_cmd += [
         "-S",
-        f"{SERVER_HOST}:{SERVER_PORT}",
+        f"{SERVER_HOST}:{port}",
         "-t",
         os.path.join(project_root, "public")
     ]
+    env = os.environ.copy()
+    env["CRM_DB_PATH"] = db_path
 
     # Start server process
     process = subprocess.Popen(
         server_cmd,
         cwd=project_root,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
     )
 
-    # Wait a moment for server to start
-    import time
-    time.sleep(2)
+    # Poll until the server accepts connections instead of a fixed sleep
+    try:
+        _wait_for_port(SERVER_HOST, port, process)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+@pytest.fixture(scope="session")
+def session_dir(tmp_path_factory):
+    """session.save_path of this worker's PHP server."""
+    return str(tmp_path_factory.mktemp(f"sessions_{WORKER_ID}"))
+
+
+@pytest.fixture(scope="session")
+def server_process(live_db, session_dir):
+    """Start the PHP server for testing (one per worker, on its own database)"""
+    process = _start_server(SERVER_PORT, live_db, session_dir)
 
     yield process
 
@@ -53,6 +193,100 @@ def server_process():
     process.wait()
 
 
+@pytest.fixture(scope="session")
+def perf_server(perf_db):
+    """PHP server on the seeded perf database; yields its base URL."""
+    process = _start_server(PERF_SERVER_PORT, perf_db)
+
+    yield PERF_SERVER_URL
+
+    process.terminate()
+    process.wait()
+
+
+SESSION_COOKIE = "crm_session"
+
+
+def _login(page, server_url=SERVER_URL):
+    page.goto(f"{server_url}/login.php")
+    page.fill("input[name='username']", ADMIN_USERNAME)
+    page.fill("input[name='password']", ADMIN_PASSWORD)
+    page.click("button[type='submit']")
+    page.wait_for_url("**/index.php?page=dashboard")
+
+
+@pytest.fixture(scope="session")
+def auth_session(browser: Browser, server_process, session_dir):
+    """Log in once per worker; returns the logged-in PHP session file's contents."""
+    context = browser.new_context(ignore_https_errors=True)
+    try:
+        _login(context.new_page())
+        cookie = next(c for c in context.cookies() if c["name"] == SESSION_COOKIE)
+        path = os.path.join(session_dir, f"sess_{cookie['value']}")
+        # PHP writes the session file at request shutdown; wait until it holds the login
+        deadline = time.monotonic() + 5.0
+        while True:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            if b"user_id|" in data or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        assert b"user_id|" in data, f"login session not written to {path}"
+        return data
+    finally:
+        context.close()
+
+
+def _clone_session(context, session_dir, data):
+    """Give context a copy of the login session under a new id; returns the file path."""
+    sid = secrets.token_hex(16)
+    path = os.path.join(session_dir, f"sess_{sid}")
+    with open(path, "wb") as fh:
+        fh.write(data)
+    context.add_cookies([{"name": SESSION_COOKIE, "value": sid, "url": SERVER_URL}])
+    return path
+
+
+@pytest.fixture(scope="session")
+def perf_storage_state(browser: Browser, perf_server, tmp_path_factory):
+    """Session cookie for the perf server (separate database, separate session)."""
+    path = tmp_path_factory.mktemp(f"perf_auth_{WORKER_ID}") / "storage_state.json"
+    context = browser.new_context(ignore_https_errors=True)
+    try:
+        _login(context.new_page(), perf_server)
+        context.storage_state(path=str(path))
+    finally:
+        context.close()
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def api_client(server_process):
+    """Pooled API client for this worker's server; the key comes from a login, not the database."""
+    from crm_client import CRMClient
+
+    client = CRMClient.from_login(SERVER_URL, ADMIN_USERNAME, ADMIN_PASSWORD)
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def anonymous_api_client(server_process):
+    """Client without credentials (and without retries) for auth/error tests."""
+    from crm_client import CRMClient, RetryPolicy
+
+    client = CRMClient(SERVER_URL, retry=RetryPolicy.none())
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def perf_budgets(request):
+    from perf_budgets import BUDGETS_PATH, load_budgets
+
+    return load_budgets(request.config.getoption("--perf-budgets") or BUDGETS_PATH)
+
+
 @pytest.fixture(scope="function")
 def browser_context(browser: Browser):
     """Create a fresh browser context for each test"""
@@ -73,28 +307,156 @@ def page(browser_context):
 
 
 @pytest.fixture(scope="function")
-def authenticated_page(page, server_process):
-    """Create an authenticated page for tests that need login"""
-    # Navigate to login page
-    page.goto(f"{SERVER_URL}/login.php")
-
-    # Fill login form (assuming default admin credentials)
-    page.fill("input[name='username']", "admin")
-    page.fill("input[name='password']", "admin123")
-    page.click("button[type='submit']")
+def authenticated_page(request, browser: Browser, server_process, session_dir):
+    """Create an authenticated page for tests that need login.
 
-    # Wait for redirect to dashboard
-    page.wait_for_url("**/index.php?page=dashboard")
+    A new context per test keeps cookies and storage isolated. Its session is
+    a copy of the worker's login session file under a fresh id, so there is
+    no login round trip and no session state shared between tests. Tests
+    marked fresh_session (or every test under --fresh-login) log in through
+    the form instead. Either way the time spent is recorded as "session" in
+    the timing report.
+    """
+    fresh = request.config.getoption("--fresh-login") or request.node.get_closest_marker("fresh_session")
+    if not fresh:
+        data = request.getfixturevalue("auth_session")
+    context = browser.new_context(viewport={'width': 1280, 'height': 720}, ignore_https_errors=True)
+    page = context.new_page()
+    clone = None
+    started = time.perf_counter()
+    if fresh:
+        _login(page)
+    else:
+        clone = _clone_session(context, session_dir, data)
+    request.node.user_properties.append(("session", round(time.perf_counter() - started, 4)))
+    yield page
+    context.close()
+    if clone and os.path.exists(clone):
+        os.remove(clone)
 
-    return page
 
+# --- Timing report ---------------------------------------------------------
 
-def pytest_configure(config):
-    """Configure pytest for live tests"""
-    # Ensure test database exists and is clean
-    if not os.path.exists(TEST_DB_PATH):
-        os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
-
-        # Initialize test database by running a quick setup
-        # This would normally be done by the application, but for testing we need it ready
-        pass
+# nodeid -> {"setup", "call", "teardown", "session", "worker"}; filled on the controller
+_TIMINGS = {}
+# page name -> {"metrics", "budgets", "over"}; sent by tests via user_properties
+_PERF = {}
+
+
+def _is_controller(config):
+    # xdist workers forward their reports to the controller, which writes the report
+    return not hasattr(config, "workerinput")
+
+
+def pytest_runtest_logreport(report):
+    entry = _TIMINGS.setdefault(
+        report.nodeid, {"setup": 0.0, "call": 0.0, "teardown": 0.0, "session": 0.0, "worker": WORKER_ID}
+    )
+    entry[report.when] = round(report.duration, 4)
+    gateway = getattr(getattr(report, "node", None), "gateway", None)
+    if gateway is not None:
+        entry["worker"] = gateway.id
+    if report.when == "setup":
+        for name, value in report.user_properties:
+            if name == "session":
+                entry["session"] = value
+    elif report.when == "call":
+        # user_properties are serialised back from xdist workers, fixtures are not
+        for name, value in report.user_properties:
+            if name == "perf":
+                _PERF[value["page"]] = value
+
+
+def _summarise(timings):
+    setups = sorted(t["setup"] for t in timings.values())
+    total = sum(setups)
+    # Login (--fresh-login) or session clone; already inside setup, shown on its own
+    session_total = sum(t.get("session", 0.0) for t in timings.values())
+    return {
+        "tests": len(setups),
+        "setup_total_s": round(total, 3),
+        "setup_mean_s": round(total / len(setups), 4) if setups else 0.0,
+        "setup_max_s": round(setups[-1], 4) if setups else 0.0,
+        "session_total_s": round(session_total, 3),
+    }
+
+
+def _write_perf_report(terminalreporter, config):
+    from perf_budgets import format_diff
+
+    path = config.getoption("--perf-report")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"contacts_seeded": PERF_CONTACTS, "pages": _PERF}, fh, indent=2, sort_keys=True)
+
+    tr = terminalreporter
+    tr.write_sep("-", "front-end performance budgets")
+    keys = ["ttfb_ms", "load_ms", "lcp_ms", "requests", "transfer_bytes", "dom_nodes"]
+    tr.write_line(f"{'page':<16}" + "".join(f"{k:>16}" for k in keys))
+    for name in sorted(_PERF):
+        metrics = _PERF[name]["metrics"]
+        cells = ["-" if metrics.get(k) is None else f"{metrics[k]:,.0f}" for k in keys]
+        tr.write_line(f"{name:<16}" + "".join(f"{c:>16}" for c in cells))
+    for name in sorted(_PERF):
+        over = _PERF[name]["over"]
+        if over:
+            tr.write_line(format_diff(name, [tuple(o) for o in over]))
+    tr.write_line(f"report: {path}")
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _is_controller(config):
+        return
+    if _PERF:
+        _write_perf_report(terminalreporter, config)
+    if not _TIMINGS:
+        return
+    timings = _TIMINGS
+    report = {
+        "mode": "fresh-login" if config.getoption("--fresh-login") else "session-clone",
+        "workers": len({t["worker"] for t in timings.values()}),
+        "summary": _summarise(timings),
+        "tests": timings,
+    }
+    path = config.getoption("--timing-report")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+
+    tr = terminalreporter
+    tr.write_sep("-", "live test setup timing")
+    s = report["summary"]
+    tr.write_line(
+        f"{report['mode']}, {report['workers']} worker(s): {s['tests']} tests, "
+        f"setup total {s['setup_total_s']:.2f}s, mean {s['setup_mean_s'] * 1000:.0f}ms, max {s['setup_max_s'] * 1000:.0f}ms, "
+        f"of which session {s['session_total_s']:.2f}s"
+    )
+
+    baseline_path = config.getoption("--timing-baseline")
+    if not baseline_path:
+        tr.write_line(f"report: {path}")
+        return
+    try:
+        with open(baseline_path, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    except (OSError, ValueError) as exc:
+        tr.write_line(f"could not read timing baseline {baseline_path}: {exc}")
+        return
+
+    before = baseline.get("tests", {})
+    tr.write_line(f"{'test':<70} {'before':>9} {'after':>9} {'delta':>9}")
+    for nodeid in sorted(timings):
+        after_s = timings[nodeid]["setup"]
+        if nodeid not in before:
+            continue
+        before_s = before[nodeid].get("setup", 0.0)
+        tr.write_line(
+            f"{nodeid[-70:]:<70} {before_s * 1000:>7.0f}ms {after_s * 1000:>7.0f}ms {(after_s - before_s) * 1000:>+7.0f}ms"
+        )
+    b = baseline.get("summary", {})
+    tr.write_line(
+        f"setup total: {b.get('setup_total_s', 0):.2f}s ({baseline.get('mode', '?')}) -> "
+        f"{s['setup_total_s']:.2f}s ({report['mode']})"
+    )
+    tr.write_line(
+        f"session login/clone: {b.get('session_total_s', 0):.2f}s -> {s['session_total_s']:.2f}s"
+    )
+    tr.write_line(f"report: {path}")
@@ -0,0 +1,28 @@
+"""
+Sanctum CRM API client for the live suites and load tooling.
+
+    from crm_client import CRMClient
+
+    with CRMClient.from_login(SERVER_URL, "admin", "admin123") as api:
+        for contact in api.iter_contacts(page_size=200, source="LinkedIn"):
+            ...
+        ids = api.create_contacts([{"first_name": "A", "last_name": "B"}])
+        api.download_export("contacts.csv", type="lead")
+
+AsyncCRMClient offers the same methods as coroutines / async iterators and
+needs httpx. Both keep one keep-alive connection pool per instance and retry
+429/5xx with backoff (see RetryPolicy).
+"""
+
+from .aio import AsyncCRMClient
+from .base import MAX_BATCH_OPERATIONS, MAX_PAGE_SIZE, CRMAPIError, RetryPolicy
+from .sync import CRMClient
+
+__all__ = [
+    "AsyncCRMClient",
+    "CRMAPIError",
+    "CRMClient",
+    "MAX_BATCH_OPERATIONS",
+    "MAX_PAGE_SIZE",
+    "RetryPolicy",
+]
@@ -0,0 +1,199 @@
+"""
+asyncio client on a pooled httpx.AsyncClient; same surface as CRMClient
+with coroutines and async iterators.
+"""
+
+import asyncio
+
+try:
+    import httpx
+except ImportError:  # optional: only the async client needs it
+    httpx = None
+
+from .base import (
+    CRMAPIError,
+    Page,
+    RetryPolicy,
+    api_target,
+    batch_chunks,
+    batch_results,
+    create_operations,
+    created_ids,
+    decode_body,
+    delete_operations,
+    find_api_key,
+    retry_after_seconds,
+    update_operations,
+)
+
+
+class AsyncCRMClient:
+    """Sanctum CRM API v1 client for asyncio load generators.
+
+    A single instance is safe to share between tasks; max_connections caps
+    the keep-alive pool (and therefore server concurrency).
+    """
+
+    def __init__(self, base_url, api_key=None, *, timeout=30.0, retry=None, max_connections=20,
+                 path_param=False, client=None, keep_cookies=False):
+        if httpx is None and client is None:
+            raise RuntimeError("AsyncCRMClient requires httpx (pip install -r tests/live/requirements.txt)")
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.path_param = path_param
+        headers = {"Accept": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        self.client = client or httpx.AsyncClient(
+            timeout=timeout,
+            headers=headers,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._owns_client = client is None
+        self.keep_cookies = keep_cookies
+
+    @classmethod
+    async def from_login(cls, base_url, username, password, **kwargs):
+        """Async counterpart of CRMClient.from_login."""
+        if httpx is None:
+            raise RuntimeError("AsyncCRMClient requires httpx (pip install -r tests/live/requirements.txt)")
+        base_url = base_url.rstrip("/")
+        async with httpx.AsyncClient(timeout=kwargs.get("timeout", 30.0)) as web:
+            resp = await web.post(f"{base_url}/login.php", data={"username": username, "password": password})
+            if resp.status_code not in (302, 303) or "crm_session" not in web.cookies:
+                raise CRMAPIError(resp.status_code, {"error": "Login failed"}, "POST", "/login.php")
+            # Session-authenticated for the bootstrap calls only
+            probe = cls(base_url, client=web, keep_cookies=True, **kwargs)
+            api_key, user_id = find_api_key((await probe.get("/users")).get("users", []), username)
+            if not api_key and user_id is not None:
+                api_key = (await probe.put(f"/users/{user_id}", json={"regenerate_api_key": True})).get("api_key")
+        if not api_key:
+            raise CRMAPIError(403, {"error": f"No API key available for {username}"}, "GET", "/users")
+        return cls(base_url, api_key, **kwargs)
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    # Transport -------------------------------------------------------------
+
+    async def send(self, method, path, *, params=None, json=None, data=None, files=None, headers=None, stream=False,
+                   retry=None):
+        """Issue one request with retries; returns the final httpx.Response (any status).
+
+        With stream=True the body is left unread (close it with aclose()); only
+        responses whose body has not been consumed are retried.
+        """
+        policy = retry if retry is not None else self.retry
+        url, query = api_target(self.base_url, path, params, self.path_param)
+        attempt = 0
+        while True:
+            try:
+                req = self.client.build_request(method, url, params=query, json=json, data=data, files=files,
+                                                headers=headers)
+                resp = await self.client.send(req, stream=stream)
+            except httpx.TransportError:
+                if not policy.can_retry(method, attempt):
+                    raise
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            if not self.keep_cookies:
+                # Cookie-less like the sync client: API-key calls carry no PHP session
+                self.client.cookies.clear()
+            if not policy.can_retry(method, attempt, resp.status_code):
+                return resp
+            body = None if stream else decode_body(resp.content, resp.json)
+            wait = policy.delay(attempt, retry_after_seconds(resp.headers, body))
+            if wait is None:
+                return resp
+            await resp.aclose()
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    async def request(self, method, path, **kwargs):
+        """send() + JSON decode; raises CRMAPIError for 4xx/5xx."""
+        resp = await self.send(method, path, **kwargs)
+        body = decode_body(resp.content, resp.json)
+        if resp.status_code >= 400:
+            raise CRMAPIError(resp.status_code, body, method, path)
+        return body
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request("PUT", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("DELETE", path, **kwargs)
+
+    # Pagination ------------------------------------------------------------
+
+    async def paginate(self, path, key, page_size=100, **filters):
+        page = Page(key, page_size, filters)
+        while not page.done:
+            for item in page.advance(await self.get(path, params=page.params())):
+                yield item
+
+    def iter_contacts(self, page_size=100, **filters):
+        return self.paginate("/contacts", "contacts", page_size, **filters)
+
+    def iter_deals(self, page_size=100):
+        return self.paginate("/deals", "deals", page_size)
+
+    # Export ----------------------------------------------------------------
+
+    async def iter_export(self, chunk_size=65536, **filters):
+        """Stream GET /contacts/export as raw CSV byte chunks."""
+        resp = await self.send("GET", "/contacts/export", params={"format": "csv", **filters}, stream=True)
+        try:
+            if resp.status_code >= 400:
+                await resp.aread()
+                raise CRMAPIError(resp.status_code, decode_body(resp.content, resp.json), "GET", "/contacts/export")
+            async for chunk in resp.aiter_bytes(chunk_size):
+                yield chunk
+        finally:
+            await resp.aclose()
+
+    async def download_export(self, dest, chunk_size=65536, **filters):
+        """Write the CSV export to a path or binary file object; returns bytes written."""
+        written = 0
+        fh = open(dest, "wb") if isinstance(dest, (str, bytes)) or hasattr(dest, "__fspath__") else dest
+        try:
+            async for chunk in self.iter_export(chunk_size, **filters):
+                fh.write(chunk)
+                written += len(chunk)
+        finally:
+            if fh is not dest:
+                fh.close()
+        return written
+
+    # Bulk ------------------------------------------------------------------
+
+    async def batch(self, operations, atomic=False):
+        """POST /batch in chunks of 50; atomic applies per chunk."""
+        results = []
+        for chunk in batch_chunks(list(operations)):
+            body = await self.post("/batch", json={"operations": chunk, "atomic": atomic})
+            results.extend(batch_results(body))
+        return results
+
+    async def create_contacts(self, rows, atomic=False):
+        return created_ids(await self.batch(create_operations("contacts", rows), atomic))
+
+    async def update_contacts(self, updates, atomic=False):
+        return await self.batch(update_operations("contacts", updates), atomic)
+
+    async def delete_contacts(self, ids, atomic=False):
+        return await self.batch(delete_operations("contacts", ids), atomic)
@@ -0,0 +1,160 @@
+"""
+Transport-independent pieces shared by the sync and asyncio clients:
+errors, retry policy, URL building, pagination and bulk request shaping.
+"""
+
+import random
+from dataclasses import dataclass, field
+
+# Statuses worth retrying: rate limited, or the server/proxy failed transiently
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Server-side limits (see contacts handler and API_BATCH_MAX_OPERATIONS)
+MAX_PAGE_SIZE = 500
+MAX_BATCH_OPERATIONS = 50
+
+
+class CRMAPIError(Exception):
+    """Non-2xx response after retries; carries the decoded error body."""
+
+    def __init__(self, status, body=None, method=None, path=None):
+        self.status = status
+        self.body = body
+        self.method = method
+        self.path = path
+        message = body.get("error") if isinstance(body, dict) else None
+        super().__init__(f"{method} {path} -> {status}: {message or body!r}")
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    429 is always retried (the rate limiter rejects before anything runs);
+    5xx and connection errors are only retried for idempotent methods unless
+    retry_non_idempotent is set. A Retry-After header or "retry_after" body
+    field is honoured up to max_wait; longer waits fail immediately.
+    """
+
+    max_retries: int = 4
+    backoff: float = 0.25
+    max_backoff: float = 8.0
+    max_wait: float = 30.0
+    statuses: frozenset = field(default_factory=lambda: RETRY_STATUSES)
+    retry_non_idempotent: bool = False
+
+    @classmethod
+    def none(cls):
+        """No retries (latency measurement, replay of recorded traffic)."""
+        return cls(max_retries=0)
+
+    def can_retry(self, method, attempt, status=None):
+        if attempt >= self.max_retries:
+            return False
+        if status is not None and status not in self.statuses:
+            return False
+        if status == 429:
+            return True
+        return self.retry_non_idempotent or method.upper() in IDEMPOTENT_METHODS
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to sleep before retry `attempt` (0-based); None means give up."""
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_wait else None
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+def retry_after_seconds(headers, body):
+    value = headers.get("Retry-After") if headers is not None else None
+    if value is None and isinstance(body, dict):
+        value = body.get("retry_after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def api_target(base_url, path, params=None, path_param=False):
+    """URL and query params for an API path such as "/contacts/12/enrich".
+
+    Pretty URLs (/api/v1/contacts) work with php -S and the shipped rewrite
+    rules; path_param=True uses index.php?path=... for stock nginx.
+    """
+    path = "/" + path.lstrip("/")
+    params = dict(params or {})
+    if path_param:
+        params["path"] = path
+        return f"{base_url}/api/v1/index.php", params
+    return f"{base_url}/api/v1{path}", params
+
+
+def decode_body(content, json_loader):
+    if not content:
+        return None
+    try:
+        return json_loader()
+    except ValueError:
+        return None
+
+
+class Page:
+    """Offset pagination state for list endpoints.
+
+    /contacts returns {"contacts", "total", "limit", "offset"}. Endpoints that
+    ignore limit/offset (e.g. /deals, which returns {"deals", "count"}) have no
+    "total" and are treated as a single page.
+    """
+
+    def __init__(self, key, page_size, filters=None):
+        self.key = key
+        self.limit = max(1, min(MAX_PAGE_SIZE, int(page_size)))
+        self.offset = 0
+        self.filters = dict(filters or {})
+        self.done = False
+
+    def params(self):
+        return {**self.filters, "limit": self.limit, "offset": self.offset}
+
+    def advance(self, body):
+        """Consume one response body; returns its items and updates state."""
+        items = (body or {}).get(self.key) or []
+        total = (body or {}).get("total")
+        self.offset += len(items)
+        if total is None or not items or len(items) < self.limit or self.offset >= int(total):
+            self.done = True
+        return items
+
+
+def batch_chunks(operations, size=MAX_BATCH_OPERATIONS):
+    for start in range(0, len(operations), size):
+        yield operations[start:start + size]
+
+
+def create_operations(resource, rows):
+    return [{"method": "POST", "path": f"/{resource}", "body": row} for row in rows]
+
+
+def update_operations(resource, updates):
+    return [{"method": "PUT", "path": f"/{resource}/{rid}", "body": body} for rid, body in updates.items()]
+
+
+def delete_operations(resource, ids):
+    return [{"method": "DELETE", "path": f"/{resource}/{rid}"} for rid in ids]
+
+
+def batch_results(response_body):
+    """Flatten a /batch response into its per-operation results."""
+    return (response_body or {}).get("results", [])
+
+
+def created_ids(results):
+    return [r["body"]["id"] for r in results
+            if r.get("status") in (200, 201) and isinstance(r.get("body"), dict) and "id" in r["body"]]
+
+
+def find_api_key(users, username):
+    for user in users:
+        if user.get("username") == username:
+            return user.get("api_key"), user.get("id")
+    return None, None
@@ -0,0 +1,194 @@
+"""
+Blocking client on a pooled, keep-alive requests.Session.
+"""
+
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .base import (
+    CRMAPIError,
+    Page,
+    RetryPolicy,
+    api_target,
+    batch_chunks,
+    batch_results,
+    create_operations,
+    created_ids,
+    decode_body,
+    delete_operations,
+    find_api_key,
+    retry_after_seconds,
+    update_operations,
+)
+
+
+class CRMClient:
+    """Sanctum CRM API v1 client.
+
+    One instance holds one connection pool; share it across a test module or
+    give each load-generator thread its own. Cookies are not kept, so API-key
+    requests behave like an external integration (no PHP session per client).
+    """
+
+    def __init__(self, base_url, api_key=None, *, timeout=30.0, retry=None, pool_size=10,
+                 path_param=False, session=None, keep_cookies=False):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.path_param = path_param
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not keep_cookies:
+            self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.session.headers["Accept"] = "application/json"
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    @classmethod
+    def from_login(cls, base_url, username, password, **kwargs):
+        """Resolve the user's API key through a web login instead of reading the database.
+
+        Logs in via login.php, reads the key from GET /users (admin only) and
+        issues one with regenerate_api_key if the user has none yet.
+        """
+        base_url = base_url.rstrip("/")
+        with requests.Session() as web:
+            resp = web.post(f"{base_url}/login.php", data={"username": username, "password": password},
+                            allow_redirects=False, timeout=kwargs.get("timeout", 30.0))
+            if resp.status_code not in (302, 303) or "crm_session" not in web.cookies:
+                raise CRMAPIError(resp.status_code, {"error": "Login failed"}, "POST", "/login.php")
+            # Session-authenticated for the bootstrap calls only
+            probe = cls(base_url, session=web, keep_cookies=True, **kwargs)
+            api_key, user_id = find_api_key(probe.get("/users").get("users", []), username)
+            if not api_key and user_id is not None:
+                api_key = probe.put(f"/users/{user_id}", json={"regenerate_api_key": True}).get("api_key")
+        if not api_key:
+            raise CRMAPIError(403, {"error": f"No API key available for {username}"}, "GET", "/users")
+        return cls(base_url, api_key, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Transport -------------------------------------------------------------
+
+    def send(self, method, path, *, params=None, json=None, data=None, files=None, headers=None, stream=False,
+             retry=None):
+        """Issue one request with retries; returns the final requests.Response (any status)."""
+        policy = retry if retry is not None else self.retry
+        url, query = api_target(self.base_url, path, params, self.path_param)
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.request(method, url, params=query, json=json, data=data, files=files,
+                                            headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if not policy.can_retry(method, attempt):
+                    raise
+                time.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            if not policy.can_retry(method, attempt, resp.status_code):
+                return resp
+            body = None if stream else decode_body(resp.content, resp.json)
+            wait = policy.delay(attempt, retry_after_seconds(resp.headers, body))
+            if wait is None:
+                return resp
+            resp.close()
+            time.sleep(wait)
+            attempt += 1
+
+    def request(self, method, path, **kwargs):
+        """send() + JSON decode; raises CRMAPIError for 4xx/5xx."""
+        resp = self.send(method, path, **kwargs)
+        body = decode_body(resp.content, resp.json)
+        if resp.status_code >= 400:
+            raise CRMAPIError(resp.status_code, body, method, path)
+        return body
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    # Pagination ------------------------------------------------------------
+
+    def paginate(self, path, key, page_size=100, **filters):
+        """Lazily yield items from an offset-paginated list endpoint."""
+        page = Page(key, page_size, filters)
+        while not page.done:
+            yield from page.advance(self.get(path, params=page.params()))
+
+    def iter_contacts(self, page_size=100, **filters):
+        """Contacts matching list filters (type, status, source, tag, q, ...), one page at a time."""
+        return self.paginate("/contacts", "contacts", page_size, **filters)
+
+    def iter_deals(self, page_size=100):
+        return self.paginate("/deals", "deals", page_size)
+
+    # Export ----------------------------------------------------------------
+
+    def iter_export(self, chunk_size=65536, **filters):
+        """Stream GET /contacts/export as raw CSV byte chunks."""
+        resp = self.send("GET", "/contacts/export", params={"format": "csv", **filters}, stream=True)
+        try:
+            if resp.status_code >= 400:
+                raise CRMAPIError(resp.status_code, decode_body(resp.content, resp.json), "GET", "/contacts/export")
+            yield from resp.iter_content(chunk_size=chunk_size)
+        finally:
+            resp.close()
+
+    def download_export(self, dest, chunk_size=65536, **filters):
+        """Write the CSV export to a path or binary file object; returns bytes written."""
+        written = 0
+        fh = open(dest, "wb") if isinstance(dest, (str, bytes)) or hasattr(dest, "__fspath__") else dest
+        try:
+            for chunk in self.iter_export(chunk_size, **filters):
+                fh.write(chunk)
+                written += len(chunk)
+        finally:
+            if fh is not dest:
+                fh.close()
+        return written
+
+    # Bulk ------------------------------------------------------------------
+
+    def batch(self, operations, atomic=False):
+        """POST /batch in chunks of 50; returns every operation's result, in order.
+
+        atomic applies per chunk: a failure rolls back only its own chunk.
+        """
+        results = []
+        for chunk in batch_chunks(list(operations)):
+            results.extend(batch_results(self.post("/batch", json={"operations": chunk, "atomic": atomic})))
+        return results
+
+    def create_contacts(self, rows, atomic=False):
+        """Create many contacts; returns the new ids (failed rows are skipped)."""
+        return created_ids(self.batch(create_operations("contacts", rows), atomic))
+
+    def update_contacts(self, updates, atomic=False):
+        """updates: {contact_id: {field: value}}; returns per-operation results."""
+        return self.batch(update_operations("contacts", updates), atomic)
+
+    def delete_contacts(self, ids, atomic=False):
+        return self.batch(delete_operations("contacts", ids), atomic)
+
@@ -0,0 +1,12 @@
+<?php
+/**
+ * Live test server prepend (php -d auto_prepend_file=...): point the app at
+ * the per-worker database copy named by CRM_DB_PATH. config.php only defines
+ * DB_PATH when it is not already defined.
+ */
+
+$crmLiveDbPath = getenv('CRM_DB_PATH');
+if ($crmLiveDbPath !== false && $crmLiveDbPath !== '' && !defined('DB_PATH')) {
+    define('DB_PATH', $crmLiveDbPath);
+}
+unset($crmLiveDbPath);
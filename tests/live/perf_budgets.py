@@ -0,0 +1,162 @@
+"""
+Front-end performance budgets for the live Playwright suites.
+Sanctum CRM - Navigation/Resource Timing, LCP, transfer sizes and DOM size per page
+
+Budgets live in perf_budgets.json: one entry per page with its path and the
+maximum allowed value per metric. "_defaults" applies to every page unless the
+page overrides a metric; "asset:<file>" limits the transfer size of one file
+(e.g. crm.css, crm-api.js); skin_css_bytes covers whichever skin is active.
+"""
+
+import json
+import os
+import sqlite3
+from urllib.parse import urlparse
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_budgets.json")
+
+# Buffered LCP entries are delivered asynchronously, so give the observer a tick
+_COLLECT_JS = """
+() => new Promise(resolve => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const result = {
+        ttfb_ms: nav ? nav.responseStart : null,
+        dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+        load_ms: nav ? nav.loadEventEnd : null,
+        document_bytes: nav ? nav.transferSize : null,
+        dom_nodes: document.getElementsByTagName('*').length,
+        lcp_ms: null,
+        resources: performance.getEntriesByType('resource').map(r => ({
+            name: r.name, initiator: r.initiatorType, duration: r.duration
+        }))
+    };
+    try {
+        new PerformanceObserver(list => {
+            for (const entry of list.getEntries()) {
+                result.lcp_ms = Math.max(result.lcp_ms || 0, entry.renderTime || entry.loadTime || entry.startTime);
+            }
+        }).observe({type: 'largest-contentful-paint', buffered: true});
+    } catch (e) {
+        // Browser without LCP support (Firefox/WebKit): leave null
+    }
+    setTimeout(() => resolve(result), 50);
+})
+"""
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    defaults = data.get("_defaults", {})
+    pages = {}
+    for name, spec in data.items():
+        if name.startswith("_"):
+            continue
+        pages[name] = {"path": spec["path"], "budgets": {**defaults, **spec.get("budgets", {})}}
+    return pages
+
+
+def measure(page, url, server_url):
+    """Load url in a fresh page and return its metrics.
+
+    Byte counts come from Playwright's request sizes (they include
+    cross-origin CDN responses, where Resource Timing reports 0 without
+    Timing-Allow-Origin); timings come from the browser's own entries.
+    """
+    requests = []
+    page.on("requestfinished", requests.append)
+    page.goto(url, wait_until="load")
+    page.wait_for_function(
+        "() => { const n = performance.getEntriesByType('navigation')[0]; return n && n.loadEventEnd > 0; }"
+    )
+    metrics = page.evaluate(_COLLECT_JS)
+    page.remove_listener("requestfinished", requests.append)
+
+    origin = urlparse(server_url).netloc
+    totals = {
+        "transfer_bytes": 0, "first_party_bytes": 0, "third_party_bytes": 0,
+        "css_bytes": 0, "skin_css_bytes": 0, "js_bytes": 0,
+    }
+    assets = {}
+    for req in requests:
+        try:
+            sizes = req.sizes()
+        except Exception:
+            continue
+        size = sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        totals["transfer_bytes"] += size
+        parsed = urlparse(req.url)
+        totals["first_party_bytes" if parsed.netloc == origin else "third_party_bytes"] += size
+        if req.resource_type == "stylesheet":
+            totals["css_bytes"] += size
+            if "/assets/css/skins/" in parsed.path:
+                totals["skin_css_bytes"] += size
+        elif req.resource_type == "script":
+            totals["js_bytes"] += size
+        if parsed.netloc == origin and req.resource_type in ("stylesheet", "script"):
+            assets[os.path.basename(parsed.path)] = size
+
+    metrics.update(totals)
+    metrics["requests"] = len(requests)
+    metrics["assets"] = assets
+    metrics["slowest_resources"] = sorted(metrics.pop("resources"), key=lambda r: -r["duration"])[:5]
+    return metrics
+
+
+def check(metrics, budgets):
+    """Return [(metric, budget, actual)] for every metric over its budget.
+
+    Metrics the browser could not measure (None, e.g. LCP outside Chromium)
+    are skipped rather than failed.
+    """
+    over = []
+    for key, limit in sorted(budgets.items()):
+        if key.startswith("asset:"):
+            actual = metrics.get("assets", {}).get(key[len("asset:"):])
+        else:
+            actual = metrics.get(key)
+        if actual is None:
+            continue
+        if actual > limit:
+            over.append((key, limit, actual))
+    return over
+
+
+def format_diff(page_name, over):
+    lines = [f"{page_name}: {len(over)} metric(s) over budget"]
+    lines.append(f"  {'metric':<26} {'budget':>12} {'actual':>12} {'over':>8}")
+    for key, limit, actual in over:
+        pct = (actual - limit) * 100.0 / limit if limit else float("inf")
+        lines.append(f"  {key:<26} {limit:>12,.0f} {actual:>12,.0f} {pct:>+7.1f}%")
+    return "\n".join(lines)
+
+
+def seed_large_dataset(db_path, contacts=5000, deals_every=5):
+    """Bulk-insert synthetic contacts/deals so list pages render realistic volumes."""
+    conn = sqlite3.connect(db_path)
+    try:
+        sources = ["LinkedIn", "Website", "Event", "Referral", None]
+        types = ["lead", "customer"]
+        # The contact_status values the app offers (public/pages/contacts.php status filter)
+        statuses = ["new", "qualified", "active", "inactive"]
+        rows = (
+            (
+                f"Perf{i}", f"Seed{i % 997}", f"perf.seed.{i}@example.com", f"Company {i % 211}",
+                types[i % 2], statuses[i % 4], sources[i % 5],
+            )
+            for i in range(contacts)
+        )
+        with conn:
+            conn.executemany(
+                "INSERT INTO contacts (first_name, last_name, email, company, contact_type, contact_status, source,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))",
+                rows,
+            )
+            conn.execute(
+                "INSERT INTO deals (title, contact_id, amount, stage, created_at, updated_at)"
+                " SELECT 'Perf deal ' || id, id, (id % 50) * 1000, 'prospecting', datetime('now'), datetime('now')"
+                " FROM contacts WHERE email LIKE 'perf.seed.%' AND id % ? = 0",
+                (deals_every,),
+            )
+    finally:
+        conn.close()
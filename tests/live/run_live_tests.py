@@ -9,19 +9,52 @@ import sys
 import os
 import argparse
 
-def run_tests(test_type="all", verbose=False, headless=True):
+def run_tests(test_type="all", verbose=False, headless=True, workers=0,
+              fresh_login=False, timing_baseline=None, perf_budgets=None,
+              duration=3600, interval=30, allow_growth=None, check_sessions=False, mix=None,
+              port=None):
     """
     Run live tests with specified configuration
 
     Args:
-        test_type: "all", "browser", "api", or "workflows"
+        test_type: "all", "browser", "api", "workflows", "perf" or "soak"
         verbose: Enable verbose output
         headless: Run browsers in headless mode
+        workers: Shard across this many pytest-xdist workers (0 = in-process)
+        fresh_login: Log in through the form for every test (timing baseline)
+        timing_baseline: Earlier timing_report.json to compare setup cost against
+        perf_budgets: Alternative per-page budget file for the perf suite
+        duration: Soak length in seconds
+        interval: Seconds between soak samples
+        allow_growth: Soak metrics whose growth is expected (not a failure)
+        check_sessions: Fail the soak on session file growth too
+        mix: Soak workload step weights, e.g. "read=60,write=20,import=0"
+        port: Soak server port (default: soak.DEFAULT_PORT)
     """
 
     # Change to live tests directory
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+    # Soak runs a timed workload rather than a pytest selection
+    if test_type == "soak":
+        from soak import DEFAULT_PORT, _parse_mix, run_soak
+
+        concurrency = workers if workers and workers > 0 else 4
+        print(f"Running soak: {duration:.0f}s, sampling every {interval:.0f}s, {concurrency} client(s)")
+        try:
+            return run_soak(
+                duration=duration,
+                interval=interval,
+                concurrency=concurrency,
+                allow_growth=allow_growth or [],
+                check_sessions=check_sessions,
+                mix=_parse_mix(mix) if mix else None,
+                port=port or DEFAULT_PORT,
+            )
+        except Exception as e:
+            print(f"Error running soak: {e}")
+            return False
+
     # Set environment variables for headless mode
     env = os.environ.copy()
     if headless:
@@ -33,6 +66,16 @@ def run_tests(test_type="all", verbose=False, headless=True):
     if verbose:
         cmd.append('-v')
 
+    # Each worker runs its own PHP server and database copy (see conftest.py)
+    if workers and workers > 1:
+        cmd.extend(['-n', str(workers), '--dist', 'load'])
+    if fresh_login:
+        cmd.append('--fresh-login')
+    if timing_baseline:
+        cmd.extend(['--timing-baseline', timing_baseline])
+    if perf_budgets:
+        cmd.extend(['--perf-budgets', perf_budgets])
+
     # Add test files based on type
     if test_type == "browser":
         cmd.append('test_browser_ui.py')
@@ -40,6 +83,9 @@ def run_tests(test_type="all", verbose=False, headless=True):
         cmd.append('test_api_integration.py')
     elif test_type == "workflows":
         cmd.append('test_user_workflows.py')
+    elif test_type == "perf":
+        # Seeds its own large database; kept out of "all" so functional runs stay fast
+        cmd.append('test_performance_budgets.py')
     elif test_type == "all":
         cmd.extend(['test_browser_ui.py', 'test_user_workflows.py', 'test_api_integration.py'])
 
@@ -61,19 +107,49 @@ def run_tests(test_type="all", verbose=False, headless=True):
 
 def main():
     parser = argparse.ArgumentParser(description='Run live tests for Sanctum CRM')
-    parser.add_argument('--type', choices=['all', 'browser', 'api', 'workflows'],
+    parser.add_argument('--type', choices=['all', 'browser', 'api', 'workflows', 'perf', 'soak'],
                        default='all', help='Type of tests to run')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose output')
     parser.add_argument('--headed', action='store_true',
                        help='Run browsers in headed mode (visible)')
+    parser.add_argument('--workers', '-n', type=int, default=0,
+                       help='Shard tests across N worker processes, each with its own server and database')
+    parser.add_argument('--fresh-login', action='store_true',
+                       help='Log in through login.php for every test (reproduces the old setup cost)')
+    parser.add_argument('--timing-baseline',
+                       help='Compare per-test setup time against an earlier timing_report.json')
+    parser.add_argument('--perf-budgets',
+                       help='Per-page budget file for --type perf (default: perf_budgets.json)')
+    parser.add_argument('--duration', type=float, default=3600,
+                       help='Soak length in seconds for --type soak (default 3600)')
+    parser.add_argument('--interval', type=float, default=30,
+                       help='Seconds between soak samples (default 30)')
+    parser.add_argument('--allow-growth', default='',
+                       help='Comma-separated soak metrics expected to grow, e.g. rows.api_requests')
+    parser.add_argument('--check-sessions', action='store_true',
+                       help='Soak: fail on session file growth too')
+    parser.add_argument('--mix',
+                       help='Soak workload step weights, e.g. read=60,write=20,import=0')
+    parser.add_argument('--port', type=int,
+                       help='Port for the soak server')
 
     args = parser.parse_args()
 
     success = run_tests(
         test_type=args.type,
         verbose=args.verbose,
-        headless=not args.headed
+        headless=not args.headed,
+        workers=args.workers,
+        fresh_login=args.fresh_login,
+        timing_baseline=args.timing_baseline,
+        perf_budgets=args.perf_budgets,
+        duration=args.duration,
+        interval=args.interval,
+        allow_growth=[m.strip() for m in args.allow_growth.split(',') if m.strip()],
+        check_sessions=args.check_sessions,
+        mix=args.mix,
+        port=args.port
     )
 
     if success:
@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+"""
+Soak Test Runner
+Best Jobs in TA - Long-running mixed workload with resource-drift tracking
+
+Drives read / write / import / merge / enrichment traffic against a private
+PHP server and database copy for --duration seconds. Every --interval seconds
+it samples latency percentiles, DB and WAL file size, tracked table row counts,
+webhook queue depth, session file count and PHP server RSS, then drains the
+webhook queue the way cron would. The time series goes to soak_report.json and
+any metric that keeps growing across the run is flagged.
+
+The workload is steady-state by design: contacts, deals and imports it creates
+are deleted again once a pool fills up, so after warm-up nothing should grow.
+API calls go through crm_client without cookies, like typical integrations.
+
+The one exception is the session file count: every cookie-less request
+starts a new PHP session, and those files only go once session GC expires
+them (24 minutes by default), so the count climbs on a healthy server. It
+is still sampled and reported but does not fail the run unless
+--check-sessions is given. Reusing one cookie jar instead would put the
+whole workload into a single session and trip the per-session API rate
+limit (API_RATE_LIMIT requests/hour).
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from crm_client import CRMClient, RetryPolicy
+
+LIVE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(LIVE_DIR))
+DB_OVERRIDE_PREPEND = os.path.join(LIVE_DIR, "db_override.php")
+TEMPLATE_DB_PATH = os.environ.get("LIVE_TEMPLATE_DB", os.path.join(PROJECT_ROOT, "db", "crm.db"))
+SOAK_REPORT_PATH = os.path.join(LIVE_DIR, "soak_report.json")
+
+SERVER_HOST = "localhost"
+DEFAULT_PORT = int(os.environ.get("LIVE_SOAK_PORT", "8300"))
+
+# Sampled and reported, but growth is expected (see module docstring)
+INFORMATIONAL_METRICS = frozenset({"session_files"})
+
+# Row counts sampled every interval (missing tables are skipped)
+TRACKED_TABLES = [
+    "contacts",
+    "deals",
+    "webhook_delivery_queue",
+    "contact_data_runs",
+    "contact_data_facts",
+    "contact_data_payloads",
+    "contact_merge_candidates",
+    "import_jobs",
+    "import_rows",
+    "api_requests",
+]
+
+# Relative weight of each workload step
+DEFAULT_MIX = {"read": 50, "write": 25, "merge": 10, "enrich": 10, "import": 5}
+
+IMPORT_FIELD_MAPPING = {"first_name": "First", "last_name": "Last", "email": "Email", "company": "Company"}
+
+
+# --- Server ----------------------------------------------------------------
+
+class SoakServer:
+    """php -S on a private database copy and session directory."""
+
+    def __init__(self, workdir, port, workers):
+        self.port = port
+        self.url = f"http://{SERVER_HOST}:{port}"
+        self.db_path = os.path.join(workdir, "crm.db")
+        self.session_dir = os.path.join(workdir, "sessions")
+        self.workers = workers
+        self.process = None
+
+    def prepare(self):
+        if not os.path.exists(TEMPLATE_DB_PATH):
+            raise RuntimeError(f"Template database not found: {TEMPLATE_DB_PATH}")
+        os.makedirs(self.session_dir, exist_ok=True)
+        src = sqlite3.connect(TEMPLATE_DB_PATH)
+        dst = sqlite3.connect(self.db_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+
+    def php_env(self):
+        env = os.environ.copy()
+        env["CRM_DB_PATH"] = self.db_path
+        return env
+
+    def start(self):
+        env = self.php_env()
+        # Built-in server forks this many request workers (PHP >= 7.4)
+        env["PHP_CLI_SERVER_WORKERS"] = str(max(1, self.workers))
+        self.process = subprocess.Popen(
+            [
+                "php",
+                "-d", f"auto_prepend_file={DB_OVERRIDE_PREPEND}",
+                "-d", f"session.save_path={self.session_dir}",
+                "-S", f"{SERVER_HOST}:{self.port}",
+                "-t", os.path.join(PROJECT_ROOT, "public"),
+            ],
+            cwd=PROJECT_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"PHP server exited early (code {self.process.returncode})")
+            try:
+                requests.get(f"{self.url}/login.php", timeout=0.5)
+                return
+            except requests.RequestException:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"PHP server did not start on {self.url}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+    def api_key(self):
+        """Admin API key from the copy; one is generated if the seed has none."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT api_key FROM users WHERE username = 'admin' LIMIT 1").fetchone()
+            if row is None:
+                raise RuntimeError("Template database has no admin user")
+            if row[0]:
+                return row[0]
+            key = uuid.uuid4().hex
+            with conn:
+                conn.execute("UPDATE users SET api_key = ? WHERE username = 'admin'", (key,))
+            return key
+        finally:
+            conn.close()
+
+    def rss_bytes(self):
+        """Resident memory of the server and its forked workers (Linux /proc, else psutil).
+
+        None when the workers cannot be listed: the parent alone would under-report.
+        """
+        if not self.process:
+            return None
+        children = _child_pids(self.process.pid)
+        if children is None:
+            return _psutil_rss(self.process.pid)
+        total = 0
+        for pid in [self.process.pid] + children:
+            rss = _proc_rss(pid)
+            if rss is None:
+                return _psutil_rss(self.process.pid)
+            total += rss
+        return total
+
+    def drain_webhook_queue(self):
+        subprocess.run(
+            ["php", os.path.join(PROJECT_ROOT, "tools", "process_webhook_queue.php"), "--limit=500"],
+            cwd=PROJECT_ROOT,
+            env=self.php_env(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=120,
+        )
+
+
+def _child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as fh:
+            return [int(p) for p in fh.read().split()]
+    except OSError:
+        return None
+
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _psutil_rss(pid):
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        proc = psutil.Process(pid)
+        return proc.memory_info().rss + sum(c.memory_info().rss for c in proc.children(recursive=True))
+    except psutil.Error:
+        return None
+
+
+class _WebhookSink(BaseHTTPRequestHandler):
+    """Accepts every delivery so the queue can drain."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+# --- Workload --------------------------------------------------------------
+
+class LatencyRecorder:
+    """Thread-safe (label, seconds, ok) buffer, swapped out on every sample."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window = []
+        self.totals = {}
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self._window.append((label, seconds, ok))
+            entry = self.totals.setdefault(label, {"count": 0, "errors": 0})
+            entry["count"] += 1
+            if not ok:
+                entry["errors"] += 1
+
+    def drain(self):
+        with self._lock:
+            window, self._window = self._window, []
+        return window
+
+
+class Workload:
+    """Mixed API traffic against one server; safe to run from several threads."""
+
+    def __init__(self, base_url, api_key, recorder, mix=None, pool_size=200, import_rows=25, seed=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.recorder = recorder
+        self.mix = mix or DEFAULT_MIX
+        self.pool_size = pool_size
+        self.import_rows = import_rows
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._contacts = []  # ids created by the workload, oldest first
+        self._deals = {}  # contact id -> [deal ids]
+        self._local = threading.local()
+
+    # HTTP -------------------------------------------------------------------
+
+    def _client(self):
+        # One keep-alive connection per thread; no retries so latency is per attempt
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = CRMClient(self.base_url, self.api_key, timeout=60.0, retry=RetryPolicy.none(), pool_size=1,
+                               path_param=True)
+            self._local.client = client
+        return client
+
+    def call(self, label, method, path, params=None, json_body=None, files=None):
+        start = time.perf_counter()
+        ok = False
+        body = None
+        try:
+            resp = self._client().send(method, path, params=params, json=json_body, files=files)
+            ok = resp.status_code < 400
+            if resp.content:
+                try:
+                    body = resp.json()
+                except ValueError:
+                    body = None
+        except requests.RequestException:
+            pass
+        self.recorder.record(label, time.perf_counter() - start, ok)
+        return ok, body
+
+    # Pool -------------------------------------------------------------------
+
+    def _remember(self, contact_id):
+        with self._lock:
+            self._contacts.append(contact_id)
+            if len(self._contacts) <= self.pool_size:
+                return None
+            return self._contacts.pop(0)
+
+    def _pick(self):
+        with self._lock:
+            return self.rng.choice(self._contacts) if self._contacts else None
+
+    def _new_contact(self, label="POST /contacts", **fields):
+        tag = uuid.uuid4().hex[:12]
+        body = {
+            "first_name": "Soak",
+            "last_name": tag,
+            "email": f"soak.{tag}@example.com",
+            "company": "Soak Test",
+            "source": "Soak",
+        }
+        body.update(fields)
+        ok, created = self.call(label, "POST", "/contacts", json_body=body)
+        return created.get("id") if ok and isinstance(created, dict) else None
+
+    def _retire(self, contact_id):
+        if contact_id is None:
+            return
+        with self._lock:
+            deals = self._deals.pop(contact_id, [])
+        for deal_id in deals:
+            self.call("DELETE /deals/{id}", "DELETE", f"/deals/{deal_id}")
+        self.call("DELETE /contacts/{id}", "DELETE", f"/contacts/{contact_id}")
+
+    # Steps ------------------------------------------------------------------
+
+    def step(self):
+        kinds = list(self.mix)
+        kind = self.rng.choices(kinds, weights=[self.mix[k] for k in kinds])[0]
+        getattr(self, f"step_{kind}")()
+
+    def step_read(self):
+        choice = self.rng.randrange(5)
+        if choice == 0:
+            self.call("GET /contacts", "GET", "/contacts", params={"limit": 50, "offset": self.rng.randrange(0, 500)})
+        elif choice == 1:
+            contact_id = self._pick()
+            if contact_id is None:
+                self.call("GET /contacts", "GET", "/contacts", params={"limit": 50})
+            else:
+                self.call("GET /contacts/{id}", "GET", f"/contacts/{contact_id}")
+        elif choice == 2:
+            self.call("GET /contacts?q", "GET", "/contacts", params={"q": "Soak", "limit": 50})
+        elif choice == 3:
+            self.call("GET /deals", "GET", "/deals")
+        else:
+            self.call("GET /merges/stats", "GET", "/merges/stats")
+
+    def step_write(self):
+        contact_id = self._pick()
+        choice = self.rng.randrange(3)
+        if choice == 0 or contact_id is None:
+            self._retire(self._remember_new(self._new_contact()))
+        elif choice == 1:
+            self.call("PUT /contacts/{id}", "PUT", f"/contacts/{contact_id}",
+                      json_body={"notes": f"soak update {time.time():.3f}", "contact_status": "contacted"})
+        else:
+            ok, deal = self.call("POST /deals", "POST", "/deals", json_body={
+                "title": "Soak deal", "contact_id": contact_id, "amount": self.rng.randrange(1, 100) * 100,
+            })
+            if ok and isinstance(deal, dict) and deal.get("id"):
+                with self._lock:
+                    if contact_id in self._contacts:
+                        self._deals.setdefault(contact_id, []).append(deal["id"])
+                        return
+                # Contact retired meanwhile; do not leave the deal behind
+                self.call("DELETE /deals/{id}", "DELETE", f"/deals/{deal['id']}")
+
+    def _remember_new(self, contact_id):
+        return self._remember(contact_id) if contact_id is not None else None
+
+    def step_merge(self):
+        tag = uuid.uuid4().hex[:12]
+        survivor = self._new_contact(last_name=f"Merge{tag}", company=f"Merge Co {tag}")
+        duplicate = self._new_contact(last_name=f"Merge{tag}", company=f"Merge Co {tag}",
+                                      email=f"soak.dup.{tag}@example.com")
+        if survivor is None or duplicate is None:
+            self._retire(survivor)
+            self._retire(duplicate)
+            return
+        ok, _ = self.call("POST /merges", "POST", "/merges", json_body={"survivor_id": survivor, "merge_ids": [duplicate]})
+        if not ok:
+            self._retire(duplicate)
+        self._retire(self._remember(survivor))
+
+    def step_enrich(self):
+        contact_id = self._pick()
+        if contact_id is None:
+            contact_id = self._new_contact()
+            self._retire(self._remember_new(contact_id))
+        if contact_id is not None:
+            self.call("POST /contacts/{id}/enrich", "POST", f"/contacts/{contact_id}/enrich", json_body={"strategy": "auto"})
+
+    def step_import(self):
+        source = f"Soak import {uuid.uuid4().hex[:12]}"
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(["First", "Last", "Email", "Company"])
+        for i in range(self.import_rows):
+            tag = uuid.uuid4().hex[:12]
+            writer.writerow(["Import", f"Row{i}", f"soak.import.{tag}@example.com", "Soak Import"])
+        ok, staged = self.call("POST /import", "POST", "/import",
+                               files={"csvFile": ("soak.csv", buf.getvalue().encode("utf-8"), "text/csv")})
+        if not ok or not isinstance(staged, dict) or not staged.get("import_id"):
+            return
+        import_id = staged["import_id"]
+        body = {"fieldMapping": IMPORT_FIELD_MAPPING, "source": source}
+        for _ in range(100):
+            ok, summary = self.call("POST /import/{id}/process", "POST", f"/import/{import_id}/process", json_body=body)
+            if not ok or not isinstance(summary, dict) or summary.get("status") == "completed":
+                break
+        self.call("DELETE /import/{id}", "DELETE", f"/import/{import_id}")
+
+        # Remove what the import created so contacts stay flat
+        ok, listing = self.call("GET /contacts?source", "GET", "/contacts", params={"source": source, "limit": 500})
+        ids = [c["id"] for c in (listing or {}).get("contacts", [])] if ok else []
+        if ids:
+            self.call("POST /batch", "POST", "/batch", json_body={
+                "operations": [{"method": "DELETE", "path": f"/contacts/{cid}"} for cid in ids[:50]],
+            })
+
+
+def run_workload(workload, stop_event):
+    while not stop_event.is_set():
+        try:
+            workload.step()
+        except Exception as exc:  # keep the soak going; the error shows up in the report
+            workload.recorder.record(f"error {type(exc).__name__}", 0.0, False)
+
+
+# --- Sampling --------------------------------------------------------------
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarise_latency(window):
+    by_label = {}
+    for label, seconds, ok in window:
+        by_label.setdefault(label, []).append((seconds, ok))
+    by_label["_all"] = [(s, ok) for _, s, ok in window]
+    out = {}
+    for label, entries in by_label.items():
+        values = sorted(s * 1000.0 for s, _ in entries)
+        out[label] = {
+            "count": len(entries),
+            "errors": sum(1 for _, ok in entries if not ok),
+            "p50_ms": _round(_percentile(values, 50)),
+            "p95_ms": _round(_percentile(values, 95)),
+            "p99_ms": _round(_percentile(values, 99)),
+        }
+    return out
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def sample_database(db_path):
+    sizes = {
+        "db_bytes": _file_size(db_path),
+        "wal_bytes": _file_size(db_path + "-wal"),
+    }
+    rows = {}
+    queue = {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5.0)
+    try:
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in TRACKED_TABLES:
+            if table in existing:
+                rows[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if "webhook_delivery_queue" in existing:
+            queue = dict(conn.execute("SELECT status, COUNT(*) FROM webhook_delivery_queue GROUP BY status").fetchall())
+    finally:
+        conn.close()
+    return sizes, rows, queue
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def take_sample(server, recorder, started):
+    sizes, rows, queue = sample_database(server.db_path)
+    try:
+        session_files = len(os.listdir(server.session_dir))
+    except OSError:
+        session_files = None
+    return {
+        "t_s": round(time.monotonic() - started, 1),
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **sizes,
+        "rows": rows,
+        "queue": queue,
+        "queue_depth": sum(queue.get(s, 0) for s in ("pending", "processing")),
+        "session_files": session_files,
+        "php_rss_bytes": server.rss_bytes(),
+        "latency": summarise_latency(recorder.drain()),
+    }
+
+
+# --- Drift detection -------------------------------------------------------
+
+def series(samples):
+    """Flatten samples into metric name -> list of values (None where unmeasured)."""
+    names = ["db_bytes", "wal_bytes", "queue_depth", "session_files", "php_rss_bytes"]
+    out = {name: [s.get(name) for s in samples] for name in names}
+    for table in sorted({t for s in samples for t in s["rows"]}):
+        out[f"rows.{table}"] = [s["rows"].get(table) for s in samples]
+    out["latency.p95_ms"] = [s["latency"].get("_all", {}).get("p95_ms") for s in samples]
+    return out
+
+
+def detect_growth(values, warmup=1, min_samples=4, tolerance=0.9, min_relative=0.05):
+    """Return a finding dict when values rise (almost) monotonically, else None.
+
+    The first `warmup` samples are ignored (server start-up, pool filling).
+    Growth is flagged when at least `tolerance` of the steps are non-decreasing
+    and the series rose by at least `min_relative` of its starting value.
+    """
+    points = [v for v in values[warmup:] if v is not None]
+    if len(points) < min_samples:
+        return None
+    steps = [b - a for a, b in zip(points, points[1:])]
+    non_decreasing = sum(1 for d in steps if d >= 0) / len(steps)
+    first, last = points[0], points[-1]
+    rise = last - first
+    if rise <= 0 or non_decreasing < tolerance:
+        return None
+    relative = rise / abs(first) if first else float("inf")
+    if relative < min_relative:
+        return None
+    return {
+        "first": first,
+        "last": last,
+        "change_pct": None if first == 0 else round(relative * 100.0, 1),
+        "non_decreasing_pct": round(non_decreasing * 100.0, 1),
+        "per_sample": round(rise / (len(points) - 1), 3),
+    }
+
+
+def find_drift(samples, allow=(), **kwargs):
+    findings = {}
+    for name, values in series(samples).items():
+        finding = detect_growth(values, **kwargs)
+        if finding is not None:
+            finding["allowed"] = name in allow
+            findings[name] = finding
+    return findings
+
+
+# --- Runner ----------------------------------------------------------------
+
+def _parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for part in text.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in DEFAULT_MIX:
+                raise argparse.ArgumentTypeError(f"unknown workload step '{name}'")
+            mix[name] = int(weight)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+def run_soak(duration, interval=30.0, concurrency=4, port=DEFAULT_PORT, mix=None, pool_size=200,
+             import_rows=25, drain_queue=True, webhook=True, allow_growth=(), report_path=SOAK_REPORT_PATH,
+             seed=None, check_sessions=False):
+    """Run the soak and write the report; returns True when no unexpected drift was found."""
+    with tempfile.TemporaryDirectory(prefix="crm_soak_") as workdir:
+        server = SoakServer(workdir, port, concurrency)
+        server.prepare()
+        server.start()
+        sink = None
+        stop = threading.Event()
+        threads = []
+        samples = []
+        recorder = LatencyRecorder()
+        try:
+            workload = Workload(server.url, server.api_key(), recorder, mix, pool_size, import_rows, seed)
+            if webhook:
+                sink = ThreadingHTTPServer(("127.0.0.1", 0), _WebhookSink)
+                threading.Thread(target=sink.serve_forever, daemon=True).start()
+                workload.call("POST /webhooks", "POST", "/webhooks", json_body={
+                    "url": f"http://127.0.0.1:{sink.server_address[1]}/hook",
+                    "events": ["contact.created", "contact.updated", "contact.deleted", "contact.merged",
+                               "deal.created", "deal.updated", "deal.deleted"],
+                })
+
+            started = time.monotonic()
+            samples.append(take_sample(server, recorder, started))
+            for i in range(max(1, concurrency)):
+                thread = threading.Thread(target=run_workload, args=(workload, stop), name=f"soak-{i}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+            while time.monotonic() - started < duration:
+                time.sleep(min(interval, max(0.0, duration - (time.monotonic() - started))))
+                samples.append(take_sample(server, recorder, started))
+                _print_sample(samples[-1])
+                if drain_queue:
+                    server.drain_webhook_queue()
+        except KeyboardInterrupt:
+            print("\nSoak interrupted; reporting samples so far")
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=30)
+            if sink is not None:
+                sink.shutdown()
+            server.stop()
+
+    allow = set(allow_growth) | (set() if check_sessions else set(INFORMATIONAL_METRICS))
+    findings = find_drift(samples, allow=allow)
+    notes = []
+    if any(s["php_rss_bytes"] is None for s in samples):
+        notes.append("rss unavailable: PHP worker processes could not be listed (/proc children or psutil)")
+    report = {
+        "config": {
+            "duration_s": duration, "interval_s": interval, "concurrency": concurrency, "mix": mix or DEFAULT_MIX,
+            "pool_size": pool_size, "import_rows": import_rows, "drain_queue": drain_queue, "webhook": webhook,
+            "allow_growth": list(allow_growth), "check_sessions": check_sessions,
+        },
+        "operations": recorder.totals,
+        "samples": samples,
+        "growth": findings,
+        "notes": notes,
+    }
+    with open(report_path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+
+    unexpected = {k: v for k, v in findings.items() if not v["allowed"]}
+    for note in notes:
+        print(note)
+    _print_findings(findings, report_path)
+    return not unexpected
+
+
+def _print_sample(sample):
+    lat = sample["latency"].get("_all", {})
+    rss = sample["php_rss_bytes"]
+    print(
+        f"[{sample['t_s']:>7.0f}s] ops={lat.get('count', 0):>5} err={lat.get('errors', 0):>3} "
+        f"p95={lat.get('p95_ms') or 0:>7.1f}ms db={sample['db_bytes'] / 1048576:>7.2f}MB "
+        f"wal={sample['wal_bytes'] / 1048576:>6.2f}MB queue={sample['queue_depth']:>4} "
+        f"sessions={sample['session_files']} rss={'unavailable' if rss is None else f'{rss / 1048576:.1f}MB'}"
+    )
+
+
+def _print_findings(findings, report_path):
+    if not findings:
+        print("No monotonic growth detected.")
+    else:
+        print(f"{'metric':<34} {'first':>14} {'last':>14} {'change':>9} {'rising':>8}")
+        for name in sorted(findings):
+            f = findings[name]
+            change = "new" if f["change_pct"] is None else f"{f['change_pct']:+.1f}%"
+            flag = " (allowed)" if f["allowed"] else ""
+            print(f"{name:<34} {f['first']:>14,.0f} {f['last']:>14,.0f} {change:>9} {f['non_decreasing_pct']:>7.0f}%{flag}")
+    print(f"report: {report_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test Sanctum CRM with a mixed workload")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds to run (default 3600)")
+    parser.add_argument("--interval", type=float, default=30, help="Seconds between samples (default 30)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Client threads and PHP server workers")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--mix", type=_parse_mix, default=None,
+                        help="Step weights, e.g. read=60,write=20,import=0 (defaults: %s)" %
+                             ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--pool-size", type=int, default=200, help="Workload contacts kept before old ones are deleted")
+    parser.add_argument("--import-rows", type=int, default=25, help="Rows per CSV import step")
+    parser.add_argument("--no-drain", action="store_true", help="Do not run process_webhook_queue.php between samples")
+    parser.add_argument("--no-webhook", action="store_true", help="Do not register a local webhook sink")
+    parser.add_argument("--allow-growth", default="",
+                        help="Comma-separated metrics whose growth is expected, e.g. rows.api_requests")
+    parser.add_argument("--check-sessions", action="store_true",
+                        help="Fail on session file growth too (expected with cookie-less clients)")
+    parser.add_argument("--report", default=SOAK_REPORT_PATH, help="Where to write the time-series report (JSON)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    ok = run_soak(
+        duration=args.duration,
+        interval=args.interval,
+        concurrency=args.concurrency,
+        port=args.port,
+        mix=args.mix,
+        pool_size=args.pool_size,
+        import_rows=args.import_rows,
+        drain_queue=not args.no_drain,
+        webhook=not args.no_webhook,
+        allow_growth=[m.strip() for m in args.allow_growth.split(",") if m.strip()],
+        report_path=args.report,
+        seed=args.seed,
+        check_sessions=args.check_sessions,
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
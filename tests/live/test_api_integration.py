@@ -3,105 +3,99 @@ API Integration Tests
 Best Jobs in TA - Live API endpoint testing with real server
 """
 
-import pytest
-import requests
-import json
 import time
-from typing import Dict, Any
+
+from crm_client import CRMClient, RetryPolicy
+
+from conftest import SERVER_URL
 
 
 class TestAPIIntegration:
-    """Test API endpoints with live server integration"""
+    """Test API endpoints with live server integration
 
-    BASE_URL = "http://localhost:8000"
-    API_KEY = None
+    `api_client` (conftest.py) is one pooled, keep-alive client per worker whose
+    key is resolved through a login; `anonymous_api_client` sends no key.
+    """
 
-    def setup_method(self):
-        """Get API key from database for authenticated tests"""
-        try:
-            # Query admin API key from production database
-            import sqlite3
-            db_path = "db/crm.db"
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT api_key FROM users WHERE username = 'admin' LIMIT 1")
-            result = cursor.fetchone()
-
-            if result:
-                self.API_KEY = result[0]
-
-            conn.close()
-        except Exception as e:
-            print(f"Warning: Could not get API key: {e}")
-            self.API_KEY = None
-
-    def get_headers(self) -> Dict[str, str]:
-        """Get headers for API requests"""
-        headers = {"Content-Type": "application/json"}
-        if self.API_KEY:
-            headers["Authorization"] = f"Bearer {self.API_KEY}"
-        return headers
-
-    def test_contacts_api_crud(self):
+    def test_contacts_api_crud(self, api_client: CRMClient):
         """Test complete contacts API CRUD operations"""
         # Test GET all contacts
-        response = requests.get(f"{self.BASE_URL}/api/v1/contacts", headers=self.get_headers())
-        assert response.status_code in [200, 401]  # 401 if no auth
-
-        if response.status_code == 200:
-            data = response.json()
-            assert "contacts" in data
-            assert isinstance(data["contacts"], list)
-
-        # Test POST new contact (if authenticated)
-        if self.API_KEY:
-            contact_data = {
-                "first_name": "Test",
-                "last_name": "User",
-                "email": f"test_{int(time.time())}@example.com",
-                "company": "Test Company"
-            }
-
-            response = requests.post(
-                f"{self.BASE_URL}/api/v1/contacts",
-                headers=self.get_headers(),
-                json=contact_data
-            )
-
-            if response.status_code == 201:
-                created_contact = response.json()
-                assert created_contact["first_name"] == "Test"
-                assert created_contact["email"] == contact_data["email"]
-
-                # Test GET specific contact
-                contact_id = created_contact["id"]
-                response = requests.get(
-                    f"{self.BASE_URL}/api/v1/contacts/{contact_id}",
-                    headers=self.get_headers()
-                )
-                assert response.status_code == 200
+        response = api_client.send("GET", "/contacts")
+        assert response.status_code == 200
 
-                # Test PUT update
-                update_data = {"company": "Updated Company"}
-                response = requests.put(
-                    f"{self.BASE_URL}/api/v1/contacts/{contact_id}",
-                    headers=self.get_headers(),
-                    json=update_data
-                )
-                assert response.status_code == 200
+        data = response.json()
+        assert "contacts" in data
+        assert isinstance(data["contacts"], list)
+
+        # Test POST new contact
+        contact_data = {
+            "first_name": "Test",
+            "last_name": "User",
+            "email": f"test_{int(time.time())}@example.com",
+            "company": "Test Company"
+        }
 
-                # Test DELETE
-                response = requests.delete(
-                    f"{self.BASE_URL}/api/v1/contacts/{contact_id}",
-                    headers=self.get_headers()
-                )
-                assert response.status_code in [204, 404]
+        response = api_client.send("POST", "/contacts", json=contact_data)
+
+        if response.status_code == 201:
+            created_contact = response.json()
+            assert created_contact["first_name"] == "Test"
+            assert created_contact["email"] == contact_data["email"]
+
+            # Test GET specific contact
+            contact_id = created_contact["id"]
+            response = api_client.send("GET", f"/contacts/{contact_id}")
+            assert response.status_code == 200
+
+            # Test PUT update
+            update_data = {"company": "Updated Company"}
+            response = api_client.send("PUT", f"/contacts/{contact_id}", json=update_data)
+            assert response.status_code == 200
+
+            # Test DELETE
+            response = api_client.send("DELETE", f"/contacts/{contact_id}")
+            assert response.status_code in [204, 404]
+
+    def test_contacts_pagination_and_bulk(self, api_client: CRMClient):
+        """Test lazy pagination over /contacts and the /batch bulk helpers"""
+        tag = f"pagination_{int(time.time() * 1000)}"
+        rows = [
+            {"first_name": "Page", "last_name": f"Row{i}", "email": f"{tag}_{i}@example.com", "source": tag}
+            for i in range(7)
+        ]
+        ids = api_client.create_contacts(rows)
+        assert len(ids) == 7
 
-    def test_enrichment_api_endpoints(self):
+        try:
+            # Page size 3 forces three requests; order and completeness must hold
+            listed = [c["id"] for c in api_client.iter_contacts(page_size=3, source=tag)]
+            assert sorted(listed) == sorted(ids)
+            assert len(set(listed)) == len(listed)
+
+            results = api_client.update_contacts({cid: {"company": "Bulk Updated"} for cid in ids})
+            assert all(r["status"] == 200 for r in results)
+        finally:
+            results = api_client.delete_contacts(ids)
+        assert all(r["status"] == 204 for r in results)
+        assert list(api_client.iter_contacts(source=tag)) == []
+
+    def test_deals_iteration(self, api_client: CRMClient):
+        """Test that deal iteration yields every deal the list endpoint returns"""
+        listed = api_client.get("/deals")
+        iterated = list(api_client.iter_deals(page_size=10))
+        assert [d["id"] for d in iterated] == [d["id"] for d in listed["deals"]]
+
+    def test_contacts_export_streaming(self, api_client: CRMClient, tmp_path):
+        """Test streaming download of contacts/export"""
+        dest = tmp_path / "contacts.csv"
+        written = api_client.download_export(str(dest), chunk_size=1024)
+        assert written == dest.stat().st_size
+        assert dest.read_bytes().startswith(b"ID,")
+
+    def test_enrichment_api_endpoints(self, api_client: CRMClient):
         """Test enrichment API endpoints"""
         # Test enrichment stats endpoint
-        response = requests.get(f"{self.BASE_URL}/api/v1/enrichment/stats", headers=self.get_headers())
+        response = api_client.send("GET", "/enrichment/stats")
         # Should return 200 even without API key (mock mode)
         assert response.status_code == 200
 
@@ -110,56 +104,42 @@ class TestAPIIntegration:
         for key in expected_keys:
             assert key in data
 
-        # Test individual enrichment (if authenticated)
-        if self.API_KEY:
-            # Get first contact for testing
-            contacts_response = requests.get(f"{self.BASE_URL}/api/v1/contacts", headers=self.get_headers())
-            if contacts_response.status_code == 200:
-                contacts = contacts_response.json().get("contacts", [])
-                if contacts:
-                    contact_id = contacts[0]["id"]
-
-                    # Test enrichment endpoint
-                    response = requests.post(
-                        f"{self.BASE_URL}/api/v1/contacts/{contact_id}/enrich",
-                        headers=self.get_headers(),
-                        json={"strategy": "auto"}
-                    )
-
-                    # Should handle gracefully (mock mode or real enrichment)
-                    assert response.status_code in [200, 500]  # 500 if no API key configured
-
-                    # Test enrichment status
-                    response = requests.get(
-                        f"{self.BASE_URL}/api/v1/contacts/{contact_id}/enrichment-status",
-                        headers=self.get_headers()
-                    )
-                    assert response.status_code == 200
-
-    def test_bulk_enrichment_api(self):
-        """Test bulk enrichment API"""
-        if not self.API_KEY:
-            pytest.skip("API key required for bulk enrichment testing")
+        # Get first contact for testing
+        contacts_response = api_client.send("GET", "/contacts")
+        if contacts_response.status_code == 200:
+            contacts = contacts_response.json().get("contacts", [])
+            if contacts:
+                contact_id = contacts[0]["id"]
+
+                # Test enrichment endpoint (no retry: a 500 here is an expected outcome)
+                response = api_client.send(
+                    "POST", f"/contacts/{contact_id}/enrich", json={"strategy": "auto"}, retry=RetryPolicy.none()
+                )
+
+                # Should handle gracefully (mock mode or real enrichment)
+                assert response.status_code in [200, 500]  # 500 if no API key configured
+
+                # Test enrichment status
+                response = api_client.send("GET", f"/contacts/{contact_id}/enrichment-status")
+                assert response.status_code == 200
 
+    def test_bulk_enrichment_api(self, api_client: CRMClient):
+        """Test bulk enrichment API"""
         # Test bulk enrichment endpoint
         bulk_data = {
             "contact_ids": [1, 2],  # Test with existing contact IDs
             "strategy": "auto"
         }
 
-        response = requests.post(
-            f"{self.BASE_URL}/api/v1/contacts/bulk-enrich",
-            headers=self.get_headers(),
-            json=bulk_data
-        )
+        response = api_client.send("POST", "/contacts/bulk-enrich", json=bulk_data, retry=RetryPolicy.none())
 
         # Should handle gracefully
         assert response.status_code in [200, 400, 404, 500]
 
-    def test_reports_api(self):
+    def test_reports_api(self, api_client: CRMClient):
         """Test reports API endpoints"""
         # Test analytics endpoint
-        response = requests.get(f"{self.BASE_URL}/api/v1/reports/analytics", headers=self.get_headers())
+        response = api_client.send("GET", "/reports/analytics")
         assert response.status_code == 200
 
         data = response.json()
@@ -167,63 +147,62 @@ class TestAPIIntegration:
         assert isinstance(data["analytics"], list)
 
         # Test export endpoint
-        response = requests.get(f"{self.BASE_URL}/api/v1/reports/export", headers=self.get_headers())
+        response = api_client.send("GET", "/reports/export")
         # Should return CSV or appropriate response
         assert response.status_code in [200, 404]  # 404 if no data to export
 
-    def test_authentication_api(self):
+    def test_authentication_api(self, api_client: CRMClient, anonymous_api_client: CRMClient):
         """Test API authentication"""
         # Test without authentication
-        response = requests.get(f"{self.BASE_URL}/api/v1/contacts")
+        response = anonymous_api_client.send("GET", "/contacts")
         assert response.status_code == 401
 
         # Test with invalid API key
-        headers = {"Authorization": "Bearer invalid_key", "Content-Type": "application/json"}
-        response = requests.get(f"{self.BASE_URL}/api/v1/contacts", headers=headers)
+        with CRMClient(SERVER_URL, "invalid_key", retry=RetryPolicy.none()) as invalid:
+            response = invalid.send("GET", "/contacts")
         assert response.status_code == 401
 
-        # Test with valid API key (if available)
-        if self.API_KEY:
-            response = requests.get(f"{self.BASE_URL}/api/v1/contacts", headers=self.get_headers())
-            assert response.status_code in [200, 404]  # 200 if contacts exist, 404 if none
+        # Test with valid API key
+        response = api_client.send("GET", "/contacts")
+        assert response.status_code in [200, 404]  # 200 if contacts exist, 404 if none
 
-    def test_error_handling_api(self):
+    def test_error_handling_api(self, api_client: CRMClient, anonymous_api_client: CRMClient):
         """Test API error handling"""
         # Test invalid endpoint
-        response = requests.get(f"{self.BASE_URL}/api/v1/nonexistent")
+        response = anonymous_api_client.send("GET", "/nonexistent")
         assert response.status_code == 404
 
         # Test malformed JSON
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(
-            f"{self.BASE_URL}/api/v1/contacts",
-            headers=headers,
+        response = anonymous_api_client.send(
+            "POST",
+            "/contacts",
+            headers={"Content-Type": "application/json"},
             data="invalid json"
         )
         assert response.status_code == 400
 
         # Test missing required fields
-        if self.API_KEY:
-            response = requests.post(
-                f"{self.BASE_URL}/api/v1/contacts",
-                headers=self.get_headers(),
-                json={"email": "test@example.com"}  # Missing required first_name, last_name
-            )
-            assert response.status_code == 400
-
-    def test_performance_api(self):
+        response = api_client.send(
+            "POST",
+            "/contacts",
+            json={"email": "test@example.com"}  # Missing required first_name, last_name
+        )
+        assert response.status_code == 400
+
+    def test_performance_api(self, api_client: CRMClient):
         """Test API performance"""
         # Test response times for various endpoints
         endpoints = [
-            "/api/v1/contacts",
-            "/api/v1/enrichment/stats",
-            "/api/v1/reports/analytics"
+            "/contacts",
+            "/enrichment/stats",
+            "/reports/analytics"
         ]
 
         for endpoint in endpoints:
             start_time = time.time()
 
-            response = requests.get(f"{self.BASE_URL}{endpoint}", headers=self.get_headers())
+            # Measure a single attempt, not retries
+            response = api_client.send("GET", endpoint, retry=RetryPolicy.none())
 
             end_time = time.time()
             response_time = (end_time - start_time) * 1000  # Convert to milliseconds
@@ -234,21 +213,21 @@ class TestAPIIntegration:
             # Should return valid response
             assert response.status_code in [200, 401, 404]
 
-    def test_concurrent_requests_api(self):
+    def test_concurrent_requests_api(self, api_client: CRMClient):
         """Test API under concurrent load"""
         import threading
         import queue
 
         def make_request(endpoint, results_queue):
-            """Make a single API request"""
+            """Make a single API request over the shared connection pool"""
             try:
-                response = requests.get(f"{self.BASE_URL}{endpoint}", headers=self.get_headers())
-                results_queue.put((endpoint, response.status_code, True))
+                response = api_client.send("GET", endpoint)
+                results_queue.put((endpoint, response.status_code, True, None))
             except Exception as e:
                 results_queue.put((endpoint, 0, False, str(e)))
 
         # Test concurrent requests
-        endpoints = ["/api/v1/contacts", "/api/v1/enrichment/stats"] * 5  # 10 total requests
+        endpoints = ["/contacts", "/enrichment/stats"] * 5  # 10 total requests
         results_queue = queue.Queue()
         threads = []
 
@@ -7,6 +7,8 @@ import pytest
 import os
 from playwright.sync_api import Page, expect
 
+from conftest import SERVER_URL
+
 
 class TestBrowserUI:
     """Test browser-based user interface functionality"""
@@ -91,19 +93,13 @@ class TestBrowserUI:
             # But the button should respond to clicks
             pass
 
-    def test_responsive_design(self, page: Page, server_process):
+    def test_responsive_design(self, authenticated_page: Page):
         """Test responsive design on mobile viewport"""
+        page = authenticated_page
         # Set mobile viewport
         page.set_viewport_size({"width": 375, "height": 667})
 
-        page.goto(f"{SERVER_URL}/")
-
-        # Login on mobile
-        page.fill("input[name='username']", "admin")
-        page.fill("input[name='password']", "admin123")
-        page.click("button[type='submit']")
-
-        page.wait_for_url("**/index.php?page=dashboard")
+        page.goto(f"{SERVER_URL}/index.php?page=dashboard")
 
         # Check that content is accessible on mobile
         expect(page.locator("h1")).to_be_visible()
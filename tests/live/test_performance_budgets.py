@@ -0,0 +1,50 @@
+"""
+Front-end Performance Budget Tests
+Best Jobs in TA - Page weight and timing against a seeded large dataset
+
+Each page in perf_budgets.json is loaded once in a fresh authenticated context
+on the perf server; the test fails with a budget/actual diff when any metric is
+over its limit. Measured metrics for every page land in perf_report.json.
+"""
+
+import pytest
+from playwright.sync_api import Browser
+
+from perf_budgets import BUDGETS_PATH, check, format_diff, load_budgets, measure
+
+
+def pytest_generate_tests(metafunc):
+    if "page_name" in metafunc.fixturenames:
+        path = metafunc.config.getoption("--perf-budgets") or BUDGETS_PATH
+        metafunc.parametrize("page_name", sorted(load_budgets(path)))
+
+
+class TestPerformanceBudgets:
+    """Navigation/Resource Timing, LCP, transfer sizes and DOM size per page"""
+
+    def test_page_within_budget(self, page_name, record_property, browser: Browser,
+                                perf_server, perf_storage_state, perf_budgets):
+        spec = perf_budgets[page_name]
+        context = browser.new_context(
+            viewport={'width': 1280, 'height': 720},
+            ignore_https_errors=True,
+            storage_state=perf_storage_state
+        )
+        try:
+            page = context.new_page()
+            metrics = measure(page, f"{perf_server}{spec['path']}", perf_server)
+            final_url = page.url
+        finally:
+            context.close()
+
+        assert "login.php" not in final_url, f"{page_name}: redirected to login"
+
+        over = check(metrics, spec["budgets"])
+        record_property("perf", {
+            "page": page_name,
+            "path": spec["path"],
+            "metrics": metrics,
+            "budgets": spec["budgets"],
+            "over": over,
+        })
+        assert not over, format_diff(page_name, over)
@@ -7,18 +7,16 @@ import pytest
 import time
 from playwright.sync_api import Page, expect
 
+from conftest import SERVER_URL
+
 
 class TestUserWorkflows:
     """Test complete user workflows from login to completion"""
 
-    def test_complete_contact_management_workflow(self, page: Page, server_process):
+    def test_complete_contact_management_workflow(self, authenticated_page: Page):
         """Test complete contact management workflow"""
-        # 1. Login
-        page.goto(f"{SERVER_URL}/")
-        page.fill("input[name='username']", "admin")
-        page.fill("input[name='password']", "admin123")
-        page.click("button[type='submit']")
-        page.wait_for_url("**/index.php?page=dashboard")
+        # 1. Start from the saved login session
+        page = authenticated_page
 
         # 2. Navigate to contacts
         page.goto(f"{SERVER_URL}/index.php?page=contacts")
@@ -138,18 +136,12 @@ class TestUserWorkflows:
         cancel_btn.click()
         expect(modal).not_to_be_visible()
 
-    def test_responsive_workflow_on_mobile(self, page: Page, server_process):
+    def test_responsive_workflow_on_mobile(self, authenticated_page: Page):
         """Test complete workflow on mobile device"""
+        page = authenticated_page
         # Set mobile viewport
         page.set_viewport_size({"width": 375, "height": 667})
 
-        # Complete login workflow on mobile
-        page.goto(f"{SERVER_URL}/")
-        page.fill("input[name='username']", "admin")
-        page.fill("input[name='password']", "admin123")
-        page.click("button[type='submit']")
-        page.wait_for_url("**/index.php?page=dashboard")
-
         # Navigate to contacts on mobile
         page.goto(f"{SERVER_URL}/index.php?page=contacts")
 
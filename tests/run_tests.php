@@ -55,9 +55,14 @@ class TestRunner {
             'EnrichmentTest.php' => 'EnrichmentTest',
             'EnrichmentCronTest.php' => 'EnrichmentCronTest',
             'ContactMergeServiceTest.php' => 'ContactMergeServiceTest',
+            'ContactDataStoreTest.php' => 'ContactDataStoreTest',
+            'ContactFacetServiceTest.php' => 'ContactFacetServiceTest',
+            'ApiBatchRunnerTest.php' => 'ApiBatchRunnerTest',
+            'CsvImportStagerTest.php' => 'CsvImportStagerTest',
             'WebhookDispatcherTest.php' => 'WebhookDispatcherTest',
             'WebhookQueueTest.php' => 'WebhookQueueTest',
             'MigrationRunnerTest.php' => 'MigrationRunnerTest',
+            'TableRebuilderTest.php' => 'TableRebuilderTest',
             'LayoutTest.php' => 'LayoutTest',
             'LeadEnrichmentOutcomeTest.php' => 'LeadEnrichmentOutcomeTest',
             'ConfigManagerTest.php' => 'ConfigManagerTest',
@@ -0,0 +1,211 @@
+<?php
+/**
+ * ApiBatchRunner unit tests — back-references, atomic rollback, dependency skips
+ */
+
+require_once __DIR__ . '/../bootstrap.php';
+require_once __DIR__ . '/../../public/includes/ApiBatchRunner.php';
+
+class ApiBatchRunnerTest
+{
+    private Database $db;
+    /** @var list<array{0:string,1:string,2:?string,3:?array,4:?string}> */
+    private array $calls = [];
+
+    public function __construct()
+    {
+        $this->db = TestUtils::getTestDatabase();
+    }
+
+    public function runAllTests(): void
+    {
+        echo "Running ApiBatchRunner Unit Tests...\n";
+        $this->testValidate();
+        $this->testParsePath();
+        $this->testBackReferences();
+        $this->testAtomicRollback();
+        $this->testFailedReferenceSkipsDependent();
+        echo "All ApiBatchRunner tests completed!\n";
+    }
+
+    /** Minimal stand-in for the contacts/deals handlers: same echo + status contract. */
+    private function runner(): ApiBatchRunner
+    {
+        $this->calls = [];
+        return new ApiBatchRunner(function ($method, $resource, $id, $input, $action) {
+            $this->calls[] = [$method, $resource, $id, $input, $action];
+            if ($method === 'POST' && $resource === 'contacts') {
+                if (empty($input['first_name'])) {
+                    http_response_code(400);
+                    echo json_encode(['error' => 'first_name required', 'code' => 400]);
+                    return;
+                }
+                $ts = getCurrentTimestamp();
+                $newId = $this->db->insert('contacts', [
+                    'first_name' => $input['first_name'],
+                    'last_name' => 'Batch',
+                    'email' => 'batch-' . uniqid() . '@example.com',
+                    'created_at' => $ts,
+                    'updated_at' => $ts,
+                ]);
+                http_response_code(201);
+                echo json_encode($this->db->fetchOne('SELECT * FROM contacts WHERE id = ?', [$newId]));
+                return;
+            }
+            if ($method === 'POST' && $resource === 'deals') {
+                $ts = getCurrentTimestamp();
+                $newId = $this->db->insert('deals', [
+                    'title' => $input['title'],
+                    'contact_id' => $input['contact_id'],
+                    'created_at' => $ts,
+                    'updated_at' => $ts,
+                ]);
+                http_response_code(201);
+                echo json_encode($this->db->fetchOne('SELECT * FROM deals WHERE id = ?', [$newId]));
+                return;
+            }
+            if ($method === 'DELETE') {
+                http_response_code(204);
+                return;
+            }
+            echo json_encode(['id' => $id, 'query' => $_GET]);
+        }, $this->db, 5);
+    }
+
+    public function testValidate(): void
+    {
+        echo "  Testing batch body validation... ";
+        $runner = $this->runner();
+        $bad = [
+            null,
+            ['operations' => []],
+            ['operations' => array_fill(0, 6, ['method' => 'GET', 'path' => '/contacts'])],
+            ['operations' => [['method' => 'TRACE', 'path' => '/contacts']]],
+            ['operations' => [['method' => 'GET']]],
+            ['operations' => [
+                ['method' => 'GET', 'path' => '/contacts', 'ref' => 'a'],
+                ['method' => 'GET', 'path' => '/contacts', 'ref' => 'a'],
+            ]],
+        ];
+        foreach ($bad as $i => $input) {
+            if ($runner->validate($input) === null) {
+                throw new Exception("invalid batch #{$i} accepted");
+            }
+        }
+        if ($runner->validate(['operations' => [['method' => 'get', 'path' => '/deals']]]) !== null) {
+            throw new Exception('valid batch rejected');
+        }
+        echo "PASS\n";
+    }
+
+    public function testParsePath(): void
+    {
+        echo "  Testing router-compatible path parsing... ";
+        $cases = [
+            '/contacts' => ['contacts', null, null],
+            '/api/v1/contacts/12/convert' => ['contacts', '12', 'convert'],
+            'deals/7' => ['deals', '7', null],
+            '/contacts/facets' => ['contacts', null, 'facets'],
+        ];
+        foreach ($cases as $path => $expected) {
+            $parsed = ApiBatchRunner::parsePath($path);
+            if ($parsed === null || array_slice($parsed, 0, 3) !== $expected) {
+                throw new Exception("parsePath({$path}) = " . json_encode($parsed));
+            }
+        }
+        $parsed = ApiBatchRunner::parsePath('/contacts?type=lead&limit=5');
+        if (($parsed[3]['type'] ?? null) !== 'lead') {
+            throw new Exception('query string not parsed');
+        }
+        if (ApiBatchRunner::parsePath('/contacts/../users') !== null || ApiBatchRunner::parsePath('/') !== null) {
+            throw new Exception('invalid path accepted');
+        }
+        echo "PASS\n";
+    }
+
+    public function testBackReferences(): void
+    {
+        echo "  Testing back-references into earlier responses... ";
+        $getBefore = $_GET;
+        $result = $this->runner()->run([
+            ['method' => 'POST', 'path' => '/contacts', 'body' => ['first_name' => 'Ref'], 'ref' => 'c1'],
+            ['method' => 'POST', 'path' => '/deals', 'body' => ['title' => 'Deal for $c1.first_name', 'contact_id' => '$c1.id'], 'ref' => 'd1'],
+            ['method' => 'GET', 'path' => '/contacts/$c1.id', 'query' => ['deal' => '$d1.id']],
+            ['method' => 'DELETE', 'path' => '/deals/$d1.id'],
+        ]);
+        if (!$result['success'] || count($result['results']) !== 4) {
+            throw new Exception('batch failed: ' . json_encode($result));
+        }
+        $contact = $result['results'][0]['body'];
+        $deal = $result['results'][1]['body'];
+        if ($this->calls[1][3]['contact_id'] !== $contact['id']) {
+            throw new Exception('whole-string reference did not keep the referenced value');
+        }
+        if ($deal['title'] !== 'Deal for Ref') {
+            throw new Exception('embedded reference not interpolated');
+        }
+        if ($this->calls[2][2] !== (string) $contact['id'] || $result['results'][2]['path'] !== '/contacts/' . $contact['id']) {
+            throw new Exception('path reference not resolved');
+        }
+        if (($result['results'][2]['body']['query']['deal'] ?? null) !== (string) $deal['id']) {
+            throw new Exception('query reference not resolved');
+        }
+        if ($result['results'][3]['status'] !== 204 || $result['results'][3]['body'] !== null) {
+            throw new Exception('204 result not captured');
+        }
+        if ($_GET !== $getBefore) {
+            throw new Exception('$_GET not restored after batch');
+        }
+        $this->db->delete('deals', 'id = ?', [$deal['id']]);
+        $this->db->delete('contacts', 'id = ?', [$contact['id']]);
+        echo "PASS\n";
+    }
+
+    public function testAtomicRollback(): void
+    {
+        echo "  Testing atomic batch rolls back every operation... ";
+        $marker = 'Atomic' . substr(uniqid(), -6);
+        $result = $this->runner()->run([
+            ['method' => 'POST', 'path' => '/contacts', 'body' => ['first_name' => $marker]],
+            ['method' => 'POST', 'path' => '/contacts', 'body' => []],
+            ['method' => 'POST', 'path' => '/contacts', 'body' => ['first_name' => $marker]],
+        ], true);
+        if ($result['success'] || $result['committed']) {
+            throw new Exception('failed atomic batch reported success');
+        }
+        if (empty($result['results'][0]['rolled_back']) || $result['results'][1]['status'] !== 400) {
+            throw new Exception('rollback not reported per operation');
+        }
+        if ($result['results'][2]['status'] !== ApiBatchRunner::STATUS_SKIPPED || count($this->calls) !== 2) {
+            throw new Exception('operations after the failure should be skipped');
+        }
+        $left = $this->db->fetchOne('SELECT COUNT(*) AS c FROM contacts WHERE first_name = ?', [$marker]);
+        if ((int) $left['c'] !== 0) {
+            throw new Exception('atomic batch left rows behind');
+        }
+        echo "PASS\n";
+    }
+
+    public function testFailedReferenceSkipsDependent(): void
+    {
+        echo "  Testing non-atomic batch skips dependents of a failed op... ";
+        $result = $this->runner()->run([
+            ['method' => 'POST', 'path' => '/contacts', 'body' => [], 'ref' => 'bad'],
+            ['method' => 'POST', 'path' => '/deals', 'body' => ['title' => 'x', 'contact_id' => '$bad.id']],
+            ['method' => 'GET', 'path' => '/contacts', 'body' => ['note' => 'costs $5.00']],
+            ['method' => 'GET', 'path' => '/users'],
+        ]);
+        $statuses = array_column($result['results'], 'status');
+        if ($statuses !== [400, ApiBatchRunner::STATUS_SKIPPED, 200, 404]) {
+            throw new Exception('unexpected statuses: ' . json_encode($statuses));
+        }
+        if (count($this->calls) !== 2) {
+            throw new Exception('dependent or disallowed operation reached a handler');
+        }
+        echo "PASS\n";
+    }
+}
+
+if (basename(__FILE__) === basename($_SERVER['SCRIPT_FILENAME'] ?? '')) {
+    (new ApiBatchRunnerTest())->runAllTests();
+}
@@ -0,0 +1,200 @@
+<?php
+/**
+ * ContactDataStore unit tests — payload dedup, fact dedup, retention
+ */
+
+require_once __DIR__ . '/../bootstrap.php';
+require_once __DIR__ . '/../../public/includes/ContactDataStore.php';
+
+class ContactDataStoreTest
+{
+    private Database $db;
+    private ContactDataStore $store;
+
+    public function __construct()
+    {
+        $this->db = TestUtils::getTestDatabase();
+        $this->store = new ContactDataStore($this->db);
+        $this->store->ensureSchema();
+    }
+
+    public function runAllTests(): void
+    {
+        echo "Running ContactDataStore Unit Tests...\n";
+        $this->testIdenticalPayloadStoredOnce();
+        $this->testRepeatedFactIsDeduplicated();
+        $this->testMiddleRunListsReseenFact();
+        $this->testRetentionPrunesOldPayloads();
+        $this->testRetentionWorksInBatches();
+        $this->testRunNestsInCallerTransaction();
+        echo "All ContactDataStore tests completed!\n";
+    }
+
+    private function createContact(): int
+    {
+        $ts = getCurrentTimestamp();
+        return (int) $this->db->insert('contacts', [
+            'first_name' => 'Sidecar',
+            'last_name' => 'Test',
+            'email' => 'sidecar-' . uniqid() . '@example.com',
+            'created_at' => $ts,
+            'updated_at' => $ts,
+        ]);
+    }
+
+    public function testIdenticalPayloadStoredOnce(): void
+    {
+        echo "  Testing identical raw payloads share one compressed row... ";
+        $id = $this->createContact();
+        $raw = ['person' => ['name' => 'Sidecar Test', 'bio' => str_repeat('lorem ipsum ', 200)]];
+        $first = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => $raw]);
+        $second = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => $raw]);
+        if ($first['payload_id'] !== $second['payload_id']) {
+            throw new Exception('identical payloads were stored twice');
+        }
+        $payload = $this->db->fetchOne(
+            'SELECT raw_bytes, stored_bytes FROM contact_data_payloads WHERE id = ?',
+            [$first['payload_id']]
+        );
+        if (function_exists('gzdeflate') && (int) $payload['stored_bytes'] >= (int) $payload['raw_bytes']) {
+            throw new Exception('payload was not compressed');
+        }
+        $run = $this->store->getRun($id, $second['run_id']);
+        if (($run['raw']['person']['name'] ?? null) !== 'Sidecar Test') {
+            throw new Exception('getRun did not decode the stored payload');
+        }
+        $listed = $this->store->listRuns($id);
+        if ((int) $listed[0]['raw_bytes'] !== (int) $payload['raw_bytes']) {
+            throw new Exception('listRuns raw_bytes does not reflect the uncompressed size');
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+
+    public function testRepeatedFactIsDeduplicated(): void
+    {
+        echo "  Testing re-seen facts bump last_seen instead of inserting... ";
+        $id = $this->createContact();
+        $fact = ['fact_type' => 'email', 'value' => 'repeat@example.com', 'label' => 'recommended'];
+        $first = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => ['n' => 1], 'facts' => [$fact]]);
+        $second = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => ['n' => 2], 'facts' => [$fact]]);
+        if ($first['new_fact_count'] !== 1 || $second['new_fact_count'] !== 0 || $second['fact_count'] !== 1) {
+            throw new Exception('unexpected fact counts: ' . json_encode([$first, $second]));
+        }
+        $facts = $this->store->listFacts($id, 'email');
+        if (count($facts) !== 1 || (int) $facts[0]['seen_count'] !== 2) {
+            throw new Exception('expected one fact row seen twice');
+        }
+        if ((int) $facts[0]['last_run_id'] !== $second['run_id']) {
+            throw new Exception('last_run_id not updated');
+        }
+        if (count($this->store->listFactsForRun($id, $second['run_id'])) !== 1) {
+            throw new Exception('re-seen fact missing from second run');
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+
+    public function testMiddleRunListsReseenFact(): void
+    {
+        echo "  Testing a run between first and last sighting still lists the fact... ";
+        $id = $this->createContact();
+        $fact = ['fact_type' => 'phone', 'value' => '+15550100', 'label' => 'mobile'];
+        $runs = [];
+        for ($i = 1; $i <= 3; $i++) {
+            $runs[] = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => ['n' => $i], 'facts' => [$fact]]);
+        }
+        foreach ($runs as $i => $run) {
+            $facts = $this->store->getRun($id, $run['run_id'])['facts'] ?? [];
+            if (count($facts) !== 1 || $facts[0]['value'] !== '+15550100') {
+                throw new Exception('run ' . ($i + 1) . ' lost its re-seen fact');
+            }
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+
+    public function testRetentionPrunesOldPayloads(): void
+    {
+        echo "  Testing retention keeps latest run and reports reclaimed bytes... ";
+        $id = $this->createContact();
+        $old = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => ['v' => 'old-' . uniqid()]]);
+        $latest = $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => ['v' => 'new-' . uniqid()]]);
+        $this->db->update(
+            'contact_data_runs',
+            ['created_at' => '2000-01-01 00:00:00'],
+            'contact_id = ?',
+            [$id]
+        );
+        $report = $this->store->runMaintenance(['keep_days' => 30, 'keep_latest' => 1]);
+        if ($report['runs_pruned'] < 1 || $report['payloads_deleted'] < 1 || $report['logical_bytes_reclaimed'] <= 0) {
+            throw new Exception('retention did not prune: ' . json_encode($report));
+        }
+        $oldRun = $this->store->getRun($id, $old['run_id']);
+        if ($oldRun === null || $oldRun['payload_pruned_at'] === null || $oldRun['raw'] !== null) {
+            throw new Exception('old run should remain with its payload pruned');
+        }
+        $latestRun = $this->store->getRun($id, $latest['run_id']);
+        if (!is_array($latestRun['raw'])) {
+            throw new Exception('latest run lost its payload');
+        }
+        if (!array_key_exists('file_bytes_reclaimed', $report)) {
+            throw new Exception('report missing file_bytes_reclaimed');
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+
+    public function testRetentionWorksInBatches(): void
+    {
+        echo "  Testing retention and orphan cleanup add up across batches... ";
+        $id = $this->createContact();
+        for ($i = 0; $i < 3; $i++) {
+            $this->store->recordRun($id, ['source' => 'rocketreach', 'raw_payload' => ['v' => "batch-{$i}-" . uniqid()]]);
+        }
+        $this->db->update('contact_data_runs', ['created_at' => '2000-01-01 00:00:00'], 'contact_id = ?', [$id]);
+        $report = $this->store->runMaintenance(['keep_days' => 30, 'keep_latest' => 0, 'batch' => 1]);
+        if ($report['runs_pruned'] < 3 || $report['payloads_deleted'] < 3) {
+            throw new Exception('batched retention missed rows: ' . json_encode($report));
+        }
+        $left = $this->db->fetchOne(
+            'SELECT COUNT(*) AS c FROM contact_data_runs WHERE contact_id = ? AND payload_id IS NOT NULL',
+            [$id]
+        );
+        if ((int) $left['c'] !== 0) {
+            throw new Exception('runs left with payloads after batched retention');
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+
+    public function testRunNestsInCallerTransaction(): void
+    {
+        echo "  Testing recordRun nests in the caller's transaction... ";
+        $id = $this->createContact();
+        $this->db->beginTransaction();
+        $result = $this->store->recordRun($id, [
+            'source' => 'rocketreach',
+            'raw_payload' => ['v' => 'nested-' . uniqid()],
+            'facts' => [['fact_type' => 'email', 'value' => 'nested@example.com']],
+        ]);
+        $this->db->rollback();
+        if ($this->store->getRun($id, $result['run_id']) !== null) {
+            throw new Exception('run survived the caller rollback');
+        }
+        $payload = $this->db->fetchOne('SELECT id FROM contact_data_payloads WHERE id = ?', [$result['payload_id']]);
+        if ($payload) {
+            throw new Exception('payload survived the caller rollback');
+        }
+        $columns = array_column($this->db->fetchAll('PRAGMA index_info(idx_contact_data_facts_dedup)'), 'name');
+        if ($columns !== ['contact_id', 'fact_type', 'value', 'source']) {
+            throw new Exception('dedup index does not cover source: ' . implode(',', $columns));
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+}
+
+if (basename(__FILE__) === basename($_SERVER['SCRIPT_FILENAME'] ?? '')) {
+    (new ContactDataStoreTest())->runAllTests();
+}
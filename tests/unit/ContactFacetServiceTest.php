@@ -0,0 +1,147 @@
+<?php
+/**
+ * ContactFacetService unit tests — trigger-maintained counts match live queries
+ */
+
+require_once __DIR__ . '/../bootstrap.php';
+require_once __DIR__ . '/../../public/includes/MigrationRunner.php';
+require_once __DIR__ . '/../../public/includes/ContactTagService.php';
+require_once __DIR__ . '/../../public/includes/ContactFacetService.php';
+
+class ContactFacetServiceTest
+{
+    private Database $db;
+    private ContactFacetService $facets;
+
+    public function __construct()
+    {
+        $this->db = TestUtils::getTestDatabase();
+        (new MigrationRunner($this->db))->migrate(false);
+        $this->facets = new ContactFacetService($this->db);
+    }
+
+    public function runAllTests(): void
+    {
+        echo "Running ContactFacetService Unit Tests...\n";
+        $this->testCountsFollowWrites();
+        $this->testListCountShortcut();
+        $this->testMissingTriggerFallsBackWithoutCounts();
+        echo "All ContactFacetService tests completed!\n";
+    }
+
+    private function createContact(array $data = []): int
+    {
+        $ts = getCurrentTimestamp();
+        return (int) $this->db->insert('contacts', $data + [
+            'first_name' => 'Facet',
+            'last_name' => 'Test',
+            'email' => 'facet-' . uniqid() . '@example.com',
+            'created_at' => $ts,
+            'updated_at' => $ts,
+        ]);
+    }
+
+    private function liveCount(string $where, array $params = []): int
+    {
+        $row = $this->db->fetchOne("SELECT COUNT(*) AS c FROM contacts WHERE {$where}", $params);
+        return (int) ($row['c'] ?? 0);
+    }
+
+    public function testCountsFollowWrites(): void
+    {
+        echo "  Testing facet counts follow inserts, updates, deletes and tags... ";
+        $source = 'facet_src_' . uniqid();
+        $tag = 'facet-tag-' . substr(uniqid(), -6);
+        $tags = new ContactTagService($this->db);
+
+        $a = $this->createContact(['source' => $source]);
+        $b = $this->createContact(['source' => $source]);
+        $tags->addTag($a, $tag);
+        $tags->addTag($b, $tag);
+        if (($this->facets->countsFor('source')[$source] ?? 0) !== 2) {
+            throw new Exception('source count not incremented on insert');
+        }
+
+        $this->db->update('contacts', ['source' => null, 'contact_status' => 'qualified'], 'id = ?', [$a]);
+        $this->db->delete('contacts', 'id = ?', [$b]);
+
+        if (($this->facets->countsFor('source')[$source] ?? 0) !== 0) {
+            throw new Exception('source count not decremented on update/delete');
+        }
+        if (($this->facets->countsFor('tag')[$tag] ?? 0) !== 1) {
+            throw new Exception('tag count not decremented when contact delete cascaded');
+        }
+
+        $all = $this->facets->getFacets();
+        if ($all['total'] !== $this->liveCount('1=1')) {
+            throw new Exception('total facet drifted from COUNT(*)');
+        }
+        $status = $this->facets->countsFor('contact_status');
+        if (($status['qualified'] ?? 0) !== $this->liveCount("contact_status = 'qualified'")) {
+            throw new Exception('contact_status facet drifted from live count');
+        }
+        $this->db->delete('contacts', 'id = ?', [$a]);
+        echo "PASS\n";
+    }
+
+    public function testListCountShortcut(): void
+    {
+        echo "  Testing single-filter list counts come from facets... ";
+        $id = $this->createContact(['contact_type' => 'customer']);
+        // Untrimmed value: the list WHERE clause treats it as enriched
+        $padded = $this->createContact(['enrichment_status' => ' enriched ']);
+        $customers = $this->facets->countForListFilters(['type' => 'customer', 'status' => '']);
+        if ($customers !== $this->liveCount("contact_type = 'customer'")) {
+            throw new Exception('type count mismatch');
+        }
+        $notEnriched = $this->facets->countForListFilters(['enrichment_status' => 'null']);
+        $live = $this->liveCount("COALESCE(NULLIF(TRIM(enrichment_status), ''), '') != 'enriched'");
+        if ($notEnriched !== $live) {
+            throw new Exception("not-enriched count mismatch: {$notEnriched} vs {$live}");
+        }
+        if ($this->facets->countForListFilters(['type' => 'lead', 'status' => 'new']) !== null) {
+            throw new Exception('multi-filter counts must fall back to SQL');
+        }
+        if ($this->facets->countForListFilters(['q' => 'someone']) !== null) {
+            throw new Exception('search counts must fall back to SQL');
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        $this->db->delete('contacts', 'id = ?', [$padded]);
+        echo "PASS\n";
+    }
+
+    public function testMissingTriggerFallsBackWithoutCounts(): void
+    {
+        echo "  Testing a missing trigger disables stored counts... ";
+        $source = 'facet_src_' . uniqid();
+        $id = $this->createContact(['source' => $source]);
+        $this->db->getConnection()->exec('DROP TRIGGER IF EXISTS contact_facets_au_source');
+        try {
+            if ($this->facets->isAvailable()) {
+                throw new Exception('isAvailable() ignored the missing trigger');
+            }
+            if ($this->facets->countForListFilters(['source' => $source]) !== null) {
+                throw new Exception('list count must fall back to SQL without triggers');
+            }
+            $all = $this->facets->getFacets();
+            if ($all['total'] !== null || !array_key_exists($source, $this->facets->countsFor('source'))) {
+                throw new Exception('fallback should list source values without counts');
+            }
+            if ($this->facets->countsFor('source')[$source] !== null || $all['facets']['contact_status'] !== []) {
+                throw new Exception('fallback must not compute counts');
+            }
+        } finally {
+            $this->facets->ensureSchema();
+            $this->facets->rebuild();
+        }
+        if (!$this->facets->isAvailable()) {
+            throw new Exception('ensureSchema() did not restore the triggers');
+        }
+        $this->db->delete('contacts', 'id = ?', [$id]);
+        echo "PASS\n";
+    }
+}
+
+if (basename(__FILE__) === basename($_SERVER['SCRIPT_FILENAME'] ?? '')) {
+    (new ContactFacetServiceTest())->runAllTests();
+}
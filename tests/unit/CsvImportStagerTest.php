@@ -0,0 +1,188 @@
+<?php
+/**
+ * CsvImportStager unit tests — streamed staging, chunked resumable processing
+ */
+
+require_once __DIR__ . '/../bootstrap.php';
+require_once __DIR__ . '/../../public/includes/MigrationRunner.php';
+require_once __DIR__ . '/../../public/includes/CsvImportStager.php';
+
+class CsvImportStagerTest
+{
+    private Database $db;
+    private CsvImportStager $stager;
+
+    public function __construct()
+    {
+        $this->db = TestUtils::getTestDatabase();
+        (new MigrationRunner($this->db))->migrate(false);
+        $this->stager = new CsvImportStager($this->db);
+    }
+
+    public function runAllTests(): void
+    {
+        echo "Running CsvImportStager Unit Tests...\n";
+        $this->testStageKeepsOnlySample();
+        $this->testChunkedProcessingResumes();
+        $this->testMapRowRules();
+        $this->testPurgeKeepsActiveJobs();
+        echo "All CsvImportStager tests completed!\n";
+    }
+
+    private function writeCsv(array $lines): string
+    {
+        $path = tempnam(sys_get_temp_dir(), 'crm_import_');
+        file_put_contents($path, "\xEF\xBB\xBF" . implode("\n", $lines) . "\n");
+        return $path;
+    }
+
+    public function testStageKeepsOnlySample(): void
+    {
+        echo "  Testing upload is staged server-side with a small sample... ";
+        $lines = ['First,Last,Email'];
+        for ($i = 1; $i <= 12; $i++) {
+            $lines[] = "Stage{$i},Row,stage{$i}-" . uniqid() . '@example.com';
+        }
+        $lines[] = '';
+        $path = $this->writeCsv($lines);
+        $job = $this->stager->stage($path, 'leads.csv', 1);
+        unlink($path);
+
+        if ($job['row_count'] !== 12 || $job['status'] !== CsvImportStager::STATUS_STAGED) {
+            throw new Exception('unexpected staged job: ' . json_encode($job));
+        }
+        if ($job['headers'] !== ['First', 'Last', 'Email']) {
+            throw new Exception('headers not trimmed / BOM not stripped');
+        }
+        if (count($job['sample']) !== CsvImportStager::SAMPLE_ROWS || $job['sample'][0]['First'] !== 'Stage1') {
+            throw new Exception('sample should be the first rows only');
+        }
+        if ($this->stager->getJob($job['import_id'], 2) !== null) {
+            throw new Exception('job visible to another user');
+        }
+        $this->stager->delete($job['import_id']);
+        $left = $this->db->fetchOne('SELECT COUNT(*) AS c FROM import_rows WHERE import_id = ?', [$job['import_id']]);
+        if ((int) $left['c'] !== 0) {
+            throw new Exception('staged rows not deleted');
+        }
+        echo "PASS\n";
+    }
+
+    public function testChunkedProcessingResumes(): void
+    {
+        echo "  Testing chunked processing resumes from its cursor... ";
+        $tag = substr(uniqid(), -8);
+        $lines = ['Name,Email'];
+        for ($i = 1; $i <= 7; $i++) {
+            $lines[] = "Ann{$i} Lee,imp{$i}-{$tag}@example.com";
+        }
+        $lines[] = "Nobody,imp-bad-{$tag}";                  // invalid email
+        $lines[] = "Ann1 Lee,imp1-{$tag}@example.com";      // duplicate of row 1
+        $path = $this->writeCsv($lines);
+        $job = $this->stager->stage($path, 'resume.csv');
+        unlink($path);
+        $id = $job['import_id'];
+
+        try {
+            $this->stager->process($id);
+            throw new Exception('processing without a mapping must fail');
+        } catch (InvalidArgumentException $e) {
+            // expected
+        }
+
+        $this->stager->configure($id, ['email' => 'Email'], [
+            'source' => 'Staged ' . $tag,
+            'nameSplitConfig' => ['column' => 'Name', 'delimiter' => ' ', 'firstPart' => 0, 'lastPart' => 1],
+        ]);
+        $first = $this->stager->process($id, 0.0, 3);
+        if ($first['status'] !== CsvImportStager::STATUS_PROCESSING || $first['processed'] !== 3) {
+            throw new Exception('first chunk should stop after 3 rows: ' . json_encode($first));
+        }
+
+        // A fresh instance picks up where the last call stopped
+        $done = (new CsvImportStager($this->db))->process($id, 60.0, 3);
+        if ($done['status'] !== CsvImportStager::STATUS_COMPLETED || $done['processed'] !== 9) {
+            throw new Exception('import did not complete: ' . json_encode($done));
+        }
+        if ($done['success_count'] !== 7 || $done['error_count'] !== 2) {
+            throw new Exception('unexpected counts: ' . json_encode($done));
+        }
+        $imported = $this->db->fetchOne('SELECT COUNT(*) AS c FROM contacts WHERE source = ?', ['Staged ' . $tag]);
+        if ((int) $imported['c'] !== 7) {
+            throw new Exception('rows imported more than once');
+        }
+        $errors = $this->stager->errors($id);
+        if (array_column($errors, 'row') !== [8, 9] || strpos($errors[1]['message'], 'already exists') === false) {
+            throw new Exception('row errors not recorded: ' . json_encode($errors));
+        }
+        $again = $this->stager->process($id);
+        if ($again['success_count'] !== 7) {
+            throw new Exception('completed import re-processed rows');
+        }
+
+        $this->db->delete('contacts', 'source = ?', ['Staged ' . $tag]);
+        $this->stager->delete($id);
+        echo "PASS\n";
+    }
+
+    public function testPurgeKeepsActiveJobs(): void
+    {
+        echo "  Testing purge drops only finished or idle jobs... ";
+        $jobs = [
+            'idle' => [CsvImportStager::STATUS_STAGED, '2000-01-01 00:00:00'],
+            'done' => [CsvImportStager::STATUS_COMPLETED, '2000-01-01 00:00:00'],
+            'running' => [CsvImportStager::STATUS_PROCESSING, '2000-01-01 00:00:00'],
+            'recent' => [CsvImportStager::STATUS_STAGED, getCurrentTimestamp()],
+        ];
+        // Stage everything first: stage() itself purges expired jobs
+        $ids = [];
+        foreach (array_keys($jobs) as $name) {
+            $path = $this->writeCsv(['First,Last,Email', "Purge,{$name},purge-{$name}-" . uniqid() . '@example.com']);
+            $ids[$name] = $this->stager->stage($path, "{$name}.csv", 1)['import_id'];
+            unlink($path);
+        }
+        foreach ($jobs as $name => [$status, $updatedAt]) {
+            // Old upload, so only the activity timestamp decides
+            $this->db->update(
+                'import_jobs',
+                ['status' => $status, 'created_at' => '2000-01-01 00:00:00', 'updated_at' => $updatedAt],
+                'id = ?',
+                [$ids[$name]]
+            );
+        }
+
+        $this->stager->purgeExpired();
+        foreach (['idle' => false, 'done' => false, 'running' => true, 'recent' => true] as $name => $kept) {
+            if (($this->stager->getJob($ids[$name]) !== null) !== $kept) {
+                throw new Exception("{$name} job " . ($kept ? 'was purged' : 'survived the purge'));
+            }
+        }
+        $this->stager->delete($ids['running']);
+        $this->stager->delete($ids['recent']);
+        echo "PASS\n";
+    }
+
+    public function testMapRowRules(): void
+    {
+        echo "  Testing shared row mapping rules... ";
+        [$contact, $error] = CsvImportStager::mapRow(
+            ['F' => '<b>Ada</b>', 'L' => 'Lovelace', 'W' => '0xnotanaddress'],
+            ['first_name' => 'F', 'last_name' => 'L', 'evm_address' => 'W'],
+            null,
+            'Src',
+            ''
+        );
+        if ($error !== null || $contact['first_name'] !== 'Ada' || $contact['evm_address'] !== null) {
+            throw new Exception('row not sanitised: ' . json_encode([$contact, $error]));
+        }
+        [, $error] = CsvImportStager::mapRow(['F' => 'Ada'], ['first_name' => 'F'], null, 'Src', '');
+        if ($error === null || strpos($error, 'last_name') === false) {
+            throw new Exception('missing last_name not reported');
+        }
+        echo "PASS\n";
+    }
+}
+
+if (basename(__FILE__) === basename($_SERVER['SCRIPT_FILENAME'] ?? '')) {
+    (new CsvImportStagerTest())->runAllTests();
+}
@@ -0,0 +1,238 @@
+<?php
+/**
+ * TableRebuilder unit tests — chunked copy, resume, live-write capture, swap
+ */
+
+require_once __DIR__ . '/../bootstrap.php';
+require_once __DIR__ . '/../../public/includes/MigrationRunner.php';
+require_once __DIR__ . '/../../public/includes/TableRebuilder.php';
+
+class TableRebuilderTest
+{
+    private const VERSION = 'test_rebuild_probe';
+
+    private Database $db;
+
+    public function __construct()
+    {
+        $this->db = TestUtils::getTestDatabase();
+        (new MigrationRunner($this->db))->ensureRegistry();
+    }
+
+    public function runAllTests(): void
+    {
+        echo "Running TableRebuilder Unit Tests...\n";
+        $this->testResumableChunksAndSwap();
+        $this->testChildRowsSurviveSwap();
+        $this->testExistingOrphansDoNotBlockSwap();
+        $this->testLostParentParksRebuild();
+        echo "All TableRebuilder tests completed!\n";
+    }
+
+    private function reset(): void
+    {
+        $sqlite = $this->db->getConnection();
+        (new TableRebuilder($this->db))->abort(self::VERSION, 'rebuild_probe');
+        $sqlite->exec('DROP TABLE IF EXISTS rebuild_probe_child');
+        $sqlite->exec('DROP TABLE IF EXISTS rebuild_probe');
+        $this->db->delete('schema_migrations', 'version = ?', [self::VERSION]);
+        $sqlite->exec(
+            'CREATE TABLE rebuild_probe (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(50) NOT NULL,
+                email VARCHAR(100) NOT NULL
+            )'
+        );
+        $sqlite->exec('CREATE INDEX idx_rebuild_probe_name ON rebuild_probe(name)');
+        for ($i = 1; $i <= 10; $i++) {
+            $this->db->insert('rebuild_probe', ['name' => "n{$i}", 'email' => "e{$i}@example.com"]);
+        }
+    }
+
+    private function spec(): array
+    {
+        return [
+            'table' => 'rebuild_probe',
+            'create' => 'CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(50) NOT NULL,
+                email VARCHAR(100),
+                note TEXT
+            )',
+            'chunk_size' => 3,
+            'pause_ms' => 0,
+        ];
+    }
+
+    public function testResumableChunksAndSwap(): void
+    {
+        echo "  Testing chunked rebuild resumes and captures live writes... ";
+        $this->reset();
+        $rebuilder = new TableRebuilder($this->db);
+
+        $first = $rebuilder->run(self::VERSION, $this->spec(), null, 1);
+        if ($first['complete'] || $first['rows_copied'] !== 3) {
+            throw new Exception('expected 3 rows after one chunk, got ' . json_encode($first));
+        }
+        $row = $this->db->fetchOne('SELECT status, progress_cursor FROM schema_migrations WHERE version = ?', [self::VERSION]);
+        if (($row['status'] ?? '') !== TableRebuilder::STATUS_RUNNING || (int) $row['progress_cursor'] !== 3) {
+            throw new Exception('progress not recorded in schema_migrations');
+        }
+        if (in_array(self::VERSION, (new MigrationRunner($this->db))->appliedVersions(), true)) {
+            throw new Exception('running rebuild must not count as applied');
+        }
+
+        // Writes between chunks: behind the cursor, ahead of it, and brand new.
+        $this->db->update('rebuild_probe', ['name' => 'updated'], 'id = ?', [2]);
+        $this->db->delete('rebuild_probe', 'id = ?', [1]);
+        $this->db->delete('rebuild_probe', 'id = ?', [10]);
+        $this->db->insert('rebuild_probe', ['name' => 'late', 'email' => 'late@example.com']);
+
+        $second = $rebuilder->run(self::VERSION, $this->spec());
+        if (!$second['complete']) {
+            throw new Exception('expected rebuild to finish');
+        }
+
+        $rows = $this->db->fetchAll('SELECT id, name FROM rebuild_probe ORDER BY id');
+        $ids = array_map(static fn($r) => (int) $r['id'], $rows);
+        if ($ids !== [2, 3, 4, 5, 6, 7, 8, 9, 11]) {
+            throw new Exception('unexpected ids after swap: ' . implode(',', $ids));
+        }
+        if ($rows[0]['name'] !== 'updated') {
+            throw new Exception('update behind the cursor was lost');
+        }
+        $columns = array_column($this->db->getTableInfo('rebuild_probe'), 'name');
+        if (!in_array('note', $columns, true)) {
+            throw new Exception('new column missing after swap');
+        }
+        $index = $this->db->fetchOne("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_rebuild_probe_name'");
+        if (!$index) {
+            throw new Exception('index not recreated after swap');
+        }
+        $leftovers = $this->db->fetchAll("SELECT name FROM sqlite_master WHERE name LIKE 'rebuild_probe__rebuild%'");
+        if (!empty($leftovers)) {
+            throw new Exception('shadow table or triggers left behind');
+        }
+        if (!in_array(self::VERSION, (new MigrationRunner($this->db))->appliedVersions(), true)) {
+            throw new Exception('finished rebuild should be applied');
+        }
+        $newId = $this->db->insert('rebuild_probe', ['name' => 'after', 'email' => 'after@example.com']);
+        if ($newId <= 11) {
+            throw new Exception("AUTOINCREMENT went backwards: {$newId}");
+        }
+        echo "PASS\n";
+    }
+
+    public function testChildRowsSurviveSwap(): void
+    {
+        echo "  Testing swap does not cascade into child tables... ";
+        $this->reset();
+        $this->db->getConnection()->exec(
+            'CREATE TABLE rebuild_probe_child (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                probe_id INTEGER NOT NULL,
+                FOREIGN KEY (probe_id) REFERENCES rebuild_probe(id) ON DELETE CASCADE
+            )'
+        );
+        $this->db->insert('rebuild_probe_child', ['probe_id' => 4]);
+        $result = (new TableRebuilder($this->db))->run(self::VERSION, $this->spec());
+        if (!$result['complete']) {
+            throw new Exception('expected rebuild to finish');
+        }
+        $child = $this->db->fetchOne('SELECT COUNT(*) AS c FROM rebuild_probe_child');
+        if ((int) ($child['c'] ?? 0) !== 1) {
+            throw new Exception('child rows were cascaded away by DROP TABLE');
+        }
+        $this->db->getConnection()->exec('DROP TABLE rebuild_probe_child');
+        $this->db->getConnection()->exec('DROP TABLE rebuild_probe');
+        $this->db->delete('schema_migrations', 'version = ?', [self::VERSION]);
+        echo "PASS\n";
+    }
+
+    private function createChild(): void
+    {
+        $this->db->getConnection()->exec(
+            'CREATE TABLE rebuild_probe_child (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                probe_id INTEGER NOT NULL,
+                FOREIGN KEY (probe_id) REFERENCES rebuild_probe(id) ON DELETE CASCADE
+            )'
+        );
+    }
+
+    private function dropProbeTables(): void
+    {
+        $sqlite = $this->db->getConnection();
+        $sqlite->exec('DROP TABLE IF EXISTS rebuild_probe_child');
+        $sqlite->exec('DROP TABLE IF EXISTS rebuild_probe');
+        $this->db->delete('schema_migrations', 'version = ?', [self::VERSION]);
+    }
+
+    public function testExistingOrphansDoNotBlockSwap(): void
+    {
+        echo "  Testing orphans from before the rebuild do not block the swap... ";
+        $this->reset();
+        $this->createChild();
+        // Like a deals.contact_id left dangling while foreign_keys was off
+        $sqlite = $this->db->getConnection();
+        $sqlite->exec('PRAGMA foreign_keys = OFF');
+        $this->db->insert('rebuild_probe_child', ['probe_id' => 99]);
+        $sqlite->exec('PRAGMA foreign_keys = ON');
+
+        $result = (new TableRebuilder($this->db))->run(self::VERSION, $this->spec());
+        if (!$result['complete'] || $result['failed']) {
+            throw new Exception('pre-existing orphan blocked the rebuild: ' . json_encode($result));
+        }
+        $orphan = $this->db->fetchOne('SELECT COUNT(*) AS c FROM rebuild_probe_child WHERE probe_id = 99');
+        if ((int) ($orphan['c'] ?? 0) !== 1) {
+            throw new Exception('rebuild touched unrelated child rows');
+        }
+        $this->dropProbeTables();
+        echo "PASS\n";
+    }
+
+    public function testLostParentParksRebuild(): void
+    {
+        echo "  Testing a swap that would orphan rows fails once and stays parked... ";
+        $this->reset();
+        $this->createChild();
+        $this->db->insert('rebuild_probe_child', ['probe_id' => 2]);
+        $rebuilder = new TableRebuilder($this->db);
+        $rebuilder->run(self::VERSION, $this->spec(), null, 1);
+        // Simulate a row lost from the shadow copy behind the cursor
+        $this->db->getConnection()->exec('DELETE FROM rebuild_probe__rebuild WHERE id = 2');
+
+        $failed = $rebuilder->run(self::VERSION, $this->spec());
+        if ($failed['complete'] || !$failed['failed'] || !str_contains((string) $failed['error'], 'rebuild_probe_child')) {
+            throw new Exception('expected a failed swap naming the child table: ' . json_encode($failed));
+        }
+        $columns = array_column($this->db->getTableInfo('rebuild_probe'), 'name');
+        if (in_array('note', $columns, true)) {
+            throw new Exception('failed swap was not rolled back');
+        }
+        if (!isset((new MigrationRunner($this->db))->failed()[self::VERSION])) {
+            throw new Exception('failed rebuild missing from MigrationRunner::failed()');
+        }
+        $again = $rebuilder->run(self::VERSION, $this->spec());
+        if (!$again['failed'] || $again['chunks'] !== 0) {
+            throw new Exception('parked rebuild was retried without --retry-failed');
+        }
+
+        $this->db->getConnection()->exec(
+            'INSERT INTO rebuild_probe__rebuild (id, name, email) SELECT id, name, email FROM rebuild_probe WHERE id = 2'
+        );
+        if (!$rebuilder->retry(self::VERSION)) {
+            throw new Exception('retry() did not reset the failed rebuild');
+        }
+        $result = $rebuilder->run(self::VERSION, $this->spec());
+        if (!$result['complete']) {
+            throw new Exception('expected rebuild to finish after retry: ' . json_encode($result));
+        }
+        $this->dropProbeTables();
+        echo "PASS\n";
+    }
+}
+
+if (basename(__FILE__) === basename($_SERVER['SCRIPT_FILENAME'] ?? '')) {
+    (new TableRebuilderTest())->runAllTests();
+}
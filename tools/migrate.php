@@ -7,6 +7,8 @@
  *   php tools/migrate.php status
  *   php tools/migrate.php --dry-run
  *   php tools/migrate.php
+ *   php tools/migrate.php --max-seconds=60   (chunked rebuilds stop and resume next run)
+ *   php tools/migrate.php --retry-failed     (retry rebuild swaps that failed; see status)
  *   CRM_DB_PATH=/path/to/crm.db php tools/migrate.php
  *
  * On multihost after sync: php /path/to/webroot/../tools/migrate.php
@@ -34,6 +36,13 @@ require_once $root . '/public/includes/MigrationRunner.php';
 $argv = $_SERVER['argv'] ?? [];
 $dryRun = in_array('--dry-run', $argv, true);
 $statusOnly = in_array('status', $argv, true);
+$retryFailed = in_array('--retry-failed', $argv, true);
+$maxSeconds = null;
+foreach ($argv as $arg) {
+    if (preg_match('/^--max-seconds=(\d+(?:\.\d+)?)$/', $arg, $m)) {
+        $maxSeconds = (float) $m[1];
+    }
+}
 
 // Force migrate path even if CRM_AUTO_MIGRATE is off — this CLI is the explicit runner.
 putenv('CRM_AUTO_MIGRATE=0');
@@ -47,15 +56,51 @@ if ($statusOnly) {
     foreach ($st['applied'] as $row) {
         echo "  ✓ {$row['version']} — {$row['description']}\n";
     }
+    echo "In progress (" . count($st['in_progress']) . "):\n";
+    foreach ($st['in_progress'] as $row) {
+        echo "  … {$row['version']} — {$row['progress_rows']}/{$row['total_rows']} rows copied (updated {$row['updated_at']})\n";
+    }
+    echo "Failed (" . count($st['failed']) . "):\n";
+    foreach ($st['failed'] as $row) {
+        echo "  ✗ {$row['version']} — swap failed {$row['updated_at']}: {$row['last_error']}\n";
+    }
+    if (!empty($st['failed'])) {
+        echo "Fix the cause, then run: php tools/migrate.php --retry-failed\n";
+    }
     echo "Pending (" . count($st['pending']) . "):\n";
     foreach ($st['pending'] as $row) {
         echo "  • {$row['version']} — {$row['description']}\n";
     }
-    exit(count($st['pending']) > 0 ? 1 : 0);
+    exit(count($st['pending']) + count($st['in_progress']) + count($st['failed']) > 0 ? 1 : 0);
+}
+
+if ($retryFailed && !$dryRun) {
+    $reset = $runner->retryFailed();
+    echo "Retrying failed rebuilds: " . (count($reset) ? implode(', ', $reset) : '(none)') . "\n";
 }
 
-$result = $runner->migrate($dryRun);
+$result = $runner->migrate($dryRun, $maxSeconds);
+if (!$dryRun) {
+    // Inline rebuild owned by Database (not a migration file); boots only give it a second.
+    $contacts = $db->rebuildContactsEmailNullable($maxSeconds);
+    if ($contacts !== null && $contacts['failed']) {
+        $result['failed']['rebuild_contacts_email_nullable'] = $contacts['error'];
+    } elseif ($contacts !== null && !$contacts['complete']) {
+        $result['in_progress'][] = 'rebuild_contacts_email_nullable';
+    }
+}
 $label = $dryRun ? 'Would apply' : 'Applied';
 echo "{$label}: " . (count($result['applied']) ? implode(', ', $result['applied']) : '(none)') . "\n";
 echo "Skipped (already applied): " . count($result['skipped']) . "\n";
+foreach ($result['failed'] as $version => $error) {
+    echo "Failed: {$version} — {$error}\n";
+}
+if (!empty($result['failed'])) {
+    echo "Rebuild parked; fix the cause, then run: php tools/migrate.php --retry-failed\n";
+    exit(3);
+}
+if (!empty($result['in_progress'])) {
+    echo "In progress (re-run to resume): " . implode(', ', $result['in_progress']) . "\n";
+    exit(2);
+}
 exit(0);
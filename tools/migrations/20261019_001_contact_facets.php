@@ -0,0 +1,15 @@
+<?php
+/**
+ * Precomputed facet counts for the contacts filters (table + triggers + backfill).
+ */
+
+return [
+    'version' => '20261019_001_contact_facets',
+    'description' => 'contact_facet_counts maintained by triggers on contacts/contact_tags',
+    'up' => static function (Database $db): void {
+        require_once dirname(__DIR__, 2) . '/public/includes/ContactFacetService.php';
+        $facets = new ContactFacetService($db);
+        $facets->ensureSchema();
+        $facets->rebuild(false);
+    },
+];
@@ -0,0 +1,13 @@
+<?php
+/**
+ * Server-side CSV import staging (import_jobs + import_rows).
+ */
+
+return [
+    'version' => '20261019_002_csv_import_staging',
+    'description' => 'import_jobs / import_rows for streamed, resumable CSV imports',
+    'up' => static function (Database $db): void {
+        require_once dirname(__DIR__, 2) . '/public/includes/CsvImportStager.php';
+        (new CsvImportStager($db))->ensureSchema();
+    },
+];